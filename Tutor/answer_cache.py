@@ -0,0 +1,208 @@
+import os, sys
+import time
+import uuid
+import hashlib
+import threading
+import numpy as np
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.embeddings import embed_text, embedder_name
+from Tutor.storage import cache_path, load_json, save_json, file_lock
+
+# Semantic cache of chatbot answers. A question is answered from the cache when a previous
+# question in the same scope (chat model, or document chatbot) over the same set of documents
+# is at least ANSWER_CACHE_THRESHOLD similar (cosine of the local embeddings). With the default
+# sentence embedder this matches rephrasings ("what is a decorator" / "explain decorators"); with the
+# feature-hashing fallback (see llm_service.embeddings) only near-verbatim repeats match.
+#
+# Layout under the cache directory, one pair of files per scope:
+#   answer_cache/<scope hash>.json             entries (query, document ids, answer, creation time) and the
+#                                              version of their vectors
+#   answer_cache/<scope hash>.<version>.npy    query vectors, one row per entry
+# A write adds a new vectors file before publishing the entries that name it, so readers always find
+# matching entries and vectors.
+ANSWER_CACHE_DIR = "answer_cache"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.85"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", str(7 * 24 * 3600)))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "5000"))  # per scope, oldest dropped first
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+# Attempts at reading a consistent pair of files while another process replaces them.
+ANSWER_CACHE_READ_ATTEMPTS = 3
+# Scope of the document chatbot, the only scope whose answers depend on knowledge-base documents.
+DOCUMENTS_SCOPE = "documents"
+
+
+class AnswerCache:
+    """
+    Semantic answer cache for one scope. Entries are shared between processes through the cache
+    directory; writes hold a lock file, so concurrent writers in different processes don't drop
+    each other's entries.
+    """
+
+    def __init__(self, scope, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL):
+        self.scope = scope
+        self.threshold = threshold
+        self.ttl = ttl
+        name = hashlib.sha256(f"{scope}|{embedder_name()}".encode("utf-8")).hexdigest()[:32]
+        self.entries_path = cache_path(ANSWER_CACHE_DIR, f"{name}.json")
+        self._vectors_prefix = cache_path(ANSWER_CACHE_DIR, name)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+        self._vectors = None
+        self._version = None
+        self._mtime = None
+
+    def _vectors_path(self, version):
+        return f"{self._vectors_prefix}.{version}.npy"
+
+    def _read(self):
+        # (entries, vectors, version) from disk, or None if another process replaced them mid-read.
+        data = load_json(self.entries_path, default=None)
+        if not isinstance(data, dict):
+            return [], None, None
+        try:
+            vectors = np.load(self._vectors_path(data["version"]))
+        except (OSError, ValueError):
+            return None
+        if len(vectors) != len(data["entries"]):
+            return None
+        return data["entries"], vectors, data["version"]
+
+    def _load(self, force=False):
+        try:
+            mtime = os.path.getmtime(self.entries_path)
+        except OSError:
+            mtime = None
+        if force or self._entries is None or mtime != self._mtime:
+            for _ in range(ANSWER_CACHE_READ_ATTEMPTS):
+                loaded = self._read()
+                if loaded is not None:
+                    self._entries, self._vectors, self._version = loaded
+                    self._mtime = mtime
+                    return
+                time.sleep(0.01)
+            # Keep what was loaded before; the next call reads the files again.
+            if self._entries is None:
+                self._entries, self._vectors, self._version = [], None, None
+
+    def _save(self, entries, vectors):
+        # Called with the file lock held, after _load(force=True).
+        version = uuid.uuid4().hex[:16]
+        tmp_path = f"{self._vectors_prefix}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, self._vectors_path(version))
+        save_json(self.entries_path, {"version": version, "entries": entries})
+        if self._version is not None:
+            try:
+                os.remove(self._vectors_path(self._version))
+            except OSError:
+                pass
+        self._entries, self._vectors, self._version = entries, vectors, version
+        self._mtime = os.path.getmtime(self.entries_path)
+
+    def lookup(self, query, doc_ids=()):
+        """
+        Return the cached answer of the most similar earlier query over the same documents, or None.
+        """
+        doc_ids = sorted(doc_ids)
+        vector = embed_text(query)
+        with self._lock:
+            self._load()
+            answer = None
+            if self._entries:
+                now = time.time()
+                scores = self._vectors @ vector
+                for i in np.argsort(-scores):
+                    if scores[i] < self.threshold:
+                        break
+                    entry = self._entries[i]
+                    if entry["doc_ids"] == doc_ids and now - entry["created_at"] <= self.ttl:
+                        answer = entry["answer"]
+                        break
+            if answer is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return answer
+
+    def store(self, query, answer, doc_ids=()):
+        """
+        Cache the answer to a query over the given documents.
+        """
+        vector = embed_text(query)
+        with file_lock(self.entries_path), self._lock:
+            self._load(force=True)
+            now = time.time()
+            keep = [i for i, e in enumerate(self._entries) if now - e["created_at"] <= self.ttl]
+            keep = keep[-(ANSWER_CACHE_MAX_ENTRIES - 1):] if ANSWER_CACHE_MAX_ENTRIES > 1 else []
+            entries = [self._entries[i] for i in keep]
+            entries.append({"query": query, "doc_ids": sorted(doc_ids), "answer": answer, "created_at": now})
+            rows = [self._vectors[keep]] if keep else []
+            self._save(entries, np.vstack(rows + [vector[None, :]]).astype(np.float32))
+
+    def invalidate_document(self, doc_id):
+        """
+        Drop every cached answer that was based on the given document. Returns the number dropped.
+        """
+        with file_lock(self.entries_path), self._lock:
+            self._load(force=True)
+            keep = [i for i, e in enumerate(self._entries) if doc_id not in e["doc_ids"]]
+            dropped = len(self._entries) - len(keep)
+            if dropped:
+                vectors = self._vectors[keep] if keep else np.zeros((0, self._vectors.shape[1]), dtype=np.float32)
+                self._save([self._entries[i] for i in keep], vectors)
+            return dropped
+
+    def stats(self):
+        """
+        Hit/miss counters of this process since start-up.
+        """
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_answer_cache(scope):
+    """
+    Return the process-wide AnswerCache for a scope.
+    """
+    with _caches_lock:
+        if scope not in _caches:
+            _caches[scope] = AnswerCache(scope)
+        return _caches[scope]
+
+def invalidate_document(doc_id):
+    """
+    Drop the cached document-chatbot answers based on a document. Returns the number dropped.
+    """
+    return get_answer_cache(DOCUMENTS_SCOPE).invalidate_document(doc_id)
+
+def cache_stats():
+    """
+    Hit/miss counters of every scope used in this process.
+    """
+    with _caches_lock:
+        return {scope: cache.stats() for scope, cache in _caches.items()}
+
+def cached_answer(scope, query, generate, doc_ids=(), is_error=None):
+    """
+    Answer `query` from the semantic cache of `scope`, or call `generate()` and cache its answer
+    (unless `is_error(answer)` is true). Returns (answer, from_cache).
+    """
+    if not ANSWER_CACHE_ENABLED or not query.strip():
+        return generate(), False
+    cache = get_answer_cache(scope)
+    answer = cache.lookup(query, doc_ids)
+    if answer is not None:
+        return answer, True
+    answer = generate()
+    if not (is_error and is_error(answer)):
+        cache.store(query, answer, doc_ids)
+    return answer, False
@@ -0,0 +1,344 @@
+"""
+HTTP API for the tutor, built on the headless TutorService.
+
+    uvicorn Tutor.api:app --workers 4
+
+Sessions are kept in the memory of the worker that created them, so a multi-worker
+deployment needs sticky routing on the session id (e.g. an Nginx hash on the URL path).
+A session idle for API_SESSION_TTL is deleted along with its uploaded documents, and so is the
+least recently used one when API_MAX_SESSIONS are open. Requests that change a session run one
+at a time per session.
+Lessons are streamed as server-sent events:
+
+    event: chunk   data: {"text": "..."}     (repeated)
+    event: done    data: {"lesson_key": "..."}
+
+and so are web resources (/resources/stream), each event carrying the resource lists so far:
+
+    event: partial data: {"pdfs": [...], ..., "videos": []}   (repeated)
+    event: done    data: {"pdfs": [...], ..., "videos": [...]}
+"""
+import os, sys
+import json
+import time
+import uuid
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool, iterate_in_threadpool
+from pydantic import BaseModel
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.tutor_service import (TutorService, get_web_resources, stream_web_resources,
+                                 INTERVIEW_DIFFICULTIES, INTERVIEW_BEHAVIORS)
+from Tutor.lessons import lesson_key
+from Tutor.answer_cache import cache_stats
+from llm_service.tasks import latency_stats
+
+
+class ProfileIn(BaseModel):
+    name: str = ""
+    age: int = 0
+    country: str = ""
+    languages: str = ""
+    english_first: str = "Yes"
+    personality: str = ""
+    tone_paragraph: str = ""
+    learning_goals: str = ""
+    level: str = "Beginner"
+    topics: str = ""
+    resume_text: str = ""
+
+
+class TopicsIn(BaseModel):
+    topics: str
+
+
+class InterviewIn(BaseModel):
+    subtopics: list[str]
+    difficulty: str = "Medium"
+    behavior: str = "Polite"
+
+
+class AnswerIn(BaseModel):
+    answer: str
+    adaptive: bool = False
+
+
+class ExerciseIn(BaseModel):
+    lesson_key: str
+    index: int
+    code: str
+
+
+class QuestionIn(BaseModel):
+    query: str
+    doc_ids: Optional[list[str]] = None
+
+
+# Maximum number of requests each endpoint group runs at once in this worker; further
+# requests wait for a slot. LLM-heavy endpoints get fewer slots than cheap ones.
+ENDPOINT_CONCURRENCY = {
+    "profile": int(os.getenv("API_PROFILE_CONCURRENCY", "8")),
+    "topics": int(os.getenv("API_TOPICS_CONCURRENCY", "8")),
+    "lessons": int(os.getenv("API_LESSONS_CONCURRENCY", "16")),
+    "interview": int(os.getenv("API_INTERVIEW_CONCURRENCY", "32")),
+    "documents": int(os.getenv("API_DOCUMENTS_CONCURRENCY", "8")),
+    "exercises": int(os.getenv("API_EXERCISES_CONCURRENCY", "16")),
+    "resources": int(os.getenv("API_RESOURCES_CONCURRENCY", "8")),
+}
+
+# Sessions idle for longer than this (seconds) are deleted.
+API_SESSION_TTL = float(os.getenv("API_SESSION_TTL", str(2 * 3600)))
+# Maximum number of sessions kept by this worker; the least recently used is deleted beyond it.
+API_MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "10000"))
+
+app = FastAPI(title="InsightsLib Learn API")
+tutor_service = TutorService()
+# session id -> session, least recently used first.
+sessions = OrderedDict()
+_session_state = {}  # session id -> {"lock": asyncio.Lock, "last_used": time}
+_limits = {}
+
+
+def _limit(endpoint):
+    # Semaphores are created lazily so they bind to the server's running event loop.
+    if endpoint not in _limits:
+        _limits[endpoint] = asyncio.Semaphore(ENDPOINT_CONCURRENCY[endpoint])
+    return _limits[endpoint]
+
+async def run_limited(endpoint, fn, *args, **kwargs):
+    """
+    Run a blocking TutorService call in the thread pool, within the endpoint's concurrency limit.
+    """
+    async with _limit(endpoint):
+        return await run_in_threadpool(fn, *args, **kwargs)
+
+def get_session(session_id):
+    session = sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown session.")
+    sessions.move_to_end(session_id)
+    _session_state[session_id]["last_used"] = time.time()
+    return session
+
+def session_lock(session_id):
+    """
+    Lock held by requests that change the session, so e.g. two concurrent answers don't interleave.
+    """
+    get_session(session_id)
+    return _session_state[session_id]["lock"]
+
+async def _drop_session(session_id):
+    session = sessions.pop(session_id, None)
+    _session_state.pop(session_id, None)
+    if session is not None:
+        await run_limited("documents", tutor_service.forget_documents, session)
+
+async def expire_sessions():
+    """
+    Delete idle sessions (see API_SESSION_TTL) and, beyond API_MAX_SESSIONS, the least recently used
+    ones; sessions with a request in progress are kept. Runs whenever a session is created.
+    """
+    cutoff = time.time() - API_SESSION_TTL
+    expired = []
+    for session_id in sessions:
+        state = _session_state[session_id]
+        over_capacity = len(sessions) - len(expired) >= API_MAX_SESSIONS
+        if not over_capacity and state["last_used"] >= cutoff:
+            break  # ordered by last use: the rest are more recent
+        if not state["lock"].locked():
+            expired.append(session_id)
+    for session_id in expired:
+        await _drop_session(session_id)
+
+def require_profile(session):
+    if "profile" not in session:
+        raise HTTPException(status_code=409, detail="Submit a profile first.")
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Sessions
+
+@app.post("/sessions")
+async def create_session(learner_id: Optional[str] = None):
+    # Every session gets a learner id; passing back the learner_id an earlier session returned continues
+    # that learner's progress. Only ids this server issued are accepted.
+    if learner_id is None:
+        learner_id = await run_in_threadpool(tutor_service.new_learner_id)
+    elif not await run_in_threadpool(tutor_service.known_learner, learner_id):
+        raise HTTPException(status_code=404, detail="Unknown learner.")
+    await expire_sessions()
+    session_id = uuid.uuid4().hex
+    sessions[session_id] = {"user_id": learner_id}
+    _session_state[session_id] = {"lock": asyncio.Lock(), "last_used": time.time()}
+    return {"session_id": session_id, "learner_id": learner_id}
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    async with session_lock(session_id):
+        await _drop_session(session_id)
+    return {"deleted": session_id}
+
+# Profile & topics
+
+@app.post("/sessions/{session_id}/profile")
+async def submit_profile(session_id: str, profile: ProfileIn):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        tutor_service.set_profile(session, profile.model_dump())
+        assessment = await run_limited("profile", tutor_service.assess_profile, session)
+    return {"assessment": assessment}
+
+@app.post("/sessions/{session_id}/topics")
+async def expand_topics(session_id: str):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        require_profile(session)
+        dynamic_topics = await run_limited("topics", tutor_service.generate_dynamic_topics, session)
+    return {"dynamic_topics": dynamic_topics}
+
+@app.post("/sessions/{session_id}/topics/add")
+async def add_topics(session_id: str, body: TopicsIn):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        require_profile(session)
+        failed = await run_limited("topics", tutor_service.add_topics, session, body.topics)
+    return {"dynamic_topics": session["dynamic_topics"], "failed": failed}
+
+# Lessons
+
+@app.get("/sessions/{session_id}/lessons/stream")
+async def stream_lesson(session_id: str, topic: str, subtopic: str):
+    session = get_session(session_id)
+    require_profile(session)
+    lock = session_lock(session_id)
+
+    async def events():
+        async with lock, _limit("lessons"):
+            chunks = tutor_service.stream_lesson(session, topic, subtopic)
+            async for chunk in iterate_in_threadpool(chunks):
+                yield sse_event("chunk", {"text": chunk})
+        yield sse_event("done", {"lesson_key": lesson_key(topic, subtopic)})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/sessions/{session_id}/lessons")
+async def list_lessons(session_id: str):
+    return {"lessons": get_session(session_id).get("lessons", {})}
+
+# Exercises
+
+@app.get("/sessions/{session_id}/exercises")
+async def lesson_exercises(session_id: str, lesson_key: str):
+    session = get_session(session_id)
+    exercises = await run_limited("exercises", tutor_service.lesson_exercises, session, lesson_key)
+    # The solutions stay on the server.
+    return {"exercises": [{k: v for k, v in e.items() if k != "solution"} for e in exercises]}
+
+@app.post("/sessions/{session_id}/exercises/submit")
+async def submit_exercise(session_id: str, body: ExerciseIn):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        try:
+            return await run_limited("exercises", tutor_service.submit_exercise, session, body.lesson_key,
+                                     body.index, body.code)
+        except IndexError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+# Interview
+
+@app.post("/sessions/{session_id}/interview")
+async def start_interview(session_id: str, body: InterviewIn):
+    if body.difficulty not in INTERVIEW_DIFFICULTIES or body.behavior not in INTERVIEW_BEHAVIORS:
+        raise HTTPException(status_code=422, detail="Unknown difficulty or behavior.")
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        questions = await run_limited("interview", tutor_service.start_interview, session,
+                                      body.subtopics, body.difficulty, body.behavior)
+    return {"question_index": 0, "question": questions[0], "total_questions": len(questions)}
+
+@app.post("/sessions/{session_id}/interview/answer")
+async def answer_question(session_id: str, body: AnswerIn):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        if "interview_questions" not in session:
+            raise HTTPException(status_code=409, detail="Start an interview first.")
+        # Evaluation runs on the background pool; this returns as soon as it is queued.
+        await run_limited("interview", tutor_service.submit_answer, session, body.answer, body.adaptive)
+        # Pick up evaluations that finished since the last call (adaptive answers already did).
+        tutor_service.collect_evaluations(session)
+        idx, question = tutor_service.current_question(session)
+        return {"question_index": idx, "question": question,
+                "evaluations": session["interview_evaluations"]}
+
+@app.post("/sessions/{session_id}/interview/finalize")
+async def finalize_interview(session_id: str):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        if "interview_questions" not in session:
+            raise HTTPException(status_code=409, detail="Start an interview first.")
+        summary = await run_limited("interview", tutor_service.finalize_interview, session)
+    return {"summary": summary, "evaluations": session["interview_evaluations"]}
+
+@app.get("/sessions/{session_id}/progress")
+async def progress_timeline(session_id: str, limit: int = 100):
+    session = get_session(session_id)
+    timeline = await run_in_threadpool(tutor_service.progress_timeline, session, limit)
+    return {"timeline": timeline}
+
+# Documents & resources
+
+@app.post("/sessions/{session_id}/pdf")
+async def upload_pdf(session_id: str, file: UploadFile = File(...)):
+    async with session_lock(session_id):
+        session = get_session(session_id)
+        doc_id = await run_limited("documents", tutor_service.upload_document, session, file.file,
+                                   title=file.filename)
+    if doc_id is None:
+        raise HTTPException(status_code=422, detail="No text could be extracted from this PDF.")
+    return {"doc_id": doc_id, "title": session["documents"][doc_id]}
+
+@app.get("/sessions/{session_id}/documents")
+async def list_documents(session_id: str):
+    session = get_session(session_id)
+    return {"documents": await run_in_threadpool(tutor_service.list_documents, session)}
+
+@app.post("/sessions/{session_id}/pdf/ask")
+async def ask_pdf(session_id: str, body: QuestionIn):
+    session = get_session(session_id)
+    answer, from_cache = await run_limited("documents", tutor_service.answer_document_question, session,
+                                           body.query, doc_ids=body.doc_ids)
+    return {"answer": answer, "from_cache": from_cache}
+
+@app.get("/metrics/answer-cache")
+async def answer_cache_metrics():
+    return cache_stats()
+
+@app.get("/metrics/model-tiers")
+async def model_tier_metrics():
+    return latency_stats()
+
+@app.get("/resources")
+async def search_resources(query: str):
+    resources = await run_limited("resources", get_web_resources, query)
+    return resources.model_dump()
+
+@app.get("/resources/stream")
+async def stream_resources(query: str):
+
+    async def events():
+        async with _limit("resources"):
+            resources = None
+            async for resources in iterate_in_threadpool(stream_web_resources(query)):
+                yield sse_event("partial", resources.model_dump())
+        yield sse_event("done", resources.model_dump() if resources is not None else {})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,23 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Streamlit re-runs the page script on every interaction but imports this module once,
+# so the pool is shared by every session in the process.
+MAX_BACKGROUND_WORKERS = int(os.getenv("INSIGHTSLIB_BACKGROUND_WORKERS", "4"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def submit_background(fn, *args, **kwargs):
+    """
+    Run `fn(*args, **kwargs)` on the shared background pool and return its Future.
+    Background tasks must not touch st.session_state; they only see their arguments.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_BACKGROUND_WORKERS,
+                                           thread_name_prefix="insightslib-bg")
+    return _executor.submit(fn, *args, **kwargs)
@@ -0,0 +1,144 @@
+"""
+Cohort analytics over the interview evaluations in the progress store.
+
+Evaluations are loaded once into a pandas DataFrame (one row per answer, with the subtopic its
+question tested) and every aggregate is computed column-wise over it, so reports over thousands of
+learners take a single query plus vectorised group-bys.
+
+    python Tutor/cohort_analytics.py                      # print the instructor report
+    python Tutor/cohort_analytics.py --since 30 --export reports/cohort.parquet
+"""
+import os, sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.progress_store import get_progress_store
+
+SCORE_BINS = np.arange(0, 11)  # interview scores are 0-10
+# Weakest-subtopic ranking: a subtopic's mean is pulled towards the cohort mean by this many
+# pseudo-answers, so subtopics with only a handful of answers don't top the list by chance.
+RANKING_PRIOR_ANSWERS = 10
+
+EVALUATIONS_QUERY = """
+SELECT interview_id, user_id, question_index, subtopic, difficulty, behavior, score, created_at
+FROM evaluations
+WHERE created_at >= ?
+"""
+
+
+def load_evaluations(store=None, since=0.0):
+    """
+    Load evaluations (created at or after the `since` timestamp) into a DataFrame with one row per
+    evaluation. Unscored evaluations are dropped. Evaluations recorded before questions carried a
+    subtopic have none, and count in every aggregate except the per-subtopic ones.
+    """
+    store = store or get_progress_store()
+    store.flush()
+    frame = pd.read_sql_query(EVALUATIONS_QUERY, store.reader(), params=(since,))
+    frame = frame.dropna(subset=["score"])
+    frame["score"] = frame["score"].astype(np.float32)
+    for column in ("difficulty", "behavior", "subtopic"):
+        frame[column] = frame[column].astype("category")
+    frame["created_at"] = pd.to_datetime(frame["created_at"], unit="s")
+    return frame
+
+def score_distribution(frame, by="subtopic"):
+    """
+    Score statistics and a 0-10 histogram per value of `by` ('subtopic', 'difficulty', 'behavior'
+    or a list of them). Histogram columns are named score_0 ... score_10.
+    """
+    keys = [by] if isinstance(by, str) else list(by)
+    source = frame.dropna(subset=keys)
+    grouped = source.groupby(keys, observed=True)
+    stats = grouped.agg(answers=("score", "count"), learners=("user_id", "nunique"), mean=("score", "mean"),
+                        std=("score", "std"), median=("score", "median"))
+    stats["p25"] = grouped["score"].quantile(0.25)
+    stats["p75"] = grouped["score"].quantile(0.75)
+    bins = np.clip(np.rint(source["score"].to_numpy()), 0, 10).astype(np.int64)
+    histogram = pd.crosstab([source[c] for c in keys], bins)
+    histogram = histogram.reindex(columns=SCORE_BINS, fill_value=0)
+    histogram.columns = [f"score_{b}" for b in SCORE_BINS]
+    return stats.join(histogram)
+
+def weakest_subtopics(frame, top=10, min_answers=1):
+    """
+    Rank subtopics from weakest to strongest by their mean score, shrunk towards the cohort mean
+    (RANKING_PRIOR_ANSWERS), keeping subtopics with at least `min_answers` answers.
+    """
+    if frame.empty:
+        return pd.DataFrame(columns=["answers", "learners", "mean", "adjusted_mean"])
+    cohort_mean = frame["score"].mean()
+    stats = frame.groupby("subtopic", observed=True).agg(answers=("score", "count"), learners=("user_id", "nunique"),
+                                                         total=("score", "sum"))
+    stats = stats[stats["answers"] >= min_answers]
+    stats["mean"] = stats["total"] / stats["answers"]
+    stats["adjusted_mean"] = ((stats["total"] + RANKING_PRIOR_ANSWERS * cohort_mean)
+                              / (stats["answers"] + RANKING_PRIOR_ANSWERS))
+    return stats.drop(columns="total").sort_values("adjusted_mean").head(top)
+
+def score_trends(frame, freq="W", by=None):
+    """
+    Mean score and number of answers per period (pandas frequency, e.g. 'D', 'W', 'MS'),
+    optionally split by 'difficulty', 'behavior' or 'subtopic'.
+    """
+    keys = [pd.Grouper(key="created_at", freq=freq)] + ([by] if by else [])
+    return frame.groupby(keys, observed=True)["score"].agg(answers="count", mean="mean")
+
+def cohort_report(frame):
+    """
+    The instructor report: distributions per subtopic, difficulty and interviewer behavior,
+    the weakest subtopics and the weekly trend.
+    """
+    return {
+        "by_subtopic": score_distribution(frame, "subtopic"),
+        "by_difficulty": score_distribution(frame, "difficulty"),
+        "by_behavior": score_distribution(frame, "behavior"),
+        "weakest_subtopics": weakest_subtopics(frame),
+        "weekly_trend": score_trends(frame, "W"),
+    }
+
+def export_report(report, path):
+    """
+    Write every table of a report next to `path`, one file per table ('<stem>_<table>.<ext>').
+    The extension picks the format: .parquet (needs pyarrow) or .csv. Returns the written paths.
+    """
+    stem, ext = os.path.splitext(path)
+    if ext not in (".parquet", ".csv"):
+        raise ValueError("Export path must end in .parquet or .csv")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = []
+    for name, table in report.items():
+        table_path = f"{stem}_{name}{ext}"
+        table = table.reset_index()
+        if ext == ".parquet":
+            table.to_parquet(table_path, index=False)
+        else:
+            table.to_csv(table_path, index=False)
+        written.append(table_path)
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description="Cohort analytics over interview evaluations.")
+    parser.add_argument("--since", type=float, default=None, help="Only include the last N days.")
+    parser.add_argument("--export", help="Write the report tables to <stem>_<table>.parquet/.csv.")
+    args = parser.parse_args()
+
+    since = time.time() - args.since * 86400 if args.since else 0.0
+    frame = load_evaluations(since=since)
+    print(f"{frame['user_id'].nunique()} learners, {len(frame)} scored answers.")
+    report = cohort_report(frame)
+    with pd.option_context("display.width", 200, "display.max_columns", 30):
+        for name, table in report.items():
+            print(f"\n== {name} ==\n{table}")
+    if args.export:
+        for table_path in export_report(report, args.export):
+            print(f"Wrote {table_path}")
+
+
+if __name__ == "__main__":
+    main()
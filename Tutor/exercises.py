@@ -0,0 +1,90 @@
+import os, sys
+import json
+import hashlib
+from pydantic import BaseModel
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.llm_generator import generate_llm_json
+from llm_service.tokenizer import fit_prompt
+from llm_service.tasks import task_settings
+from Tutor.storage import cache_path, load_json, save_json
+from Tutor.sandbox import get_sandbox_pool
+
+
+class codeExercise(BaseModel):
+    title: str
+    instructions: str
+    starter_code: str
+    solution: str
+    tests: list[str]
+
+
+class lessonExercises(BaseModel):
+    exercises: list[codeExercise]
+
+
+EXERCISES_PER_LESSON = 2
+# Generated exercises are stored per lesson text, so a stored (e.g. pre-generated) lesson gets its
+# exercises generated once.
+EXERCISE_DIR = "exercises"
+
+
+def _exercise_path(topic, subtopic, lesson_content):
+    key = hashlib.sha256(json.dumps([topic.strip().lower(), subtopic.strip().lower(), lesson_content]).encode("utf-8"))
+    return cache_path(EXERCISE_DIR, f"{key.hexdigest()}.json")
+
+def build_exercise_prompt(topic, subtopic, lesson_content):
+    header = (
+        f"Write {EXERCISES_PER_LESSON} short Python coding exercises for a learner who has just read the lesson "
+        f"below on '{subtopic}' (topic: {topic}).\n\n"
+        "For each exercise give:\n"
+        "- title: a short title\n"
+        "- instructions: what to implement, naming the exact function(s) and their parameters\n"
+        "- starter_code: the function signature(s) with a docstring and `pass` as the body\n"
+        "- solution: a complete, correct implementation\n"
+        "- tests: 3 to 5 independent Python assert statements that call the function(s) and pass for the solution\n\n"
+        "Use only the Python standard library; no input(), files or network. "
+        "If the subtopic cannot be practised by writing Python code, return an empty list.\n\n"
+        "Lesson:\n"
+    )
+    return fit_prompt([(header, None), (lesson_content, 1)], model=task_settings("exercises", structured=True)["model"])
+
+def generate_exercises(topic, subtopic, lesson_content):
+    """
+    Return the code exercises for a lesson as dicts (title, instructions, starter_code, solution, tests),
+    generating and storing them on first use. Only exercises whose own solution passes their tests in
+    the sandbox are kept. Returns an empty list if none could be generated.
+    """
+    path = _exercise_path(topic, subtopic, lesson_content)
+    exercises = load_json(path)
+    if exercises is not None:
+        return exercises
+    response = generate_llm_json(build_exercise_prompt(topic, subtopic, lesson_content), lessonExercises,
+                                 task="exercises")
+    if not isinstance(response, lessonExercises):
+        return []
+    pool = get_sandbox_pool()
+    candidates = [e for e in response.exercises[:EXERCISES_PER_LESSON] if e.tests]
+    statuses = [check.result()["status"] for check in [pool.submit(e.solution, e.tests) for e in candidates]]
+    exercises = [e.model_dump() for e, status in zip(candidates, statuses) if status == "passed"]
+    # Don't store an empty list that the sandbox, rather than the exercises, caused (e.g. a worker
+    # failure or an overloaded machine timing out): the next request tries again.
+    if exercises or all(status == "failed" for status in statuses):
+        save_json(path, exercises)
+    return exercises
+
+def grade_submission(exercise, code):
+    """
+    Run a learner's code for an exercise against its tests in the sandbox. Returns the sandbox result
+    (see SandboxPool) with 'passed' and 'total' test counts added. This is practice feedback: the code
+    runs alongside its tests and can make them pass, so the result is not a trusted grade.
+    """
+    result = get_sandbox_pool().run(code, exercise["tests"])
+    result["passed"] = sum(1 for t in result["tests"] if t["passed"] is True)
+    result["total"] = len(exercise["tests"])
+    # Recomputed from the test results, whatever status the run reported.
+    if result["status"] in ("passed", "failed"):
+        result["status"] = "passed" if result["passed"] == result["total"] else "failed"
+    return result
@@ -0,0 +1,327 @@
+"""
+Persistent multi-document knowledge base for the PDF chatbot.
+
+Every document is chunked, embedded and written as its own index segment:
+
+    knowledge_base/manifest.json           documents and their owners
+    knowledge_base/segments/<doc_id>.npy   chunk vectors (float32), memory-mapped when searched
+    knowledge_base/segments/<doc_id>.json  chunk texts
+
+Adding or removing a document only touches its own segment and the manifest, so the index is
+updated incrementally. Updates hold a lock file next to the manifest, so several processes can add and
+remove documents at once. If the configured embedder changes, the segments are re-embedded from their
+stored chunk texts on first use. Segments are opened with mmap, so every worker process on a machine shares
+one copy of the vectors through the OS page cache instead of loading them per session.
+
+Documents are either shared (course material preloaded by admins, owner "shared") or owned by the
+session that uploaded them. A session's ownership lapses KB_UPLOAD_TTL after its upload, so uploads of
+sessions that ended without releasing them are eventually deleted; expired owners are swept on every
+upload. Admins manage shared documents from the command line:
+
+    python Tutor/knowledge_base.py add course/*.pdf
+    python Tutor/knowledge_base.py list
+    python Tutor/knowledge_base.py remove <doc_id>
+    python Tutor/knowledge_base.py expire
+"""
+import os, sys
+import re
+import time
+import hashlib
+import argparse
+import threading
+import numpy as np
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.embeddings import embed_texts, embed_text, embedder_name
+from llm_service.profiling import timed_phase
+from Tutor.storage import cache_path, load_json, save_json, file_lock
+from Tutor.answer_cache import invalidate_document
+
+SHARED_OWNER = "shared"
+KB_DIR = "knowledge_base"
+CHUNK_WORDS = 200
+CHUNK_OVERLAP_WORDS = 40
+KB_UPLOAD_TTL = float(os.getenv("KB_UPLOAD_TTL", str(24 * 3600)))  # seconds
+
+
+def chunk_text(text, chunk_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    """
+    Split text into overlapping chunks of about `chunk_words` words.
+    """
+    words = text.split()
+    step = max(chunk_words - overlap, 1)
+    return [" ".join(words[start:start + chunk_words])
+            for start in range(0, max(len(words) - overlap, 1), step)
+            if words[start:start + chunk_words]]
+
+
+class KnowledgeBase:
+    """
+    Shared, on-disk document index. One instance per process is enough; it notices documents
+    added by other processes by watching the manifest's modification time.
+    """
+
+    def __init__(self, kb_dir=KB_DIR):
+        self.manifest_path = cache_path(kb_dir, "manifest.json")
+        self.segment_dir = os.path.dirname(cache_path(kb_dir, "segments", "_"))
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._manifest_mtime = None
+        self._segments = {}
+
+    # Manifest
+
+    def _load_manifest(self):
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            mtime = None
+        if self._manifest is None or mtime != self._manifest_mtime:
+            manifest = load_json(self.manifest_path, default=None) or {"embedder": embedder_name(), "documents": {}}
+            if self._manifest is not None and manifest["embedder"] != self._manifest["embedder"]:
+                # Re-indexed by another process: every open segment is stale.
+                self._segments.clear()
+            self._manifest, self._manifest_mtime = manifest, mtime
+            # Drop segments of documents removed by another process.
+            for doc_id in list(self._segments):
+                if doc_id not in manifest["documents"]:
+                    del self._segments[doc_id]
+        return self._manifest
+
+    def _current_manifest(self):
+        # The manifest for a read, re-indexing first if it was built with another embedder.
+        with self._lock:
+            manifest = self._load_manifest()
+        if manifest["embedder"] != embedder_name():
+            self._update_manifest(lambda manifest: None)
+            with self._lock:
+                manifest = self._load_manifest()
+        return manifest
+
+    def _reindex(self, manifest):
+        # Re-embed every segment's stored chunks with the current embedder. Runs under the update lock.
+        print(f"Knowledge base: re-indexing {len(manifest['documents'])} documents embedded with "
+              f"{manifest['embedder']} for {embedder_name()}.")
+        for doc_id in manifest["documents"]:
+            chunks = load_json(os.path.join(self.segment_dir, f"{doc_id}.json"), default=None)
+            if chunks is not None:
+                self._write_vectors(doc_id, embed_texts(chunks))
+        manifest["embedder"] = embedder_name()
+        self._segments.clear()
+
+    def _expire_owners(self, manifest, ttl):
+        # Drop session owners whose upload is older than `ttl`; returns the documents left without owners.
+        cutoff = time.time() - ttl
+        deleted = []
+        for doc_id, doc in list(manifest["documents"].items()):
+            uploaded = doc.setdefault("uploaded_at", {})
+            expired = [o for o in doc["owners"] if o != SHARED_OWNER and uploaded.get(o, doc["added_at"]) < cutoff]
+            for owner in expired:
+                doc["owners"].remove(owner)
+                uploaded.pop(owner, None)
+            if expired and not doc["owners"]:
+                del manifest["documents"][doc_id]
+                deleted.append(doc_id)
+        return deleted
+
+    def _delete_segments(self, doc_ids):
+        for doc_id in doc_ids:
+            self._segments.pop(doc_id, None)
+            for ext in (".npy", ".json"):
+                try:
+                    os.remove(os.path.join(self.segment_dir, f"{doc_id}{ext}"))
+                except OSError:
+                    pass
+            invalidate_document(doc_id)
+
+    def _update_manifest(self, update):
+        # `update` changes the manifest in place and may return the ids of documents it dropped, whose
+        # segments are deleted before the lock is released: deleting them later could remove a segment
+        # that another process has just re-added the document with.
+        with file_lock(self.manifest_path), self._lock:
+            # Re-read the file so concurrent writers in other processes are not overwritten.
+            self._manifest = None
+            manifest = self._load_manifest()
+            if manifest["embedder"] != embedder_name():
+                self._reindex(manifest)
+            deleted = update(manifest) or []
+            save_json(self.manifest_path, manifest)
+            self._manifest_mtime = os.path.getmtime(self.manifest_path)
+            self._delete_segments(deleted)
+
+    # Segments
+
+    def _write_vectors(self, doc_id, vectors):
+        tmp_path = os.path.join(self.segment_dir, f"{doc_id}.{os.getpid()}.tmp.npy")
+        np.save(tmp_path, vectors)
+        os.replace(tmp_path, os.path.join(self.segment_dir, f"{doc_id}.npy"))
+
+    def _write_segment(self, doc_id, text):
+        chunks = chunk_text(text)
+        save_json(os.path.join(self.segment_dir, f"{doc_id}.json"), chunks)
+        self._write_vectors(doc_id, embed_texts(chunks))
+
+    def _segment(self, doc_id):
+        # Raises FileNotFoundError if another process deleted the document since the manifest was read.
+        if doc_id not in self._segments:
+            vectors = np.load(os.path.join(self.segment_dir, f"{doc_id}.npy"), mmap_mode="r")
+            chunks = load_json(os.path.join(self.segment_dir, f"{doc_id}.json"), default=[])
+            self._segments[doc_id] = (vectors, chunks)
+        return self._segments[doc_id]
+
+    # Documents
+
+    @timed_phase("indexing")
+    def add_document(self, text, title, owner=SHARED_OWNER):
+        """
+        Index a document for `owner`. Documents are keyed by a hash of their text, so adding the same
+        document again (from any session) reuses its segment and only records the new owner.
+        Returns the document id.
+        """
+        doc_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        vectors_path = os.path.join(self.segment_dir, f"{doc_id}.npy")
+        # Embedded outside the lock, so other updates don't wait for it.
+        if not os.path.exists(vectors_path):
+            self._write_segment(doc_id, text)
+
+        def update(manifest):
+            deleted = [d for d in self._expire_owners(manifest, KB_UPLOAD_TTL) if d != doc_id]
+            # Another process may have deleted the segment (its last owner expired) since the check above.
+            if not os.path.exists(vectors_path):
+                self._write_segment(doc_id, text)
+            doc = manifest["documents"].setdefault(doc_id, {"title": title, "owners": [], "added_at": time.time()})
+            if owner not in doc["owners"]:
+                doc["owners"].append(owner)
+            if owner != SHARED_OWNER:
+                doc.setdefault("uploaded_at", {})[owner] = time.time()
+            return deleted
+
+        self._update_manifest(update)
+        return doc_id
+
+    def remove_document(self, doc_id, owner=SHARED_OWNER):
+        """
+        Remove `owner` from a document; the segment and the answers cached from it are deleted
+        once no owner is left. Returns True if the segment was deleted.
+        """
+        deleted = []
+
+        def update(manifest):
+            doc = manifest["documents"].get(doc_id)
+            if doc is None:
+                return
+            if owner in doc["owners"]:
+                doc["owners"].remove(owner)
+                doc.get("uploaded_at", {}).pop(owner, None)
+            if not doc["owners"]:
+                del manifest["documents"][doc_id]
+                deleted.append(doc_id)
+            return deleted
+
+        self._update_manifest(update)
+        return bool(deleted)
+
+    def expire_documents(self, ttl=KB_UPLOAD_TTL):
+        """
+        Release session uploads older than `ttl` seconds and delete documents no owner is left for.
+        Returns the ids of the deleted documents.
+        """
+        deleted = []
+
+        def update(manifest):
+            deleted.extend(self._expire_owners(manifest, ttl))
+            return deleted
+
+        self._update_manifest(update)
+        return deleted
+
+    def list_documents(self, owner=None):
+        """
+        Return {doc_id: title} for the shared documents plus those owned by `owner`.
+        """
+        documents = self._current_manifest()["documents"]
+        return {doc_id: doc["title"] for doc_id, doc in documents.items()
+                if SHARED_OWNER in doc["owners"] or (owner is not None and owner in doc["owners"])}
+
+    @timed_phase("retrieval")
+    def search(self, query, owner=None, doc_ids=None, top_k=5):
+        """
+        Return the `top_k` chunks most similar to `query`, as (doc_id, title, chunk, score) tuples,
+        searching only the documents visible to `owner` (and, if given, only those in `doc_ids`).
+        """
+        visible = self.list_documents(owner)
+        if doc_ids is not None:
+            visible = {d: t for d, t in visible.items() if d in set(doc_ids)}
+        if not visible:
+            return []
+        query_vector = embed_text(query)
+        results = []
+        segments = {}
+        with self._lock:
+            for doc_id in visible:
+                try:
+                    segments[doc_id] = self._segment(doc_id)
+                except FileNotFoundError:
+                    # Deleted by another process: skip it, and re-read the manifest on the next call.
+                    self._segments.pop(doc_id, None)
+                    self._manifest = None
+        for doc_id, (vectors, chunks) in segments.items():
+            # A segment being re-embedded by another process may still have the old dimension.
+            if len(chunks) == 0 or vectors.shape[-1] != query_vector.shape[-1]:
+                continue
+            scores = np.asarray(vectors @ query_vector)
+            best = np.argsort(-scores)[:top_k]
+            results.extend((doc_id, visible[doc_id], chunks[i], float(scores[i])) for i in best)
+        results.sort(key=lambda r: -r[3])
+        return results[:top_k]
+
+
+_knowledge_base = None
+_kb_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    """
+    Return the process-wide KnowledgeBase.
+    """
+    global _knowledge_base
+    with _kb_lock:
+        if _knowledge_base is None:
+            _knowledge_base = KnowledgeBase()
+        return _knowledge_base
+
+def main():
+    from Tutor.pdf_extract import extract_text_from_pdf
+
+    parser = argparse.ArgumentParser(description="Manage the shared course documents of the knowledge base.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Add PDFs as shared documents.")
+    add.add_argument("paths", nargs="+")
+    remove = commands.add_parser("remove", help="Remove a shared document.")
+    remove.add_argument("doc_id")
+    commands.add_parser("list", help="List shared documents.")
+    commands.add_parser("expire", help=f"Delete session uploads older than KB_UPLOAD_TTL ({KB_UPLOAD_TTL:g}s).")
+    args = parser.parse_args()
+
+    kb = get_knowledge_base()
+    if args.command == "add":
+        for path in args.paths:
+            text = extract_text_from_pdf(path)
+            if not text.strip():
+                print(f"Skipped {path}: no text found.")
+                continue
+            title = re.sub(r"\.pdf$", "", os.path.basename(path), flags=re.IGNORECASE)
+            print(f"{kb.add_document(text, title)}  {title}")
+    elif args.command == "remove":
+        print("Removed." if kb.remove_document(args.doc_id) else "Shared owner removed; document still in use.")
+    elif args.command == "expire":
+        print(f"Deleted {len(kb.expire_documents())} expired uploads.")
+    else:
+        for doc_id, title in kb.list_documents().items():
+            print(f"{doc_id}  {title}")
+
+
+if __name__ == "__main__":
+    main()
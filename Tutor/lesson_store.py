@@ -0,0 +1,174 @@
+import os, sys
+import re
+import json
+import zlib
+import hashlib
+import threading
+from collections import OrderedDict
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.storage import cache_path, load_json, save_json, file_lock
+
+# Layout under the cache directory:
+#   lesson_store/objects/ab/<sha256>   zlib-compressed lesson text, named by the hash of its content,
+#                                      so identical lessons are stored once
+#   lesson_store/index/<bucket>.json   for one (topic, subtopic, model): lesson key -> profile signature and
+#                                      content hash
+STORE_DIR = "lesson_store"
+
+# Number of lessons kept decompressed in memory.
+LESSON_CACHE_SIZE = int(os.getenv("LESSON_CACHE_SIZE", "256"))
+# Lessons are matched on the learner's structured profile fields (level, languages, learning goals),
+# not on the generated profile digest, whose wording varies from one generation to the next.
+# A stored lesson for the same level is reused when the overlap (Jaccard) of languages and learning-goal
+# words reaches LESSON_REUSE_THRESHOLD.
+LESSON_REUSE_THRESHOLD = float(os.getenv("LESSON_REUSE_THRESHOLD", "0.6"))
+# Profile fields that personalise a lesson beyond the signature (the learner's name and age, and the
+# personality, tone/hobby, assessment and resume the profile digest is built from). A lesson generated
+# with any of them is only reused for the same values, so one learner never sees another's details;
+# lessons generated without them (see shared_profile) are reused across learners.
+PERSONAL_FIELDS = ["name", "age", "personality", "tone_paragraph", "assessment", "resume_summary"]
+# Words ignored when comparing learning goals.
+GOAL_STOPWORDS = {"a", "an", "and", "the", "to", "of", "in", "on", "for", "with", "my", "i", "me", "want", "would",
+                  "like", "learn", "learning", "be", "become", "get", "better", "how", "about", "more", "is", "it"}
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+
+
+def _words(text):
+    return re.sub(r"[^\w\s+#]", " ", str(text or "").lower()).split()
+
+def profile_signature(profile):
+    """
+    The profile fields a stored lesson is matched on, normalised (case, punctuation, order and duplicates)
+    so trivial differences don't change the key.
+    """
+    languages = profile.get("languages") or ""
+    if isinstance(languages, str):
+        languages = languages.split(",")
+    return {
+        "level": " ".join(_words(profile.get("level"))),
+        "languages": sorted({" ".join(_words(language)) for language in languages} - {""}),
+        "goals": sorted(set(_words(profile.get("learning_goals"))) - GOAL_STOPWORDS),
+        "personal": _personal_hash(profile),
+    }
+
+def _personal_hash(profile):
+    values = {field: str(profile.get(field) or "").strip() for field in PERSONAL_FIELDS}
+    return _hash(values) if any(values.values()) else ""
+
+def shared_profile(profile):
+    """
+    The profile without its PERSONAL_FIELDS, for lessons meant to be shared by several learners
+    (e.g. pre-generated for a cohort).
+    """
+    return {field: value for field, value in profile.items() if field not in PERSONAL_FIELDS}
+
+def signature_similarity(a, b):
+    """
+    0 for different levels, otherwise the Jaccard similarity of the languages and learning-goal words.
+    """
+    if a["level"] != b["level"]:
+        return 0.0
+    features_a = {f"language:{x}" for x in a["languages"]} | {f"goal:{x}" for x in a["goals"]}
+    features_b = {f"language:{x}" for x in b["languages"]} | {f"goal:{x}" for x in b["goals"]}
+    if not features_a and not features_b:
+        return 1.0
+    return len(features_a & features_b) / len(features_a | features_b)
+
+def _hash(*parts):
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+def _bucket_path(topic, subtopic, model):
+    return cache_path(STORE_DIR, "index", f"{_hash(topic.strip().lower(), subtopic.strip().lower(), model)}.json")
+
+def _object_path(content_hash):
+    return cache_path(STORE_DIR, "objects", content_hash[:2], content_hash)
+
+def _lru_get(key):
+    with _lock:
+        if key in _lru:
+            _lru.move_to_end(key)
+            return _lru[key]
+    return None
+
+def _lru_put(key, content):
+    with _lock:
+        _lru[key] = content
+        _lru.move_to_end(key)
+        while len(_lru) > LESSON_CACHE_SIZE:
+            _lru.popitem(last=False)
+
+def _read_object(content_hash):
+    try:
+        with open(_object_path(content_hash), "rb") as f:
+            return zlib.decompress(f.read()).decode("utf-8")
+    except (OSError, zlib.error):
+        return None
+
+def _write_object(content):
+    data = content.encode("utf-8")
+    content_hash = hashlib.sha256(data).hexdigest()
+    path = _object_path(content_hash)
+    if not os.path.exists(path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp_path, path)
+    return content_hash
+
+def store_key(topic, subtopic, signature, model):
+    """
+    Key a stored lesson by (topic, subtopic, profile signature, model).
+    """
+    return _hash(topic.strip().lower(), subtopic.strip().lower(), signature, model)
+
+def load_lesson(topic, subtopic, profile, model):
+    """
+    Return a stored lesson for these parameters, or None if there is none.
+    An exact match on the profile signature is preferred; otherwise the lesson stored for the most
+    similar signature is reused if its similarity reaches LESSON_REUSE_THRESHOLD and it was generated
+    without personal details or with this learner's own.
+    """
+    signature = profile_signature(profile)
+    key = store_key(topic, subtopic, signature, model)
+    content = _lru_get(key)
+    if content is not None:
+        return content
+    entries = load_json(_bucket_path(topic, subtopic, model), default={})
+    entry = entries.get(key)
+    if entry is None:
+        best_score = 0.0
+        for candidate in entries.values():
+            stored = candidate.get("profile")
+            # Lessons stored before personal details were tracked may hold anyone's, so they're skipped.
+            if stored is None or stored.get("personal") not in ("", signature["personal"]):
+                continue
+            score = signature_similarity(signature, stored)
+            if score >= LESSON_REUSE_THRESHOLD and score > best_score:
+                entry, best_score = candidate, score
+    if entry is None:
+        return None
+    content = _read_object(entry["content_hash"])
+    if content is not None:
+        _lru_put(key, content)
+    return content
+
+def save_lesson(topic, subtopic, profile, model, content):
+    """
+    Persist a generated lesson so later requests with the same or a similar profile are served from the store.
+    """
+    signature = profile_signature(profile)
+    key = store_key(topic, subtopic, signature, model)
+    content_hash = _write_object(content)
+    bucket_path = _bucket_path(topic, subtopic, model)
+    # Several server processes may add lessons to the same bucket.
+    with file_lock(bucket_path):
+        entries = load_json(bucket_path, default={})
+        entries[key] = {"topic": topic, "subtopic": subtopic, "model": model,
+                        "profile": signature, "content_hash": content_hash}
+        save_json(bucket_path, entries)
+    _lru_put(key, content)
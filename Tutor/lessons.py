@@ -0,0 +1,56 @@
+import os, sys
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.tokenizer import fit_prompt
+from llm_service.tasks import task_settings
+from llm_service.profiling import timed_phase
+from Tutor.profile_digest import get_profile_digest
+
+# Stored lessons are keyed by model, so lessons always use the task's fixed tier rather than
+# switching tiers with observed latency.
+_lesson_settings = task_settings("lesson")
+LESSON_PROVIDER = _lesson_settings["provider"]
+LESSON_MODEL = _lesson_settings["model"]
+LESSON_TEMPERATURE = _lesson_settings["temperature"]
+
+
+def lesson_key(topic, subtopic):
+    """
+    Key under which a lesson is shown in the session's lesson list.
+    """
+    return f"{topic} - {subtopic}"
+
+@timed_phase("prompt_building")
+def build_lesson_prompt(profile, topic, subtopic, model=LESSON_MODEL):
+    """
+    Build the prompt for a lesson that matches the user's language tone and personality.
+    The prompt incorporates the user's name, age, level and languages plus the profile digest
+    (personality, hobby/tone sample, learning goals and assessment).
+    """
+    languages = profile.get('languages','N/A')
+    # The digest replaces the raw personality, tone sample and assessment text, which are long
+    # and would otherwise be re-sent with every lesson.
+    profile_digest = get_profile_digest(profile)
+    profile_section = (
+        f"Based on the following user profile details:\n"
+        f"Name: {profile.get('name', 'N/A')}\n"
+        f"Age: {profile.get('age', 'N/A')}\n"
+        f"Current Level: {profile.get('level', 'N/A')}\n"
+        f"Languages: {languages}\n"
+    )
+    instructions = (
+        f"Provide a comprehensive lesson on the topic '{topic}' specifically focusing on the subtopic '{subtopic}'. "
+        "The lesson should match the user's language style, include real-life examples related to their hobby, "
+        "and offer actionable recommendations to help the user feel comfortable and engaged in their learning journey. "
+        "Note: The hobby is only for tone reference, while the topics to learn are those provided above. "
+        "If the user mentions being fun loving, include small humour. Also, provide examples, idioms, and proverbs "
+        "in all the specified languages to make the content relatable. Do not add idioms/proverbs/jokes solely for content; "
+        "make it very relatable. In case English is not mentioned in the languages, provide the content in the first language provided. "
+        "Provide detailed explanations and examples to help the user understand the topic better. "
+        "Based on the strengths and weaknesses in the profile digest, design a learning curve appropriate for the user's age."
+    )
+    return fit_prompt([(profile_section, None),
+                       (f"Profile Digest:\n{profile_digest}\n\n", 1),
+                       (instructions, None)], model=model)
@@ -0,0 +1,130 @@
+import os, sys
+import io
+import time
+import shutil
+import hashlib
+import importlib.util
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import PyPDF2  # for extracting text from PDFs
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.storage import cache_path, load_json, save_json
+from llm_service.profiling import timed_phase
+
+# Pages whose extracted text is shorter than this are treated as scanned and sent to OCR.
+MIN_PAGE_TEXT_CHARS = 20
+# OCR is CPU-bound, so it runs in its own small process pool shared by every session.
+OCR_MAX_WORKERS = int(os.getenv("OCR_MAX_WORKERS", str(max(1, min(2, (os.cpu_count() or 1) - 1)))))
+OCR_RENDER_SCALE = 2.0  # ~144 dpi, enough for tesseract on normal-sized print
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+# A failed OCR attempt (e.g. tesseract missing a language pack) is remembered this long, so repeated
+# uploads don't retry it every time, but a fixed installation picks the page up again.
+OCR_FAILURE_TTL = float(os.getenv("OCR_FAILURE_TTL", "3600"))  # seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+_ocr_available = None
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" rather than "fork": the Streamlit/ASGI server that calls us is multi-threaded.
+            _pool = ProcessPoolExecutor(max_workers=OCR_MAX_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def ocr_available():
+    """
+    True if OCR can run here: the optional pypdfium2 and pytesseract packages and the tesseract binary
+    are installed. Checked once per process.
+    """
+    global _ocr_available
+    if _ocr_available is None:
+        _ocr_available = (importlib.util.find_spec("pypdfium2") is not None
+                          and importlib.util.find_spec("pytesseract") is not None
+                          and shutil.which("tesseract") is not None)
+    return _ocr_available
+
+def ocr_page(pdf_path, page_index):
+    """
+    Render one PDF page and OCR it (runs in an OCR worker process).
+    Returns {"text", "status"}: status 'ok' (the text may be empty for a blank page) or 'failed'.
+    """
+    import pypdfium2
+    import pytesseract
+    try:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            image = pdf[page_index].render(scale=OCR_RENDER_SCALE).to_pil()
+            return {"text": pytesseract.image_to_string(image, lang=OCR_LANGUAGE), "status": "ok"}
+        finally:
+            pdf.close()
+    except Exception as e:
+        return {"text": "", "status": "failed", "error": str(e)}
+
+def _read_bytes(pdf_file):
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    if hasattr(pdf_file, "seek"):
+        pdf_file.seek(0)
+    return pdf_file.read()
+
+@timed_phase("pdf_extraction")
+def extract_text_from_pdf(pdf_file, progress=None):
+    """
+    Extract text from a PDF (path or file-like object) using PyPDF2, falling back to OCR for
+    pages without a text layer (scanned pages). Only those pages are OCR'd; their text is
+    cached per (document hash, page), blank pages included, so a re-uploaded document is not OCR'd
+    again. Failed pages are cached for OCR_FAILURE_TTL only. Without OCR support (see ocr_available) such pages are left empty.
+
+    :param pdf_file: Path or file-like object of the PDF.
+    :param progress: Optional callable(done, total) called as OCR pages complete.
+    :return: The document text.
+    """
+    data = _read_bytes(pdf_file)
+    doc_hash = hashlib.sha256(data).hexdigest()
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    page_texts = []
+    missing = []
+    for i, page in enumerate(pdf_reader.pages):
+        text = page.extract_text() or ""
+        if len(text.strip()) < MIN_PAGE_TEXT_CHARS:
+            cached = load_json(cache_path("ocr", doc_hash, f"{i}.json"))
+            if cached is not None and cached["status"] != "ok" and \
+                    time.time() - cached.get("cached_at", 0) > OCR_FAILURE_TTL:
+                cached = None
+            if cached is not None:
+                text = cached["text"] if cached["text"].strip() else text
+            else:
+                missing.append(i)
+        page_texts.append(text)
+
+    if missing and ocr_available():
+        fd, tmp_path = tempfile.mkstemp(suffix=".pdf")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        try:
+            futures = {_get_pool().submit(ocr_page, tmp_path, i): i for i in missing}
+            for done, future in enumerate(as_completed(futures), start=1):
+                i = futures[future]
+                try:
+                    result = future.result()
+                except Exception:
+                    result = None  # the worker died; try again next time
+                if result is not None:
+                    save_json(cache_path("ocr", doc_hash, f"{i}.json"), dict(result, cached_at=time.time()))
+                    if result["text"].strip():
+                        page_texts[i] = result["text"]
+                if progress is not None:
+                    progress(done, len(missing))
+        finally:
+            os.remove(tmp_path)
+    return "".join(page_texts)
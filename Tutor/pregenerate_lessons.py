@@ -0,0 +1,88 @@
+"""
+Pre-generate lessons for every (topic, subtopic) of a curriculum as a batch job.
+
+    python Tutor/pregenerate_lessons.py --curriculum curriculum.json --profile cohort_profile.json \
+        --job-dir jobs/cohort-2025 [--backend openai|local] [--poll-interval 60]
+
+curriculum.json maps each topic to its subtopics, e.g. {"Python": ["Decorators", "Generators"]}.
+cohort_profile.json is a profile dict like the one the landing page builds (level, languages,
+learning_goals, ...). Personal fields (name, age, personality, ...) are ignored, so the lessons can be
+shared by every learner in the cohort. Re-running the same command after a crash resumes the job from --job-dir.
+"""
+import os, sys
+import json
+import argparse
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.batch_runner import BatchJob, BATCH_BACKENDS, DEFAULT_POLL_INTERVAL
+from Tutor.lessons import build_lesson_prompt, LESSON_PROVIDER, LESSON_MODEL, LESSON_TEMPERATURE
+from Tutor.lesson_store import save_lesson, shared_profile
+
+
+def build_requests(curriculum, profile):
+    """
+    Build one batch request per (topic, subtopic), with the lesson each one is for.
+    """
+    requests = []
+    lessons = {}
+    for topic, subtopics in curriculum.items():
+        for subtopic in subtopics:
+            custom_id = f"lesson-{len(requests)}"
+            requests.append({
+                "custom_id": custom_id,
+                "prompt": build_lesson_prompt(profile, topic, subtopic),
+                "provider": LESSON_PROVIDER,
+                "model": LESSON_MODEL,
+                "temperature": LESSON_TEMPERATURE,
+            })
+            lessons[custom_id] = [topic, subtopic]
+    return requests, lessons
+
+def load_results_into_store(job, profile):
+    """
+    Save every successful result of the job into the lesson store.
+    """
+    def on_results(results):
+        saved, failed = 0, 0
+        for custom_id, (content, error) in results.items():
+            topic, subtopic = job.metadata["lessons"][custom_id]
+            if error is None and content:
+                save_lesson(topic, subtopic, profile, LESSON_MODEL, content)
+                saved += 1
+            else:
+                failed += 1
+                print(f"Failed: {topic} - {subtopic}: {error}")
+        print(f"Loaded {saved} lessons into the lesson store ({failed} failed).")
+    return on_results
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate curriculum lessons as a batch job.")
+    parser.add_argument("--curriculum", required=True, help="JSON file mapping topics to subtopics.")
+    parser.add_argument("--profile", required=True, help="JSON file with the cohort profile.")
+    parser.add_argument("--job-dir", required=True, help="Directory holding the job state.")
+    parser.add_argument("--backend", choices=sorted(BATCH_BACKENDS), default="openai")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    with open(args.profile, "r", encoding="utf-8") as f:
+        profile = shared_profile(json.load(f))
+    backend = BATCH_BACKENDS[args.backend]()
+
+    if os.path.exists(os.path.join(args.job_dir, "state.json")):
+        job = BatchJob.load(args.job_dir, backend)
+        print(f"Resuming job in {args.job_dir} (status: {job.status}).")
+    else:
+        with open(args.curriculum, "r", encoding="utf-8") as f:
+            curriculum = json.load(f)
+        requests, lessons = build_requests(curriculum, profile)
+        job = BatchJob.create(args.job_dir, requests, backend, metadata={"lessons": lessons})
+        print(f"Created job with {len(requests)} lesson requests in {args.job_dir}.")
+
+    job.run(on_results=load_results_into_store(job, profile), poll_interval=args.poll_interval)
+    print(f"Job status: {job.status} (provider batches: {', '.join(job.provider_statuses()) or 'none finished'}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os, sys
+import json
+import hashlib
+import threading
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.llm_generator import generate_llm_response, is_llm_error
+from llm_service.tokenizer import approx_tokens, truncate_to_tokens
+from Tutor.storage import cache_path, load_json, save_json
+
+# Profile fields that feed the digest; changing any of them produces a new digest.
+DIGEST_FIELDS = ["personality", "tone_paragraph", "learning_goals", "level", "languages", "topics", "assessment",
+                 "resume_summary"]
+DIGEST_TOKEN_BUDGET = 300
+RESUME_TOKEN_BUDGET = 400
+
+_memory_cache = {}
+_cache_lock = threading.Lock()
+_key_locks = {}
+
+
+def _fingerprint(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def profile_fingerprint(profile):
+    """
+    Hash of the profile fields that the digest is built from.
+    """
+    return _fingerprint({field: profile.get(field, "") for field in DIGEST_FIELDS})
+
+def _cached(kind, key, build):
+    """
+    Look up `key` in the in-memory and on-disk caches, building and storing it on a miss.
+    `build` returns (value, cacheable); failed builds are returned but not stored.
+    """
+    with _cache_lock:
+        if (kind, key) in _memory_cache:
+            return _memory_cache[(kind, key)]
+        # One lock per key, so a background build and a foreground request don't both call the LLM.
+        key_lock = _key_locks.setdefault((kind, key), threading.Lock())
+    with key_lock:
+        with _cache_lock:
+            if (kind, key) in _memory_cache:
+                return _memory_cache[(kind, key)]
+        path = cache_path(kind, f"{key}.json")
+        stored = load_json(path)
+        if stored is not None:
+            value = stored["value"]
+        else:
+            value, cacheable = build()
+            if not cacheable:
+                return value
+            save_json(path, {"value": value})
+        with _cache_lock:
+            _memory_cache[(kind, key)] = value
+            _key_locks.pop((kind, key), None)
+        return value
+
+def compact_text(text, token_budget, purpose):
+    """
+    Summarise `text` to fit within `token_budget` tokens, keeping what matters for `purpose`.
+    Text already within budget is returned unchanged; summaries are cached by content hash.
+    """
+    if approx_tokens(text) <= token_budget:
+        return text
+
+    def build():
+        prompt = (
+            f"Condense the following text to at most {int(token_budget * 0.75)} words. "
+            f"Keep only the information that is useful for {purpose}. "
+            "Use terse bullet points and do not add anything that is not in the text.\n\n"
+            f"{text}"
+        )
+        summary = generate_llm_response(prompt, task="digest")
+        if is_llm_error(summary):
+            return truncate_to_tokens(text, token_budget), False
+        return truncate_to_tokens(summary, token_budget), True
+
+    return _cached("compacted_text", _fingerprint(text, token_budget, purpose), build)
+
+def get_profile_digest(profile, token_budget=DIGEST_TOKEN_BUDGET):
+    """
+    Return a compact digest of the learner's profile for use in downstream prompts.
+    The digest is generated once per distinct profile (see profile_fingerprint) and cached,
+    so it only changes when the profile does.
+    """
+    def build():
+        details = "\n".join(f"{field}: {profile.get(field, 'N/A')}" for field in DIGEST_FIELDS)
+        prompt = (
+            "Write a compact learner profile digest from the profile details below, "
+            f"in at most {int(token_budget * 0.75)} words of terse bullet points. Cover:\n"
+            "- personality traits relevant to teaching them (e.g. whether they enjoy humour)\n"
+            "- their tone and language style, and the hobby used for examples\n"
+            "- learning goals, current level and languages\n"
+            "- key strengths and weaknesses from the assessment\n"
+            "- relevant experience and skills from the resume summary, if any\n\n"
+            f"{details}"
+        )
+        digest = generate_llm_response(prompt, task="digest")
+        if is_llm_error(digest):
+            # Fall back to the raw fields, trimmed to the budget, without caching the failure.
+            return truncate_to_tokens(details, token_budget), False
+        return truncate_to_tokens(digest, token_budget), True
+
+    return _cached("profile_digests", f"{profile_fingerprint(profile)}-{token_budget}", build)
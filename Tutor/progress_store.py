@@ -0,0 +1,289 @@
+import os, sys
+import json
+import time
+import queue
+import sqlite3
+import threading
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.storage import cache_path
+
+# Learner progress (profiles, lessons, exercise attempts, interviews and their per-question evaluations) in an
+# embedded SQLite database. Writes are queued and applied by one writer thread in batched
+# transactions, so request threads never wait on disk; reads use their own connections
+# (WAL mode lets them run while the writer is committing).
+PROGRESS_DB_PATH = os.getenv("INSIGHTSLIB_PROGRESS_DB") or cache_path("progress.db")
+# Profile fields stored by record_profile.
+PROFILE_FIELDS = ["level", "topics"]
+# Maximum number of queued writes applied in one transaction.
+WRITE_BATCH_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profiles (
+    profile_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    level TEXT,
+    topics TEXT,
+    profile_json TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS profiles_by_user ON profiles(user_id, created_at);
+CREATE TABLE IF NOT EXISTS lessons (
+    lesson_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    topic TEXT NOT NULL,
+    subtopic TEXT NOT NULL,
+    model TEXT,
+    viewed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lessons_by_user ON lessons(user_id, viewed_at);
+CREATE INDEX IF NOT EXISTS lessons_by_topic ON lessons(topic, subtopic);
+CREATE TABLE IF NOT EXISTS exercise_attempts (
+    attempt_id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    topic TEXT NOT NULL,
+    subtopic TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    status TEXT NOT NULL,
+    tests_passed INTEGER NOT NULL,
+    tests_total INTEGER NOT NULL,
+    submitted_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS exercise_attempts_by_user ON exercise_attempts(user_id, submitted_at);
+CREATE TABLE IF NOT EXISTS interview_sessions (
+    interview_id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    difficulty TEXT NOT NULL,
+    behavior TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    average_score REAL
+);
+CREATE INDEX IF NOT EXISTS interviews_by_user ON interview_sessions(user_id, started_at);
+CREATE TABLE IF NOT EXISTS interview_subtopics (
+    interview_id TEXT NOT NULL REFERENCES interview_sessions(interview_id),
+    subtopic TEXT NOT NULL,
+    PRIMARY KEY (interview_id, subtopic)
+);
+CREATE INDEX IF NOT EXISTS interview_subtopics_by_subtopic ON interview_subtopics(subtopic, interview_id);
+CREATE TABLE IF NOT EXISTS evaluations (
+    evaluation_id INTEGER PRIMARY KEY,
+    interview_id TEXT NOT NULL REFERENCES interview_sessions(interview_id),
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    question_index INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    subtopic TEXT,
+    answer TEXT,
+    difficulty TEXT NOT NULL,
+    behavior TEXT NOT NULL,
+    score REAL,
+    feedback TEXT,
+    created_at REAL NOT NULL,
+    UNIQUE (interview_id, question_index)
+);
+CREATE INDEX IF NOT EXISTS evaluations_by_user ON evaluations(user_id, created_at);
+CREATE INDEX IF NOT EXISTS evaluations_by_settings ON evaluations(difficulty, behavior);
+"""
+# Columns added after a table was first released: (table, column, definition). Added to existing
+# databases on start-up.
+MIGRATIONS = [
+    ("evaluations", "subtopic", "TEXT"),
+]
+# Created after the migrations, since they may index migrated columns.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS evaluations_by_subtopic ON evaluations(subtopic, created_at);
+"""
+
+
+def _connect(path):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class ProgressStore:
+    """
+    Write-behind store of learner progress. The record_* methods return immediately; flush() waits
+    until everything queued so far is on disk. The query methods read committed data.
+    """
+
+    def __init__(self, path=PROGRESS_DB_PATH):
+        self.path = path
+        with _connect(path) as connection:
+            connection.executescript(SCHEMA)
+            for table, column, definition in MIGRATIONS:
+                columns = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            connection.executescript(INDEXES)
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        threading.Thread(target=self._write_loop, name="progress-writer", daemon=True).start()
+
+    # Writes
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    for sql, params in batch:
+                        connection.execute(sql, params)
+            except sqlite3.Error as e:
+                # One bad write must not lose the rest of the batch.
+                print(f"Progress store: batch write failed ({e}); retrying writes one by one.")
+                for sql, params in batch:
+                    try:
+                        with connection:
+                            connection.execute(sql, params)
+                    except sqlite3.Error as e:
+                        print(f"Progress store: dropped write ({e}).")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, sql, params):
+        self._queue.put((sql, params))
+
+    def flush(self):
+        """
+        Block until every queued write has been committed.
+        """
+        self._queue.join()
+
+    def record_user(self, user_id, name=None):
+        now = time.time()
+        self._write("INSERT INTO users (user_id, name, created_at, last_seen_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET name = COALESCE(excluded.name, users.name), "
+                    "last_seen_at = excluded.last_seen_at",
+                    (user_id, name, now, now))
+
+    def record_profile(self, user_id, profile):
+        # Only the fields the timeline and analytics use are kept; the learner's name, age, personality,
+        # resume and the like stay in their session.
+        stored = {field: profile.get(field) for field in PROFILE_FIELDS}
+        self.record_user(user_id)
+        self._write("INSERT INTO profiles (user_id, level, topics, profile_json, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, profile.get("level"), profile.get("topics"), json.dumps(stored), time.time()))
+
+    def record_lesson(self, user_id, topic, subtopic, model=None):
+        self.record_user(user_id)
+        self._write("INSERT INTO lessons (user_id, topic, subtopic, model, viewed_at) VALUES (?, ?, ?, ?, ?)",
+                    (user_id, topic, subtopic, model, time.time()))
+
+    def record_exercise_attempt(self, user_id, topic, subtopic, exercise, status, tests_passed, tests_total):
+        self.record_user(user_id)
+        self._write("INSERT INTO exercise_attempts (user_id, topic, subtopic, exercise, status, tests_passed, "
+                    "tests_total, submitted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (user_id, topic, subtopic, exercise, status, tests_passed, tests_total, time.time()))
+
+    def start_interview(self, interview_id, user_id, difficulty, behavior, subtopics):
+        self.record_user(user_id)
+        self._write("INSERT INTO interview_sessions (interview_id, user_id, difficulty, behavior, started_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (interview_id, user_id, difficulty, behavior, time.time()))
+        for subtopic in set(subtopics):
+            self._write("INSERT OR IGNORE INTO interview_subtopics (interview_id, subtopic) VALUES (?, ?)",
+                        (interview_id, subtopic))
+
+    def record_evaluation(self, interview_id, user_id, question_index, question, answer, difficulty, behavior,
+                          score, feedback, subtopic=None):
+        self._write("INSERT OR REPLACE INTO evaluations (interview_id, user_id, question_index, question, subtopic, "
+                    "answer, difficulty, behavior, score, feedback, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (interview_id, user_id, question_index, question, subtopic, answer, difficulty, behavior,
+                     score, feedback, time.time()))
+
+    def finish_interview(self, interview_id, average_score):
+        self._write("UPDATE interview_sessions SET finished_at = ?, average_score = ? WHERE interview_id = ?",
+                    (time.time(), average_score, interview_id))
+
+    # Queries
+
+    def reader(self):
+        """
+        This thread's read connection to the database (e.g. for pandas.read_sql_query).
+        """
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = _connect(self.path)
+        return self._local.connection
+
+    def query(self, sql, params=()):
+        """
+        Run a read-only query and return its rows as dicts.
+        """
+        return [dict(row) for row in self.reader().execute(sql, params).fetchall()]
+
+    def has_user(self, user_id):
+        """
+        True if anything has been recorded for the user (queued writes included, once applied).
+        """
+        return bool(self.query("SELECT 1 FROM users WHERE user_id = ?", (user_id,)))
+
+    def user_timeline(self, user_id, limit=100):
+        """
+        The user's most recent lessons, exercise attempts and interviews, newest first.
+        An exercise attempt's score is the fraction of its tests that passed.
+        """
+        return self.query(
+            "SELECT 'lesson' AS kind, topic || ' - ' || subtopic AS title, NULL AS score, viewed_at AS at "
+            "FROM lessons WHERE user_id = ? "
+            "UNION ALL "
+            "SELECT 'exercise', subtopic || ' - ' || exercise, CAST(tests_passed AS REAL) / MAX(tests_total, 1), "
+            "submitted_at FROM exercise_attempts WHERE user_id = ? "
+            "UNION ALL "
+            "SELECT 'interview', difficulty || ' / ' || behavior, average_score, started_at "
+            "FROM interview_sessions WHERE user_id = ? "
+            "ORDER BY at DESC LIMIT ?",
+            (user_id, user_id, user_id, limit))
+
+    def subtopic_scores(self, since=0.0):
+        """
+        Per-subtopic interview aggregates: number of learners and answers, and the average score.
+        Each answer counts only for the subtopic its question tested.
+        """
+        return self.query(
+            "SELECT subtopic, COUNT(DISTINCT user_id) AS learners, COUNT(score) AS answers, "
+            "AVG(score) AS average_score "
+            "FROM evaluations WHERE created_at >= ? AND subtopic IS NOT NULL "
+            "GROUP BY subtopic ORDER BY average_score",
+            (since,))
+
+    def topic_lesson_counts(self):
+        """
+        Number of lessons and distinct learners per topic and subtopic.
+        """
+        return self.query(
+            "SELECT topic, subtopic, COUNT(*) AS lessons, COUNT(DISTINCT user_id) AS learners "
+            "FROM lessons GROUP BY topic, subtopic ORDER BY lessons DESC")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_progress_store():
+    """
+    Return the process-wide ProgressStore.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProgressStore()
+        return _store
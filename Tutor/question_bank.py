@@ -0,0 +1,203 @@
+import os, sys
+import re
+import random
+import threading
+from pydantic import BaseModel
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.llm_generator import generate_llm_json, is_llm_error
+from Tutor.storage import cache_path, load_json, save_json
+from Tutor.background import submit_background
+
+
+class interviewQuestion(BaseModel):
+    question: str
+    subtopic: str
+
+
+class interviewQuestions(BaseModel):
+    questions: list[interviewQuestion]
+
+
+QUESTIONS_PER_INTERVIEW = 5
+# Each generation asks for more questions than one interview needs so repeated
+# interviews on the same subtopics draw a different selection.
+QUESTIONS_PER_GENERATION = 10
+# The bank entry is topped up in the background once fewer questions than this are left that a learner
+# has not been asked yet, so their next interview can still be drawn from it.
+BANK_REFILL_THRESHOLD = 2 * QUESTIONS_PER_INTERVIEW
+# Entries are not topped up beyond this many questions.
+MAX_QUESTIONS_PER_ENTRY = 200
+
+BANK_FILE = "question_bank.json"
+
+_bank = None
+_bank_mtime = None
+_bank_lock = threading.Lock()
+_in_flight = set()
+
+
+def bank_key(subtopics, difficulty, behavior):
+    """
+    Key a set of questions by (subtopic set, difficulty, behavior).
+    The subtopics are normalised and sorted so their order does not matter.
+    """
+    subtopic_part = "|".join(sorted({s.strip().lower() for s in subtopics if s.strip()}))
+    return f"{difficulty.lower()}::{behavior.lower()}::{subtopic_part}"
+
+def normalize_question(question):
+    """
+    Normalise a question for de-duplication (case, numbering, punctuation and spacing).
+    """
+    question = re.sub(r"^\s*\d+[.)]\s*", "", question)
+    return " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+
+def _as_item(question):
+    # Bank entries are {"question", "subtopic"} dicts; entries stored as plain strings have no subtopic.
+    if isinstance(question, str):
+        return {"question": question, "subtopic": None}
+    return {"question": question["question"], "subtopic": question.get("subtopic")}
+
+def _merge_entries(bank, other):
+    # Add the questions of `other` to `bank`, key by key, skipping duplicates.
+    for key, questions in other.items():
+        entry = bank.setdefault(key, [])
+        seen = {normalize_question(q["question"]) for q in entry}
+        for q in map(_as_item, questions):
+            if normalize_question(q["question"]) not in seen:
+                entry.append(q)
+                seen.add(normalize_question(q["question"]))
+
+def _bank_path():
+    # Resolved on use rather than at import, so importing the module doesn't create the cache directory.
+    return cache_path(BANK_FILE)
+
+def _load_bank():
+    # The bank file is shared between processes: merge in what others wrote since it was last read.
+    global _bank, _bank_mtime
+    try:
+        mtime = os.path.getmtime(_bank_path())
+    except OSError:
+        mtime = None
+    if _bank is None:
+        _bank = {}
+    if mtime != _bank_mtime:
+        _merge_entries(_bank, load_json(_bank_path(), default={}))
+        _bank_mtime = mtime
+    return _bank
+
+def add_questions(key, questions):
+    """
+    Merge new questions ({"question", "subtopic"} dicts, or plain strings) into the bank entry for `key`,
+    skipping duplicates, and persist the bank. Returns the number of questions actually added.
+    """
+    global _bank_mtime
+    with _bank_lock:
+        bank = _load_bank()
+        entry = bank.setdefault(key, [])
+        seen = {normalize_question(q["question"]) for q in entry}
+        added = 0
+        for q in map(_as_item, questions):
+            q["question"] = re.sub(r"^\s*\d+[.)]\s*", "", q["question"]).strip()
+            norm = normalize_question(q["question"])
+            if norm and norm not in seen and not is_llm_error(q["question"]):
+                entry.append(q)
+                seen.add(norm)
+                added += 1
+        if added:
+            # Merge once more right before writing, so questions another process saved meanwhile are kept.
+            _merge_entries(bank, load_json(_bank_path(), default={}))
+            save_json(_bank_path(), bank)
+            _bank_mtime = os.path.getmtime(_bank_path())
+        return added
+
+def draw_questions(subtopics, difficulty, behavior, count=QUESTIONS_PER_INTERVIEW, exclude=(), focus_terms=()):
+    """
+    Randomly draw `count` questions ({"question", "subtopic"} dicts) from the bank, or return None if the
+    bank cannot supply them. Questions in `exclude` (question texts, e.g. ones already asked) are never
+    drawn. Questions mentioning any of `focus_terms` (e.g. skills from the learner's resume) are drawn
+    before the others.
+    """
+    excluded = {normalize_question(q) for q in exclude}
+    terms = [normalize_question(t) for t in focus_terms if normalize_question(t)]
+    with _bank_lock:
+        entry = _load_bank().get(bank_key(subtopics, difficulty, behavior), [])
+        entry = [dict(q) for q in entry if normalize_question(q["question"]) not in excluded]
+    if len(entry) < count:
+        return None
+    focused = [q for q in entry if any(f" {t} " in f" {normalize_question(q['question'])} " for t in terms)]
+    focused = random.sample(focused, min(count, len(focused)))
+    rest = [q for q in entry if q not in focused]
+    questions = focused + random.sample(rest, count - len(focused))
+    random.shuffle(questions)
+    return questions
+
+def generate_questions(subtopics, difficulty, behavior, count=QUESTIONS_PER_GENERATION):
+    """
+    Generate interview questions for the given subtopics with the LLM.
+    Returns a list of {"question", "subtopic"} dicts (empty if the call failed); the subtopic is one of
+    `subtopics`, or None if the model named none of them.
+    """
+    subtopic_list = "\n".join(f"- {s}" for s in subtopics)
+    prompt = (
+        f"Based on the following subtopics:\n{subtopic_list}\n\n"
+        f"Generate {count} distinct interview questions for a candidate based on the above topics. "
+        f"The questions should be of {difficulty} difficulty and the interviewer should be {behavior}. "
+        "The questions should test the candidate's understanding of the topics, their ability to apply the concepts to real-world scenarios, "
+        "The questions should be challenging but not overly complex based on the difficulty preference. "
+        "The questions should also test the candidate's problem-solving skills, creativity, and ability to think on their feet. "
+        "Spread the questions across all of the subtopics, and give with each question the subtopic it tests, "
+        "exactly as written in the list above."
+    )
+    response = generate_llm_json(prompt, interviewQuestions, task="questions")
+    if not isinstance(response, interviewQuestions):
+        return []
+    by_name = {s.strip().lower(): s for s in subtopics}
+    return [{"question": q.question, "subtopic": by_name.get(q.subtopic.strip().lower())}
+            for q in response.questions if q.question.strip()]
+
+def _fill_bank(key, subtopics, difficulty, behavior):
+    try:
+        add_questions(key, generate_questions(subtopics, difficulty, behavior))
+    finally:
+        with _bank_lock:
+            _in_flight.discard(key)
+
+def prefetch_questions(subtopics, difficulty, behavior, exclude=()):
+    """
+    Top up the bank entry for these settings in the background when fewer than BANK_REFILL_THRESHOLD of
+    its questions are left outside `exclude` (question texts the learner has already been asked).
+    Safe to call on every rerun: it does nothing when enough are left, the entry has reached
+    MAX_QUESTIONS_PER_ENTRY, or it is already being generated.
+    """
+    subtopics = [s for s in subtopics if s.strip()]
+    if not subtopics:
+        return
+    key = bank_key(subtopics, difficulty, behavior)
+    excluded = {normalize_question(q) for q in exclude}
+    with _bank_lock:
+        entry = _load_bank().get(key, [])
+        unused = sum(1 for q in entry if normalize_question(q["question"]) not in excluded)
+        if key in _in_flight or unused >= BANK_REFILL_THRESHOLD or len(entry) >= MAX_QUESTIONS_PER_ENTRY:
+            return
+        _in_flight.add(key)
+    submit_background(_fill_bank, key, list(subtopics), difficulty, behavior)
+
+def get_interview_questions(subtopics, difficulty, behavior, count=QUESTIONS_PER_INTERVIEW, focus_terms=(),
+                            exclude=()):
+    """
+    Draw interview questions ({"question", "subtopic"} dicts) from the bank, generating them live only on a miss.
+    Questions in `exclude` (ones the learner was already asked) are only repeated if the bank has too few
+    others. The entry is then topped up in the background if the learner is running out of new questions.
+    """
+    questions = draw_questions(subtopics, difficulty, behavior, count, exclude=exclude, focus_terms=focus_terms)
+    if questions is None:
+        generated = generate_questions(subtopics, difficulty, behavior)
+        add_questions(bank_key(subtopics, difficulty, behavior), generated)
+        questions = (draw_questions(subtopics, difficulty, behavior, count, exclude=exclude, focus_terms=focus_terms)
+                     or draw_questions(subtopics, difficulty, behavior, count, focus_terms=focus_terms)
+                     or generated[:count])
+    prefetch_questions(subtopics, difficulty, behavior, exclude=list(exclude) + [q["question"] for q in questions])
+    return questions
@@ -0,0 +1,82 @@
+import os, sys
+import hashlib
+import threading
+from pydantic import BaseModel
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.llm_generator import generate_llm_json
+from Tutor.storage import cache_path, load_json, save_json
+
+
+class resumeRole(BaseModel):
+    title: str
+    organization: str
+    years: float
+
+
+class resumeEducation(BaseModel):
+    degree: str
+    institution: str
+    year: str
+
+
+class resumeProfile(BaseModel):
+    skills: list[str]
+    roles: list[resumeRole]
+    education: list[resumeEducation]
+    years_experience: float
+
+
+MAX_SUMMARY_SKILLS = 25
+
+_memory_cache = {}
+_cache_lock = threading.Lock()
+
+
+def resume_hash(resume_text):
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()
+
+def parse_resume(resume_text):
+    """
+    Extract a resumeProfile from raw resume text with one structured LLM call.
+    Results are cached by the hash of the text, so each resume is parsed once.
+    Returns None if the resume could not be parsed.
+    """
+    key = resume_hash(resume_text)
+    with _cache_lock:
+        if key in _memory_cache:
+            return _memory_cache[key]
+    path = cache_path("resumes", f"{key}.json")
+    stored = load_json(path)
+    if stored is not None:
+        parsed = resumeProfile.model_validate(stored)
+    else:
+        prompt = (
+            "Extract the following from the resume below: the candidate's skills (technologies, tools and "
+            "methods, each as a short name), their roles (title, organization and years spent in the role), "
+            "their education (degree, institution and graduation year) and their total years of professional "
+            "experience. Only include information stated in the resume.\n\n"
+            f"{resume_text}"
+        )
+        parsed = generate_llm_json(prompt, resumeProfile, task="resume")
+        if not isinstance(parsed, resumeProfile):
+            return None
+        save_json(path, parsed.model_dump())
+    with _cache_lock:
+        _memory_cache[key] = parsed
+    return parsed
+
+def format_resume_summary(resume):
+    """
+    Render a resumeProfile as a compact block of text for prompts.
+    """
+    lines = [f"Years of experience: {resume.years_experience:g}"]
+    if resume.skills:
+        lines.append("Skills: " + ", ".join(resume.skills[:MAX_SUMMARY_SKILLS]))
+    if resume.roles:
+        lines.append("Roles: " + "; ".join(f"{r.title} at {r.organization} ({r.years:g} yrs)" for r in resume.roles))
+    if resume.education:
+        lines.append("Education: " + "; ".join(f"{e.degree}, {e.institution} {e.year}".strip() for e in resume.education))
+    return "\n".join(lines)
@@ -0,0 +1,302 @@
+import os, sys
+import io
+import json
+import time
+import queue
+import select
+import signal
+import tempfile
+import linecache
+import importlib
+import threading
+import traceback
+import subprocess
+from concurrent.futures import Future
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Runs learner code for the lesson exercises. A fixed pool of worker processes is started once
+# and kept warm (interpreter up, common modules imported). Each submission runs in a child that
+# its worker forks, so it starts in milliseconds, cannot affect later submissions, and runs under
+# CPU, memory, file-size and process limits plus a wall-clock timeout.
+# Workers start with a minimal environment (SANDBOX_ENV), so the app's secrets (API keys loaded from
+# .env) never reach them or the submissions.
+# This isolates runs from each other and from the app's resources, but is not a security boundary:
+# submissions can still read files and open sockets as the app's user. Deployments serving
+# untrusted learners should run the app (or this pool) in a locked-down container.
+# Grades are practice feedback, not a trusted result: the submission runs in the same process as the
+# tests, so it can make them pass (e.g. by returning an object that equals anything).
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", str(max(1, min(4, os.cpu_count() or 1)))))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "2"))
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "256"))
+SANDBOX_TIMEOUT = float(os.getenv("SANDBOX_TIMEOUT", "5"))  # wall clock, seconds
+SANDBOX_MAX_OUTPUT = 10000  # characters of printed output kept per run
+SANDBOX_MAX_FILE_BYTES = 1 << 20
+
+SANDBOX_ENV = {"PATH": "/usr/local/bin:/usr/bin:/bin", "HOME": tempfile.gettempdir(), "LANG": "C.UTF-8"}
+ROOT_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+WORKER_COMMAND = ("import sys; sys.path.insert(0, sys.argv[1]); "
+                  "from Tutor.sandbox import _worker_main; _worker_main(sys.argv[2])")
+# waitid(WNOWAIT) is missing on macOS before Python 3.13.
+HAS_WAITID = all(hasattr(os, name) for name in ("waitid", "WNOWAIT", "CLD_KILLED", "CLD_DUMPED"))
+
+# Imported by every worker at start-up, so submissions using them don't pay for the import.
+PREIMPORTED_MODULES = ["collections", "itertools", "functools", "math", "re", "json", "string", "random",
+                       "dataclasses", "typing", "heapq", "bisect", "statistics", "datetime", "operator", "copy"]
+
+
+def _limit_resources(limits):
+    settings = [
+        ("RLIMIT_CPU", (limits["cpu_seconds"], limits["cpu_seconds"] + 1)),
+        ("RLIMIT_AS", (limits["memory_mb"] << 20,) * 2),
+        ("RLIMIT_FSIZE", (SANDBOX_MAX_FILE_BYTES,) * 2),
+        ("RLIMIT_NPROC", (0, 0)),
+        ("RLIMIT_CORE", (0, 0)),
+    ]
+    for name, value in settings:
+        if hasattr(resource, name):
+            try:
+                resource.setrlimit(getattr(resource, name), value)
+            except (ValueError, OSError):
+                pass
+
+def _format_error():
+    # The traceback of the exception being handled, limited to the learner's code and the tests.
+    exc_type, exc, tb = sys.exc_info()
+    frames = [f for f in traceback.extract_tb(tb) if f.filename in ("<submission>", "<test>")]
+    lines = traceback.format_exception_only(exc_type, exc)
+    if frames:
+        lines = ["Traceback (most recent call last):\n"] + traceback.format_list(frames) + lines
+    return "".join(lines)
+
+def _execute(code, tests, max_output):
+    # Runs in the forked child: execute the submission, then each test in its namespace.
+    # The source goes into linecache so tracebacks can show the learner's lines.
+    linecache.cache["<submission>"] = (len(code), None, code.splitlines(True), "<submission>")
+    output = io.StringIO()
+    sys.stdout = sys.stderr = output
+    namespace = {"__name__": "__main__"}
+    result = {"status": None, "tests": [], "error": None}
+    try:
+        exec(compile(code, "<submission>", "exec"), namespace)
+    except MemoryError:
+        result["status"], result["error"] = "memory_limit", "The submission ran out of memory."
+    except BaseException:
+        result["status"], result["error"] = "error", _format_error()
+    else:
+        for test in tests:
+            try:
+                exec(compile(test, "<test>", "exec"), namespace)
+                passed, message = True, None
+            except AssertionError as e:
+                passed, message = False, str(e) or "Assertion failed."
+            except MemoryError:
+                passed, message = False, "Ran out of memory."
+            except BaseException as e:
+                passed, message = False, f"{type(e).__name__}: {e}"
+            result["tests"].append({"test": test, "passed": passed, "message": message})
+    result["output"] = output.getvalue()[:max_output]
+    return result
+
+def _run_job(job, limits, protocol):
+    # Runs in a worker: fork a child for the submission and collect its result within the timeout.
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            os.close(read_fd)
+            for stream in protocol:
+                stream.close()
+            # Own process group, so anything the submission starts is killed with it.
+            os.setpgid(0, 0)
+            _limit_resources(limits)
+            data = json.dumps(_execute(job["code"], job["tests"], limits["max_output"])).encode()
+            with os.fdopen(write_fd, "wb") as pipe:
+                pipe.write(data)
+        except BaseException:
+            exit_code = 1
+        os._exit(exit_code)
+
+    os.close(write_fd)
+    chunks, timed_out = [], False
+    deadline = start + limits["timeout"]
+    with os.fdopen(read_fd, "rb") as pipe:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                timed_out = True
+                break
+            ready, _, _ = select.select([pipe], [], [], remaining)
+            if ready:
+                data = os.read(pipe.fileno(), 1 << 16)
+                if not data:
+                    break
+                chunks.append(data)
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    if HAS_WAITID:
+        # Read how the child ended before the clean-up kill below, without reaping it yet: reaping first
+        # would let its process group id be reused by the time we kill the group.
+        ended = os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        signum = ended.si_status if ended.si_code in (os.CLD_KILLED, os.CLD_DUMPED) else None
+        _kill_group(pid)
+        _, _, usage = os.wait4(pid, 0)
+    else:
+        # Reap first: the group id could only be reused if every process in the group exited and a new
+        # one took the id in the moment between the two calls.
+        _, status, usage = os.wait4(pid, 0)
+        signum = os.WTERMSIG(status) if os.WIFSIGNALED(status) else None
+        _kill_group(pid)
+
+    result = None
+    if timed_out:
+        result = {"status": "timeout", "error": f"The submission ran longer than {limits['timeout']:g} seconds."}
+    elif signum == signal.SIGXCPU or (
+            signum == signal.SIGKILL and usage.ru_utime + usage.ru_stime >= limits["cpu_seconds"]):
+        # SIGXCPU at the soft CPU limit; SIGKILL at the hard one, a second later, if SIGXCPU was ignored
+        # (rusage can read a little under the hard limit, so compare with the soft one). Our own kill
+        # only follows a timeout, handled above.
+        result = {"status": "cpu_limit",
+                  "error": f"The submission used more than {limits['cpu_seconds']} seconds of CPU time."}
+    elif chunks:
+        try:
+            result = json.loads(b"".join(chunks))
+        except ValueError:
+            result = None
+    if not isinstance(result, dict):
+        result = {"status": "error", "error": "The submission exited without finishing."}
+    return _finish(result, len(job["tests"]), start)
+
+def _kill_group(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+def _finish(result, n_tests, start):
+    # 'passed' or 'failed' is derived here from the per-test results rather than taken from the child,
+    # which only reports the failures it detects itself. This stops a submission from simply claiming a
+    # pass, but the per-test results still come from the child, so the grade remains untrusted.
+    tests = [t for t in result.get("tests") or [] if isinstance(t, dict)]
+    status = result.get("status")
+    if status not in ("error", "timeout", "cpu_limit", "memory_limit"):
+        passed = len(tests) == n_tests and all(t.get("passed") is True for t in tests)
+        status = "passed" if passed else "failed"
+    return {"status": status, "tests": tests, "output": str(result.get("output") or ""),
+            "error": result.get("error"), "seconds": time.perf_counter() - start}
+
+def _worker_main(limits):
+    # Entry point of a pool worker process: one JSON job per line on stdin, one JSON result per line
+    # on stdout.
+    limits = json.loads(limits)
+    for name in PREIMPORTED_MODULES:
+        importlib.import_module(name)
+    # Move the job and result streams off fds 0 and 1, so nothing a submission writes can reach them.
+    jobs, results = os.fdopen(os.dup(0), "rb"), os.fdopen(os.dup(1), "wb")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    for line in jobs:
+        result = _run_job(json.loads(line), limits, (jobs, results))
+        results.write(json.dumps(result).encode() + b"\n")
+        results.flush()
+
+
+class SandboxPool:
+    """
+    A pool of warm sandbox worker processes. submit() queues a submission and returns a Future whose
+    result is a dict: status ('passed', 'failed', 'error', 'timeout', 'cpu_limit' or 'memory_limit'),
+    tests (one {'test', 'passed', 'message'} per test), output, error and seconds. 'passed' means the
+    tests passed as run next to the submission; it is feedback for the learner, not a trusted grade.
+    """
+
+    def __init__(self, workers=SANDBOX_WORKERS, cpu_seconds=SANDBOX_CPU_SECONDS, memory_mb=SANDBOX_MEMORY_MB,
+                 timeout=SANDBOX_TIMEOUT, max_output=SANDBOX_MAX_OUTPUT):
+        if resource is None or not hasattr(os, "fork"):
+            raise RuntimeError("The code sandbox needs a POSIX system (fork and resource limits).")
+        self.limits = {"cpu_seconds": cpu_seconds, "memory_mb": memory_mb, "timeout": timeout,
+                       "max_output": max_output}
+        self._jobs = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._statuses = {}
+        self._busy_seconds = 0.0
+        for i in range(workers):
+            threading.Thread(target=self._serve, name=f"sandbox-{i}", daemon=True).start()
+
+    def _start_worker(self):
+        # A fresh interpreter (not a fork of the multi-threaded app server) with only SANDBOX_ENV.
+        return subprocess.Popen([sys.executable, "-I", "-c", WORKER_COMMAND, ROOT_PATH, json.dumps(self.limits)],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                env=SANDBOX_ENV, cwd=tempfile.gettempdir())
+
+    def _serve(self):
+        # One thread per worker process: hand it queued submissions one at a time.
+        process = self._start_worker()
+        while True:
+            job, future = self._jobs.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                process.stdin.write(json.dumps(job).encode() + b"\n")
+                process.stdin.flush()
+                # The worker enforces the timeout itself; this only catches a worker that died or hung.
+                ready, _, _ = select.select([process.stdout], [], [], self.limits["timeout"] + 10)
+                if not ready:
+                    raise TimeoutError("no response")
+                line = process.stdout.readline()
+                if not line:
+                    raise EOFError("worker exited")
+                result = json.loads(line)
+            except (EOFError, OSError, TimeoutError, ValueError) as e:
+                process.kill()
+                process.wait()
+                process = self._start_worker()
+                result = {"status": "error", "error": f"Sandbox worker failed ({e}).", "tests": [], "output": "",
+                          "seconds": 0.0}
+            with self._stats_lock:
+                self._statuses[result["status"]] = self._statuses.get(result["status"], 0) + 1
+                self._busy_seconds += result["seconds"]
+            future.set_result(result)
+
+    def submit(self, code, tests=()):
+        """
+        Queue `code` to run, followed by each test (Python statements, typically asserts) in its namespace.
+        """
+        future = Future()
+        self._jobs.put(({"code": code, "tests": list(tests)}, future))
+        return future
+
+    def run(self, code, tests=()):
+        """
+        Run a submission and wait for its result.
+        """
+        return self.submit(code, tests).result()
+
+    def stats(self):
+        """
+        Number of finished runs per status, their mean duration and the number of queued submissions.
+        """
+        with self._stats_lock:
+            runs = sum(self._statuses.values())
+            return {"runs": runs, "statuses": dict(self._statuses), "queued": self._jobs.qsize(),
+                    "mean_seconds": self._busy_seconds / runs if runs else 0.0}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool():
+    """
+    Return the process-wide SandboxPool, starting its workers on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+        return _pool
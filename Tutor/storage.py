@@ -0,0 +1,71 @@
+import os
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# All persistent tutor data (question bank, lesson store, ...) lives under this directory.
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.getenv("INSIGHTSLIB_CACHE_DIR", os.path.join(root_path, ".insightslib_cache"))
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
+
+def cache_path(*parts):
+    """
+    Build a path inside the cache directory, creating its parent directories.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def load_json(path, default=None):
+    """
+    Load a JSON file, returning `default` if it is missing or unreadable.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(path, data):
+    """
+    Atomically write `data` as JSON, so concurrent readers never see a half-written file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive lock on `path`.lock, so read-modify-write updates of `path` are serialised across
+    threads and processes (e.g. several Uvicorn workers). Without fcntl only threads are serialised.
+    """
+    with _thread_locks_lock:
+        thread_lock = _thread_locks.setdefault(path, threading.Lock())
+    with thread_lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
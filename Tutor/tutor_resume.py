@@ -1,22 +1,23 @@
 import streamlit as st
 from PIL import Image
 import os, sys
-import PyPDF2  # for extracting text from PDFs
-import json
-from pydantic import BaseModel
+import time
 # Adjust the root path and import your custom LLM service
 root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if root_path not in sys.path:
     sys.path.insert(0, root_path)
-from llm_service.llm_generator import generate_llm_response,generate_llm_json
-
-
-class getWeb(BaseModel):
-    pdfs: list[str]
-    articles: list[str]
-    html_links: list[str]
-    courses: list[str]
-    videos: list[str]
+from Tutor.question_bank import prefetch_questions
+from Tutor.pdf_extract import extract_text_from_pdf
+from Tutor.tutor_service import (TutorService, stream_web_resources,
+                                 INTERVIEW_DIFFICULTIES, INTERVIEW_BEHAVIORS)
+from Tutor.lessons import lesson_key
+from Tutor.storage import cache_path
+from llm_service.profiling import (PROFILE_MODE, PROFILE_ALLOW_QUERY, profile_mode, profile_run, profile_section,
+                                   slowest_reruns)
+
+# All tutor logic lives in the headless TutorService; this app is a thin client that passes
+# st.session_state as the learner's session.
+tutor_service = TutorService()
     
 ##############################################
 # Placeholder Functions for Missing Dependencies
@@ -34,45 +35,6 @@ def analyze_formal_wear(image_file):
     """
     return "Attire analysis functionality is not implemented yet."
 
-def extract_text_from_pdf(pdf_file):
-    """
-    Extract text from an uploaded PDF file using PyPDF2.
-    """
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text() or ""
-    return text
-
-def get_web_resources(query):
-    """
-    Use the LLM to generate a list of recommended resources for learning about the given topic.
-    Expected output is a JSON string with keys:
-    'PDFs', 'Articles', 'HTML Links', and 'Courses'.
-    """
-    
-    prompt = (
-        f"Provide a list of recommended resources for learning about '{query}'. "
-        "Include PDF documents, articles, HTML links,online courses and videos. "
-        "Return the result as a JSON dictionary with the keys 'PDFs', 'Articles', 'HTML Links', and 'Courses', "
-        "where each key maps to a list of resource titles or links."
-        "Include a laundary list of resources for the user to explore."
-    )
-    response = generate_llm_json(prompt,getWeb ,provider="openai", model="gpt-4o", temperature=0.7)
-    print(response)
-    try:
-        # Expecting a JSON string as output.
-        resources = response
-    except Exception:
-        resources = {
-            "pdfs": [f"PDF result {i} for query '{query}'" for i in range(1, 4)],
-            "articles": [f"Article result {i} for query '{query}'" for i in range(1, 4)],
-            "html_links": [f"HTML link {i} for query '{query}'" for i in range(1, 4)],
-            "courses": [f"Course result {i} for query '{query}'" for i in range(1, 4)],
-            "videos": [f"Video result {i} for query '{query}'" for i in range(1, 4)]
-        }
-    return resources
-    
 def convert_audio_to_text(audio_file):
     """
     Dummy function to simulate converting audio to text.
@@ -89,8 +51,20 @@ def analyze_video(video_file):
     # process it with a speech-to-text and tone analysis API.
     return "Transcribed text from video with tone analysis."
 
+def ocr_progress_bar():
+    """
+    Return a progress callback for extract_text_from_pdf that shows a progress bar once OCR starts.
+    """
+    bar = None
+    def update(done, total):
+        nonlocal bar
+        if bar is None:
+            bar = st.progress(0.0, text="Reading scanned pages...")
+        bar.progress(done / total, text=f"Reading scanned pages ({done}/{total})...")
+    return update
+
 ##############################################
-# Helper Functions for Dynamic Topics & Lessons
+# Session Wrappers around TutorService
 ##############################################
 
 def generate_dynamic_topics():
@@ -98,130 +72,25 @@ def generate_dynamic_topics():
     Parse the user's topics from the profile and generate subtopics using LLM.
     Store the results in session state.
     """
-    profile = st.session_state.profile
-    topics_str = profile.get("topics", "")
-    topics = [t.strip() for t in topics_str.split(",") if t.strip()]
-    topics_data = {}
-    for topic in topics:
-        prompt = f"Generate 5 relevant subtopics for the learning topic: '{topic}'. Provide them as a comma-separated list."
-        subtopics_str = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
-        # Assume the response is a comma-separated list
-        subtopics = [s.strip() for s in subtopics_str.split(",") if s.strip()]
-        topics_data[topic] = subtopics
-    st.session_state.dynamic_topics = topics_data
+    tutor_service.generate_dynamic_topics(st.session_state)
 
 def generate_lesson_content(topic, subtopic):
     """
-    Generate a lesson that matches the user's language tone and personality.
-    The lesson prompt incorporates details such as the user's personality,
-    hobby/tone sample, learning goals, current level, and languages.
+    Generate a lesson for the current user and add it to the session's lessons.
     """
-    profile = st.session_state.profile
-    languages = profile.get('languages','N/A')
-    profile_assessment = profile.get('assessment','N/A')
-    prompt = (
-        f"Based on the following user profile details:\n"
-        f"Name: {profile.get('name', 'N/A')}\n"
-        f"Personality: {profile.get('personality', 'N/A')}\n"
-        f"Hobby/Tone Sample: {profile.get('tone_paragraph', 'N/A')}\n"
-        f"Learning Goals: {profile.get('learning_goals', 'N/A')}\n"
-        f"Current Level: {profile.get('level', 'N/A')}\n"
-        f"Languages: {languages}\n\n"
-        f"Provide a comprehensive lesson on the topic '{topic}' specifically focusing on the subtopic '{subtopic}'. "
-        "The lesson should match the user's language style, include real-life examples related to their hobby, "
-        "and offer actionable recommendations to help the user feel comfortable and engaged in their learning journey. "
-        "Note: The hobby is only for tone reference, while the topics to learn are those provided above. "
-        "If the user mentions being fun loving, include small humour. Also, provide examples, idioms, and proverbs "
-        "in all the specified languages to make the content relatable. Do not add idioms/proverbs/jokes solely for content; "
-        "make it very relatable. In case English is not mentioned in the languages, provide the content in the first language provided. "
-        "Provide detailed explanations and examples to help the user understand the topic better. "
-        f"Based on the {profile_assessment}, highlight strengths and weaknesses while designing a learning curve appropriate for the user's age."
-    )
-    lesson_content = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
-    # Append the new lesson to the list of lessons in session state.
-    if "lessons" not in st.session_state:
-        st.session_state.lessons = {}
-    st.session_state.lessons[f"{topic} - {subtopic}"] = lesson_content
-    return lesson_content
-
-##############################################
-# Interview Session Functions
-##############################################
+    return tutor_service.generate_lesson(st.session_state, topic, subtopic)
 
 def initialize_interview(subtopics, difficulty, behavior):
     """
-    Initialize an interview session:
-    - Generate a list of interview questions based on the lesson content.
-    - Store the difficulty and interviewer behavior.
-    """
-    profile = st.session_state.profile
-    lesson_context = ""
-    if "lessons" in st.session_state and st.session_state.lessons:
-        # For simplicity, use the first lesson as context.
-        lesson_context = list(st.session_state.lessons.values())[0]
-    prompt = (
-        f"Based on the following subtopics:\n{subtopics}\n\n"
-        "Generate 5 interview questions for a candidate based on the above topics. Does not matter the level of the  "
-        "Return them as a numbered list."
-        f"The questions should be of {difficulty} difficulty and the interviewer should be {behavior}. "
-        "The questions should test the candidate's understanding of the topics, their ability to apply the concepts to real-world scenarios, "
-        "The questions should be challenging but not overly complex based on the user's level and difficulty preference."
-        "The questions should also test the candidate's problem-solving skills, creativity, and ability to think on their feet. "
-    )
-    questions_str = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
-    # Parse questions by splitting on newlines and removing unwanted prefixes.
-    questions = [q.strip() for q in questions_str.split("\n") if q.strip()]
-    # Fallback if the generated list appears to be generic or empty.
-    if not questions or any("Certainly!" in q for q in questions):
-        questions = [
-            "What is one key takeaway from the lesson?",
-            "How would you apply the concepts learned to a real-world scenario?",
-            "Can you explain a challenging aspect of the lesson in your own words?"
-        ]
-    st.session_state.interview_questions = questions
-    st.session_state.current_question_index = 0
-    st.session_state.interview_scores = []
-    st.session_state.interviewer_settings = {
-        "difficulty": st.session_state.get("interview_difficulty", "Medium"),
-        "behavior": st.session_state.get("interview_behavior", "Medium")
-    }
-
-def evaluate_interview_answer(answer, question):
-    """
-    Evaluate the candidate's answer to an interview question.
-    The evaluation should include a score (out of 10) and specific feedback.
+    Start an interview session on the given subtopics.
     """
-    prompt = (
-        f"Interview Question: {question}\n\n"
-        f"Candidate Answer: {answer}\n\n"
-        "Evaluate the candidate's answer on a scale of 1 to 10. "
-        "Provide a brief explanation of what was strong and what could be improved. "
-        "Format the response as: 'Score: X. Feedback: ...'"
-    )
-    evaluation = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
-    return evaluation
+    tutor_service.start_interview(st.session_state, subtopics, difficulty, behavior)
 
 def finalize_interview():
     """
-    Summarize the interview session by calculating an overall score and highlighting strengths and weaknesses.
+    Summarize the interview session once every answer has been evaluated.
     """
-    evaluations = st.session_state.interview_scores
-    scores = []
-    feedbacks = []
-    for eval_text in evaluations:
-        try:
-            score_line = [line for line in eval_text.split("\n") if "Score:" in line][0]
-            score = int(''.join(filter(str.isdigit, score_line)))
-            scores.append(score)
-            feedback_line = [line for line in eval_text.split("\n") if "Feedback:" in line][0]
-            feedbacks.append(feedback_line)
-        except Exception:
-            pass
-    avg_score = sum(scores) / len(scores) if scores else 0
-    summary = f"Final Interview Score: {avg_score:.1f}/10\n\nFeedback Summary:\n"
-    for fb in feedbacks:
-        summary += f"- {fb}\n"
-    return summary
+    return tutor_service.finalize_interview(st.session_state)
 
 ##############################################
 # Page Functions
@@ -236,6 +105,7 @@ def page_landing():
         with st.form("profile_form"):
             st.subheader("Personal Details")
             name = st.text_input("What is your name?")
+            email = st.text_input("Your email (optional; keeps your progress across visits)")
             age = st.number_input("What is your age?", min_value=0, max_value=100, step=1)
             country = st.text_input("Which country do you live in?")
             languages = st.text_input("Which languages are you comfortable in? (Separate by commas)")
@@ -272,9 +142,13 @@ def page_landing():
                 }
                 # If a resume was uploaded, extract its text and store it.
                 if resume_file is not None:
-                    resume_text = extract_text_from_pdf(resume_file)
+                    resume_text = extract_text_from_pdf(resume_file, progress=ocr_progress_bar())
                     profile_data["resume_text"] = resume_text
-                st.session_state.profile = profile_data
+                if email.strip():
+                    # Kept in the URL too, so a bookmark or reload continues the same learner's progress.
+                    st.session_state.user_id = tutor_service.learner_id(email)
+                    st.query_params["learner"] = st.session_state.user_id
+                tutor_service.set_profile(st.session_state, profile_data)
                 st.session_state.profile_completed = True
                 st.success("Profile submitted successfully!")
                 st.rerun()  # Force a rerun to display the assessment
@@ -296,29 +170,8 @@ def page_landing():
         })
 
         if "profile_analysis" not in st.session_state:
-            prompt = (
-                "Based on the following user profile details, provide a comprehensive assessment that includes:\n\n"
-                "1. An evaluation of the user's personality type from their self-description.\n"
-                "2. An analysis of their language style and tone as inferred from their writing sample.\n"
-                "3. A discussion of their learning goals and current level, including actionable recommendations on which topics to focus on and steps to achieve their goals.\n"
-                "4. If a resume is provided, a brief summary of the important points from the resume.\n\n"
-                f"Name: {profile.get('name', 'N/A')}\n"
-                f"Age: {profile.get('age', 'N/A')}\n"
-                f"Personality Description: {profile.get('personality', 'N/A')}\n"
-                f"Writing Sample (Tone & Language Style): {profile.get('tone_paragraph', 'N/A')}\n"
-                f"Learning Goals: {profile.get('learning_goals', 'N/A')}\n"
-                f"Current Level: {profile.get('level', 'N/A')}\n"
-                f"Topics of Interest: {profile.get('topics', 'N/A')}\n"
-            )
-            if profile.get("resume_text"):
-                prompt += f"Resume Content: {profile.get('resume_text')}\n\n"
-            prompt += "Please provide a detailed, insightful analysis along with recommendations on how the user can reach their learning goals."
-            analysis = generate_llm_response(prompt,
-                                             provider="openai",
-                                             model="gpt-4o",
-                                             temperature=0.7)
-            st.session_state.profile_analysis = analysis
-            st.session_state.profile["assessment"] = analysis
+            with st.spinner("Assessing your profile..."):
+                tutor_service.assess_profile(st.session_state)
 
         st.subheader("Profile Assessment")
         st.write(st.session_state.profile_analysis)
@@ -334,24 +187,107 @@ def page_web_resource_search():
     st.header("Web Resource Search")
     query = st.text_input("Enter research terms:", key="web_search_query")
     if st.button("Search", key="web_search_button"):
+        # Each section fills in as its part of the structured response streams in.
+        sections = [("PDFs", "pdfs"), ("Articles", "articles"), ("Videos", "videos"),
+                    ("Courses", "courses"), ("HTML Links", "html_links")]
+        placeholders = {}
+        for title, field in sections:
+            st.markdown(f"### {title}")
+            placeholders[field] = st.empty()
+        shown = {}
         with st.spinner("Searching for web resources..."):
-            resources = get_web_resources(query)
-        st.markdown("### PDFs")
-        for pdf in resources.pdfs:
-            st.write(pdf)
-        st.markdown("### Articles")
-        for article in resources.articles:
-            st.write(article)
-        st.markdown("### Videos")
-        for video in resources.videos:
-            st.write(video)
-        st.markdown("### Courses")
-        for course in resources.courses:
-            st.write(course)
-        st.markdown("### HTML Links")
-        for link in resources.html_links:
-            st.write(link)
+            for resources in stream_web_resources(query):
+                for _, field in sections:
+                    items = getattr(resources, field)
+                    if items != shown.get(field):
+                        shown[field] = items
+                        with placeholders[field].container():
+                            for item in items:
+                                st.write(item)
+
 
+LESSONS_PER_PAGE = 10
+
+
+def render_lesson_markdown(key, content):
+    """
+    Format a lesson for display. Cached server-side in the session under the lesson key, so re-opening a
+    lesson reuses it; the cached entry is only checked for being the same lesson object, never hashed,
+    and a regenerated lesson is formatted again.
+    """
+    cache = st.session_state.setdefault("lesson_markdown", {})
+    cached = cache.get(key)
+    if cached is None or cached[0] is not content:
+        cached = cache[key] = (content, f"#### {key}\n\n{content.strip()}")
+    return cached[1]
+
+def render_exercise_result(result):
+    if result["status"] == "passed":
+        st.success(f"All {result['total']} tests passed.")
+    elif result["status"] == "failed":
+        st.warning(f"{result['passed']} of {result['total']} tests passed.")
+    else:
+        st.error(result["error"])
+    for test in result["tests"]:
+        mark = "✅" if test["passed"] else "❌"
+        st.markdown(f"{mark} `{test['test']}`" + (f" — {test['message']}" if test["message"] else ""))
+    if result["output"]:
+        st.code(result["output"], language="text")
+
+def render_lesson_exercises(key):
+    """
+    Show the open lesson's code exercises with an editor and a test runner for each.
+    """
+    if not tutor_service.exercises_ready(st.session_state, key):
+        st.caption("Practice exercises for this lesson are being prepared...")
+        st.button("Check for exercises", key=f"exercise_refresh_{key}")
+        return
+    exercises = tutor_service.lesson_exercises(st.session_state, key)
+    if exercises:
+        st.markdown("#### Practice")
+    for i, exercise in enumerate(exercises):
+        st.markdown(f"##### Exercise {i + 1}: {exercise['title']}\n\n{exercise['instructions']}")
+        code = st.text_area("Your code", value=exercise["starter_code"], height=220, key=f"exercise_code_{key}_{i}")
+        result_key = f"exercise_result_{key}_{i}"
+        if st.button("Run tests", key=f"exercise_run_{key}_{i}"):
+            with st.spinner("Running your code..."):
+                st.session_state[result_key] = tutor_service.submit_exercise(st.session_state, key, i, code)
+        if result_key in st.session_state:
+            render_exercise_result(st.session_state[result_key])
+        with st.expander("Show solution"):
+            st.code(exercise["solution"], language="python")
+
+def render_lesson_history():
+    """
+    Show the session's lessons newest first, one page of titles at a time.
+    Only the opened lesson's content is rendered, so a rerun costs the same however many lessons exist.
+    """
+    lessons = st.session_state.get("lessons", {})
+    if not lessons:
+        return
+    keys = list(reversed(list(lessons)))
+    open_key = st.session_state.get("open_lesson")
+    if open_key in lessons:
+        st.markdown(render_lesson_markdown(open_key, lessons[open_key]))
+        render_lesson_exercises(open_key)
+
+    page_count = (len(keys) - 1) // LESSONS_PER_PAGE + 1
+    page = min(st.session_state.get("lesson_page", 0), page_count - 1)
+    st.markdown(f"#### Lesson History ({len(keys)} lessons)")
+    for i, key in enumerate(keys[page * LESSONS_PER_PAGE:(page + 1) * LESSONS_PER_PAGE]):
+        label = f"▾ {key}" if key == open_key else f"▸ {key}"
+        if st.button(label, key=f"open_lesson_{page}_{i}"):
+            st.session_state.open_lesson = None if key == open_key else key
+            st.rerun()
+    if page_count > 1:
+        prev_col, info_col, next_col = st.columns(3)
+        if prev_col.button("Newer", key="lesson_page_prev", disabled=page == 0):
+            st.session_state.lesson_page = page - 1
+            st.rerun()
+        info_col.write(f"Page {page + 1} of {page_count}")
+        if next_col.button("Older", key="lesson_page_next", disabled=page == page_count - 1):
+            st.session_state.lesson_page = page + 1
+            st.rerun()
 
 def page_dynamic_lessons():
     st.header("Dynamic Lessons")
@@ -372,13 +308,13 @@ def page_dynamic_lessons():
 
         if st.button("Get Lesson", key="lesson_button") and selected_topic and selected_subtopic:
             with st.spinner("Generating lesson content..."):
-                lesson_content = generate_lesson_content(selected_topic, selected_subtopic)
-            # Append the new lesson and display all lessons
+                generate_lesson_content(selected_topic, selected_subtopic)
             st.success("Lesson generated!")
-            st.markdown("#### Generated Lessons")
-            for key, content in st.session_state.lessons.items():
-                st.markdown(f"**{key}**")
-                st.write(content)
+            # Open the new lesson; older ones stay collapsed in the history below.
+            st.session_state.open_lesson = lesson_key(selected_topic, selected_subtopic)
+            st.session_state.lesson_page = 0
+
+        render_lesson_history()
         
         st.markdown("</div>", unsafe_allow_html=True)
         
@@ -386,15 +322,10 @@ def page_dynamic_lessons():
         additional_topics = st.text_input("Enter additional topics (comma-separated)", key="additional_topics")
         if st.button("Add Topics"):
             if additional_topics:
-                new_topics = [t.strip() for t in additional_topics.split(",") if t.strip()]
-                dynamic_topics = st.session_state.get("dynamic_topics", {})
-                for topic in new_topics:
-                    if topic not in dynamic_topics:
-                        prompt = f"Generate 5 relevant subtopics for the learning topic: '{topic}'. Provide them as a comma-separated list."
-                        subtopics_str = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
-                        subtopics = [s.strip() for s in subtopics_str.split(",") if s.strip()]
-                        dynamic_topics[topic] = subtopics
-                st.session_state.dynamic_topics = dynamic_topics
+                with st.spinner("Generating subtopics..."):
+                    failed = tutor_service.add_topics(st.session_state, additional_topics)
+                if failed:
+                    st.warning(f"Could not generate subtopics for: {', '.join(failed)}")
                 st.success("Additional topics added.")
                 st.rerun()
             else:
@@ -405,15 +336,20 @@ def page_interview_assessment():
     with st.container():
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Interview Settings")
-        interview_difficulty = st.selectbox("Select Interview Difficulty", ["Easy", "Medium", "Hard"], key="interview_difficulty")
-        interview_behavior = st.selectbox("Select Interviewer Behavior", ["Aggressive", "Polite", "Medium"], key="interview_behavior")
+        interview_difficulty = st.selectbox("Select Interview Difficulty", INTERVIEW_DIFFICULTIES, key="interview_difficulty")
+        interview_behavior = st.selectbox("Select Interviewer Behavior", INTERVIEW_BEHAVIORS, key="interview_behavior")
+        # Warm the question bank for the current selection so "Start Interview" is instant.
+        prefetch_questions(st.session_state.get("subtopics", []), interview_difficulty, interview_behavior)
         
         if st.button("Start Interview", key="start_interview"):
             initialize_interview(st.session_state.subtopics, interview_difficulty, interview_behavior) 
             st.success("Interview session started!")
             st.rerun()
 
+        adaptive = st.checkbox("Adapt difficulty to my answers", key="interview_adaptive")
+
         if "interview_questions" in st.session_state:
+            tutor_service.collect_evaluations(st.session_state)
             current_idx = st.session_state.current_question_index
             questions = st.session_state.interview_questions
             if current_idx < len(questions):
@@ -437,16 +373,20 @@ def page_interview_assessment():
                     else:
                         user_answer = ""
                 if st.button("Submit Answer", key=f"submit_interview_{current_idx}"):
-                    with st.spinner("Evaluating your answer..."):
-                        evaluation = evaluate_interview_answer(user_answer, current_question)
-                    st.session_state.interview_scores.append(evaluation)
-                    st.write("**Evaluation & Feedback:**")
-                    st.write(evaluation)
-                    st.session_state.current_question_index += 1
+                    # Evaluation runs in the background; the next question is shown straight away.
+                    tutor_service.submit_answer(st.session_state, user_answer, adaptive=adaptive)
                     st.rerun()
+                evaluations = st.session_state.interview_evaluations
+                pending = st.session_state.pending_evaluations
+                if evaluations or pending:
+                    with st.expander(f"Evaluations ({len(evaluations)} ready, {len(pending)} in progress)"):
+                        for idx in sorted(evaluations):
+                            st.markdown(f"**Question {idx+1}:** {questions[idx]}")
+                            st.write(evaluations[idx])
             else:
                 st.subheader("Interview Completed!")
-                final_summary = finalize_interview()
+                with st.spinner("Finishing the evaluation of your answers..."):
+                    final_summary = finalize_interview()
                 st.write(final_summary)
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -469,17 +409,19 @@ def page_chatbot():
     with st.container():
         st.markdown('<div class="card">', unsafe_allow_html=True)
         prompt = st.text_input("Enter your question or topic:", key="chatbot_prompt")
-        provider = st.selectbox("Choose LLM Provider", ["openai", "huggingface", "claude", "gemini"],
+        provider = st.selectbox("Choose LLM Provider", ["openai", "huggingface", "claude", "gemini", "local"],
                                 key="chatbot_provider")
         model = st.text_input("Model", value="gpt-4o", key="chatbot_model")
         temperature = st.slider("Temperature", min_value=0.0, max_value=1.0, value=0.7,
                                   step=0.1, key="chatbot_temperature")
         if st.button("Submit", key="chatbot_submit"):
             with st.spinner("Generating response..."):
-                response = generate_llm_response(prompt, provider=provider,
-                                                 model=model, temperature=temperature)
+                response, from_cache = tutor_service.answer_chat(prompt, provider=provider,
+                                                                 model=model, temperature=temperature)
             st.markdown("**Response:**")
             st.write(response)
+            if from_cache:
+                st.caption("Answered from earlier answers to a similar question.")
         st.markdown("</div>", unsafe_allow_html=True)
 
 def page_pdf_chatbot():
@@ -487,27 +429,83 @@ def page_pdf_chatbot():
     with st.container():
         st.markdown('<div class="card">', unsafe_allow_html=True)
         uploaded_pdf = st.file_uploader("Upload a PDF", type=["pdf"], key="uploaded_pdf")
-        if uploaded_pdf:
+        indexed_uploads = st.session_state.setdefault("indexed_uploads", {})
+        # Replacing or removing the upload releases the previous document from the knowledge base.
+        current_file = uploaded_pdf.file_id if uploaded_pdf else None
+        for file_id in [f for f in indexed_uploads if f != current_file]:
+            doc_id = indexed_uploads.pop(file_id)
+            if doc_id is not None:
+                tutor_service.forget_document(st.session_state, doc_id)
+        if uploaded_pdf and uploaded_pdf.file_id not in indexed_uploads:
             with st.spinner("Extracting text from PDF..."):
-                pdf_text = extract_text_from_pdf(uploaded_pdf)
-            st.session_state.pdf_text = pdf_text
-            st.success("PDF uploaded successfully. You can now ask questions related to this PDF.")
+                indexed_uploads[uploaded_pdf.file_id] = tutor_service.upload_document(
+                    st.session_state, uploaded_pdf, title=uploaded_pdf.name, progress=ocr_progress_bar())
+        if uploaded_pdf:
+            if indexed_uploads[uploaded_pdf.file_id] is None:
+                st.error("No text could be extracted from this PDF.")
+            else:
+                st.success("PDF uploaded successfully. You can now ask questions related to this PDF.")
+        documents = tutor_service.list_documents(st.session_state)
+        if documents:
+            # An empty selection searches every document.
+            selected = st.multiselect("Limit the search to these documents (all if empty):", options=list(documents),
+                                      format_func=documents.get, key="pdf_documents") or None
         else:
+            selected = None
             st.info("No PDF uploaded. You can chat with the default knowledge base.")
         query = st.text_input("Enter your question about the PDF or default knowledge base:", key="pdf_query")
         if st.button("Ask", key="pdf_ask"):
             with st.spinner("Generating answer..."):
-                if "pdf_text" in st.session_state and st.session_state.pdf_text:
-                    kb_text = st.session_state.pdf_text
-                else:
-                    kb_text = ("This is the default knowledge base of the GenAI Tutor. It includes comprehensive lessons on Python, "
-                               "Generative AI, and more.")
-                prompt = f"Given the following text:\n\n{kb_text}\n\nAnswer the following question in detail:\n{query}"
-                answer = generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7)
+                answer, from_cache = tutor_service.answer_document_question(st.session_state, query,
+                                                                            doc_ids=selected)
             st.markdown("**Answer:**")
             st.write(answer)
+            if from_cache:
+                st.caption("Answered from earlier answers to a similar question.")
         st.markdown("</div>", unsafe_allow_html=True)
 
+def page_progress():
+    st.header("My Progress")
+    if "user_id" not in st.session_state:
+        st.info("Progress is kept for this visit only. Enter your email on the profile form to keep it across visits.")
+    timeline = tutor_service.progress_timeline(st.session_state)
+    if not timeline:
+        st.write("Nothing yet: open a lesson, solve an exercise or take an interview.")
+        return
+    st.dataframe([{
+        "when": time.strftime("%Y-%m-%d %H:%M", time.localtime(item["at"])),
+        "activity": item["kind"],
+        "details": item["title"],
+        "score": item["score"],
+    } for item in timeline])
+
+def page_profiling():
+    st.header("Profiling: Slowest Recent Reruns")
+    st.caption("Times in ms. Phases are exclusive; time outside every phase is Streamlit rendering and app code.")
+    reruns = slowest_reruns(limit=25)
+    if not reruns:
+        st.info("No profiled reruns yet.")
+        return
+    rows = []
+    for rerun in reruns:
+        slowest_page = max(rerun["pages"].items(), key=lambda item: item[1]["wall"], default=(None, None))[0]
+        row = {
+            "at": time.strftime("%H:%M:%S", time.localtime(rerun["started_at"])),
+            "rerun": rerun["label"],
+            "wall": round(rerun["wall"] * 1000, 1),
+            "cpu": round(rerun["cpu"] * 1000, 1),
+            "slowest page": slowest_page,
+        }
+        for page, timings in rerun["pages"].items():
+            row[page] = round(timings["wall"] * 1000, 1)
+        for name, seconds in rerun["phases"].items():
+            row[f"phase: {name}"] = round(seconds * 1000, 1)
+        row["flame graph"] = rerun["flame_path"]
+        rows.append(row)
+    st.dataframe(rows)
+    with st.expander("Per-page breakdown of the slowest rerun"):
+        st.json(reruns[0]["pages"])
+
 ##############################################
 # Custom CSS Injection for Modern Dark Design (Black & Red)
 ##############################################
@@ -564,28 +562,50 @@ def inject_custom_css():
 # Main App Function
 ##############################################
 
-def main():
-    st.set_page_config(page_title="InsightsLib Learn", layout="wide")
+def run_page(page):
+    # Page functions are timed individually when the rerun is profiled.
+    with profile_section(page.__name__):
+        page()
+
+def render_app(profiling=False):
     inject_custom_css()
 
+    # A returning learner's id (set from their email on an earlier visit) comes back through the URL.
+    learner = st.query_params.get("learner", "")
+    if "user_id" not in st.session_state and learner and tutor_service.known_learner(learner):
+        st.session_state.user_id = learner
+
     # If the profile hasn't been submitted or analysis not approved, show the landing page.
     if ("profile_completed" not in st.session_state or not st.session_state.profile_completed) or \
        ("profile_analysis_done" not in st.session_state or not st.session_state.profile_analysis_done):
-        page_landing()
+        run_page(page_landing)
     else:
         st.title("GenAI Tutor: Learn Python & Generative AI")
         st.markdown("<hr>", unsafe_allow_html=True)
 
-        tabs = st.tabs(["Dynamic Lessons", "Web Resource Search", "PDF Chatbot", "Interview & Assessment"])
-        with tabs[0]:
-            page_dynamic_lessons()
-        with tabs[1]:
-            page_web_resource_search()
-        with tabs[2]:
-            page_pdf_chatbot()
-        with tabs[3]:
-            page_interview_assessment()
-    
+        pages = [("Dynamic Lessons", page_dynamic_lessons), ("Web Resource Search", page_web_resource_search),
+                 ("PDF Chatbot", page_pdf_chatbot), ("Interview & Assessment", page_interview_assessment),
+                 ("My Progress", page_progress)]
+        if profiling:
+            pages.append(("Profiling", page_profiling))
+        tabs = st.tabs([title for title, _ in pages])
+        for tab, (_, page) in zip(tabs, pages):
+            with tab:
+                run_page(page)
+
+def main():
+    st.set_page_config(page_title="InsightsLib Learn", layout="wide")
+    # Opt-in profiling: INSIGHTSLIB_PROFILE=1|flame, or ?profile=1|flame in the URL if
+    # INSIGHTSLIB_PROFILE_ALLOW_QUERY=1.
+    requested = st.query_params.get("profile", PROFILE_MODE) if PROFILE_ALLOW_QUERY else PROFILE_MODE
+    mode = profile_mode(requested)
+    if mode is None:
+        render_app()
+        return
+    flame_dir = cache_path("profiles") if mode == "flame" else None
+    with profile_run("tutor_resume", flame_dir=flame_dir):
+        render_app(profiling=True)
+
 
 if __name__ == "__main__":
     main()
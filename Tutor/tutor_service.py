@@ -0,0 +1,756 @@
+import os, sys
+import re
+import hmac
+import uuid
+import hashlib
+import secrets
+import threading
+from concurrent.futures import wait
+from pydantic import BaseModel
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.llm_generator import (generate_llm_response, generate_llm_json, stream_llm_response, stream_llm_json,
+                                       is_llm_error, LLMError)
+from llm_service.tokenizer import fit_prompt
+from llm_service.tasks import task_settings
+from llm_service.profiling import phase
+from Tutor.question_bank import prefetch_questions, get_interview_questions, draw_questions
+from Tutor.background import submit_background
+from Tutor.profile_digest import get_profile_digest, compact_text, RESUME_TOKEN_BUDGET
+from Tutor.lessons import build_lesson_prompt, lesson_key, LESSON_PROVIDER, LESSON_MODEL, LESSON_TEMPERATURE
+from Tutor.lesson_store import load_lesson, save_lesson
+from Tutor.resume_parser import parse_resume, format_resume_summary
+from Tutor.pdf_extract import extract_text_from_pdf
+from Tutor.knowledge_base import get_knowledge_base
+from Tutor.answer_cache import cached_answer, DOCUMENTS_SCOPE
+from Tutor.progress_store import get_progress_store
+from Tutor.exercises import generate_exercises, grade_submission
+from Tutor.sandbox import get_sandbox_pool
+from Tutor.storage import cache_path
+
+
+class getWeb(BaseModel):
+    pdfs: list[str]
+    articles: list[str]
+    html_links: list[str]
+    courses: list[str]
+    videos: list[str]
+
+
+class topicSubtopics(BaseModel):
+    topic: str
+    subtopics: list[str]
+
+
+class getSubtopics(BaseModel):
+    topics: list[topicSubtopics]
+
+
+SUBTOPICS_PER_TOPIC = 5
+MAX_SUBTOPIC_ATTEMPTS = 3
+
+INTERVIEW_DIFFICULTIES = ["Easy", "Medium", "Hard"]
+INTERVIEW_BEHAVIORS = ["Aggressive", "Polite", "Medium"]
+
+# Number of document chunks retrieved as context for a document question.
+DOCUMENT_CHUNKS_PER_ANSWER = 6
+
+# Learner ids are an HMAC of the learner's email under this secret, so nobody can derive a learner's id
+# (and read their progress) from their address. Without INSIGHTSLIB_LEARNER_SECRET, a random secret is
+# generated on first use and kept in the cache directory; every server process must share it.
+LEARNER_SECRET = os.getenv("INSIGHTSLIB_LEARNER_SECRET")
+LEARNER_ID_PATTERN = r"learner-[0-9a-f]{24}"
+
+DEFAULT_KNOWLEDGE_BASE = ("This is the default knowledge base of the GenAI Tutor. It includes comprehensive lessons on Python, "
+                          "Generative AI, and more.")
+
+##############################################
+# Helper Functions
+##############################################
+
+_learner_secret = None
+_learner_secret_lock = threading.Lock()
+
+def learner_secret():
+    """
+    The key learner ids are derived with: LEARNER_SECRET, or a random one stored in the cache directory.
+    """
+    global _learner_secret
+    with _learner_secret_lock:
+        if _learner_secret is None:
+            if LEARNER_SECRET:
+                _learner_secret = LEARNER_SECRET.encode("utf-8")
+            else:
+                path = cache_path("learner_secret")
+                if not os.path.exists(path):
+                    # Written under a temporary name and linked into place, so concurrent first uses
+                    # agree on one secret and never read a partial file.
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                    with os.fdopen(fd, "w") as f:
+                        f.write(secrets.token_hex(32))
+                    try:
+                        os.link(tmp_path, path)
+                    except FileExistsError:
+                        pass
+                    finally:
+                        os.remove(tmp_path)
+                with open(path, "r") as f:
+                    _learner_secret = f.read().strip().encode("utf-8")
+        return _learner_secret
+
+def parse_topics(topics_str):
+    """
+    Split a comma-separated topics string into a de-duplicated list of topics.
+    """
+    topics = []
+    for t in topics_str.split(","):
+        t = t.strip()
+        if t and t.lower() not in [x.lower() for x in topics]:
+            topics.append(t)
+    return topics
+
+def validate_subtopics(response, requested_topics):
+    """
+    Keep only the well-formed entries of a getSubtopics response.
+    Returns a dict mapping each requested topic found in the response to its cleaned subtopics;
+    anything else (unknown topics, empty names, error strings, a non-parsed response) is dropped.
+    """
+    if not isinstance(response, getSubtopics):
+        return {}
+    lookup = {t.lower(): t for t in requested_topics}
+    topics_data = {}
+    for entry in response.topics:
+        topic = lookup.get(entry.topic.strip().lower())
+        if topic is None or topic in topics_data:
+            continue
+        subtopics = []
+        for s in entry.subtopics:
+            s = s.strip()
+            if s and not is_llm_error(s) and s.lower() not in [x.lower() for x in subtopics]:
+                subtopics.append(s)
+        if subtopics:
+            topics_data[topic] = subtopics[:SUBTOPICS_PER_TOPIC]
+    return topics_data
+
+def generate_subtopics(topics):
+    """
+    Generate subtopics for all the given topics with one structured LLM call.
+    Topics missing or malformed in the response are asked for again, up to
+    MAX_SUBTOPIC_ATTEMPTS calls in total; topics that still fail are left out.
+    """
+    topics_data = {}
+    pending = list(topics)
+    for _ in range(MAX_SUBTOPIC_ATTEMPTS):
+        if not pending:
+            break
+        topic_list = "\n".join(f"- {t}" for t in pending)
+        prompt = (
+            f"Generate {SUBTOPICS_PER_TOPIC} relevant subtopics for each of the following learning topics:\n"
+            f"{topic_list}\n\n"
+            "Return one entry per topic, using the topic name exactly as written above. "
+            "Each subtopic should be a short title, not a sentence."
+        )
+        response = generate_llm_json(prompt, getSubtopics, task="subtopics")
+        topics_data.update(validate_subtopics(response, pending))
+        pending = [t for t in pending if t not in topics_data]
+    return topics_data
+
+def web_resources_prompt(query):
+    return (
+        f"Provide a list of recommended resources for learning about '{query}'. "
+        "Include PDF documents, articles, HTML links,online courses and videos. "
+        "Return the result as a JSON dictionary with the keys 'PDFs', 'Articles', 'HTML Links', and 'Courses', "
+        "where each key maps to a list of resource titles or links."
+        "Include a laundary list of resources for the user to explore."
+    )
+
+def placeholder_web_resources(query):
+    return getWeb(
+        pdfs=[f"PDF result {i} for query '{query}'" for i in range(1, 4)],
+        articles=[f"Article result {i} for query '{query}'" for i in range(1, 4)],
+        html_links=[f"HTML link {i} for query '{query}'" for i in range(1, 4)],
+        courses=[f"Course result {i} for query '{query}'" for i in range(1, 4)],
+        videos=[f"Video result {i} for query '{query}'" for i in range(1, 4)],
+    )
+
+def get_web_resources(query):
+    """
+    Use the LLM to generate a list of recommended resources for learning about the given topic.
+    Returns a getWeb object; placeholder entries are returned if the LLM call fails.
+    """
+    response = generate_llm_json(web_resources_prompt(query), getWeb, task="resources")
+    if isinstance(response, getWeb):
+        return response
+    return placeholder_web_resources(query)
+
+def stream_web_resources(query):
+    """
+    Like get_web_resources, but yields progressively filled getWeb objects as the resources are generated;
+    the last one is complete. Yields the placeholder entries if the LLM call fails.
+    """
+    for response in stream_llm_json(web_resources_prompt(query), getWeb, task="resources"):
+        if isinstance(response, getWeb):
+            yield response
+        else:
+            yield placeholder_web_resources(query)
+
+def evaluate_interview_answer(answer, question):
+    """
+    Evaluate the candidate's answer to an interview question.
+    The evaluation should include a score (out of 10) and specific feedback.
+    """
+    prompt = (
+        f"Interview Question: {question}\n\n"
+        f"Candidate Answer: {answer}\n\n"
+        "Evaluate the candidate's answer on a scale of 1 to 10. "
+        "Provide a brief explanation of what was strong and what could be improved. "
+        "Format the response as: 'Score: X. Feedback: ...'"
+    )
+    evaluation = generate_llm_response(prompt, task="evaluation")
+    return evaluation
+
+def parse_evaluation(eval_text):
+    """
+    Extract the score and feedback from an evaluation formatted as 'Score: X. Feedback: ...'.
+    Returns (score, feedback); either is None if it could not be found.
+    """
+    score_match = re.search(r"Score:\s*(\d+(?:\.\d+)?)", eval_text)
+    feedback_match = re.search(r"Feedback:.*", eval_text)
+    score = float(score_match.group(1)) if score_match else None
+    feedback = feedback_match.group(0).strip() if feedback_match else None
+    return score, feedback
+
+##############################################
+# Tutor Service
+##############################################
+
+class TutorService:
+    """
+    Streamlit-free tutor logic.
+
+    Every method takes the learner's session explicitly: a mutable mapping holding the profile,
+    topics, lessons and interview state. The Streamlit app passes st.session_state; headless
+    callers (HTTP API, load tests, scripts) pass a plain dict. The service itself keeps no
+    per-learner state, so any number of worker processes can serve the same learners as long
+    as their sessions are routed or stored accordingly.
+    """
+
+    # Identity
+
+    def user_id(self, session):
+        """
+        Id of the learner in the progress store: session['user_id'] if the caller knows the user,
+        otherwise the session's own id.
+        """
+        return session.get("user_id") or self.session_owner(session)
+
+    def learner_id(self, email):
+        """
+        Stable user id for a learner identified by their email address (case and surrounding spaces
+        ignored): a keyed hash (see LEARNER_SECRET), so it can't be computed from the address alone.
+        The address itself is not stored.
+        """
+        digest = hmac.new(learner_secret(), email.strip().lower().encode("utf-8"), hashlib.sha256)
+        return "learner-" + digest.hexdigest()[:24]
+
+    def new_learner_id(self):
+        """
+        A random user id for a learner without an email address, recorded in the progress store so it can
+        be passed back later (see known_learner).
+        """
+        learner = "learner-" + secrets.token_hex(12)
+        store = get_progress_store()
+        store.record_user(learner)
+        # Written before the id is handed out, so it is known as soon as the caller passes it back.
+        store.flush()
+        return learner
+
+    def known_learner(self, learner):
+        """
+        True if `learner` is a learner id this server has issued and recorded progress under. Ids are only
+        known to their learner, so this is what callers check before continuing someone's progress.
+        """
+        return bool(re.fullmatch(LEARNER_ID_PATTERN, learner or "")) and get_progress_store().has_user(learner)
+
+    def progress_timeline(self, session, limit=100):
+        """
+        The learner's most recent lessons, exercise attempts and interviews, newest first (see
+        ProgressStore.user_timeline), across every session recorded under the same user id.
+        """
+        return get_progress_store().user_timeline(self.user_id(session), limit)
+
+    def session_owner(self, session):
+        """
+        Return the id under which the session's uploaded documents are stored in the knowledge base.
+        """
+        return session.setdefault("session_id", uuid.uuid4().hex)
+
+    # Profile
+
+    def set_profile(self, session, profile, speculate=True):
+        """
+        Store a newly submitted profile, clearing anything derived from a previous one.
+        With `speculate`, the profile assessment and the topic expansion are started right away as two
+        independent background tasks (session['profile_tasks']), so both are usually done by the time
+        assess_profile and generate_dynamic_topics ask for them.
+        """
+        session["profile"] = profile
+        for key in ("profile_analysis", "dynamic_topics", "profile_tasks"):
+            session.pop(key, None)
+        get_progress_store().record_profile(self.user_id(session), profile)
+        if speculate:
+            session["profile_tasks"] = {
+                "assessment": submit_background(self._assessment, dict(profile)),
+                "topics": submit_background(generate_subtopics, parse_topics(profile.get("topics", ""))),
+            }
+
+    def _task_result(self, session, name):
+        # Result of a speculative profile task, or None if none was started or it failed.
+        future = session.get("profile_tasks", {}).pop(name, None)
+        if future is None:
+            return None
+        try:
+            with phase("background_wait"):
+                return future.result()
+        except Exception:
+            return None
+
+    def ingest_resume(self, profile):
+        """
+        Turn the profile's raw resume text into a structured resume (profile['resume_profile']) and a
+        compact summary (profile['resume_summary']) that later prompts use instead of the full text.
+        Returns True if the profile has a resume summary.
+        """
+        if not profile.get("resume_text"):
+            return False
+        if "resume_summary" not in profile:
+            parsed = parse_resume(profile["resume_text"])
+            if parsed is not None:
+                profile["resume_profile"] = parsed.model_dump()
+                profile["resume_summary"] = format_resume_summary(parsed)
+            else:
+                profile["resume_summary"] = compact_text(profile["resume_text"], RESUME_TOKEN_BUDGET,
+                                                         "assessing a learner's background and skills")
+        return True
+
+    def assess_profile(self, session):
+        """
+        Generate the profile assessment (once per session) and store it on the profile.
+        Waits for the speculative assessment task if set_profile started one.
+        """
+        if "profile_analysis" in session:
+            return session["profile_analysis"]
+        profile = session["profile"]
+        result = self._task_result(session, "assessment")
+        analysis, assessed = result if result is not None else self._assessment(dict(profile))
+        # The resume fields are derived while assessing; copy them over from the assessed profile.
+        for key in ("resume_profile", "resume_summary"):
+            if key in assessed:
+                profile[key] = assessed[key]
+        session["profile_analysis"] = analysis
+        profile["assessment"] = analysis
+        # Build the digest used by lesson prompts while the user reads the assessment.
+        submit_background(get_profile_digest, dict(profile))
+        return analysis
+
+    def _assessment(self, profile):
+        # Runs without the session (possibly on a background thread); returns (analysis, profile with resume fields).
+        header = (
+            "Based on the following user profile details, provide a comprehensive assessment that includes:\n\n"
+            "1. An evaluation of the user's personality type from their self-description.\n"
+            "2. An analysis of their language style and tone as inferred from their writing sample.\n"
+            "3. A discussion of their learning goals and current level, including actionable recommendations on which topics to focus on and steps to achieve their goals.\n"
+            "4. If a resume is provided, a brief summary of the important points from the resume.\n\n"
+            f"Name: {profile.get('name', 'N/A')}\n"
+            f"Age: {profile.get('age', 'N/A')}\n"
+        )
+        free_text = (
+            f"Personality Description: {profile.get('personality', 'N/A')}\n"
+            f"Writing Sample (Tone & Language Style): {profile.get('tone_paragraph', 'N/A')}\n"
+            f"Learning Goals: {profile.get('learning_goals', 'N/A')}\n"
+        )
+        details = (
+            f"Current Level: {profile.get('level', 'N/A')}\n"
+            f"Topics of Interest: {profile.get('topics', 'N/A')}\n"
+        )
+        resume_section = ""
+        if self.ingest_resume(profile):
+            resume_section = f"Resume Summary:\n{profile['resume_summary']}\n\n"
+        closing = "Please provide a detailed, insightful analysis along with recommendations on how the user can reach their learning goals."
+        # The resume is cut first, then the free-text answers, if the prompt is over budget.
+        prompt = fit_prompt([(header, None), (free_text, 2), (details, None),
+                             (resume_section, 1), (closing, None)],
+                            model=task_settings("assessment")["model"])
+        analysis = generate_llm_response(prompt, task="assessment")
+        return analysis, profile
+
+    # Topics & lessons
+
+    def generate_dynamic_topics(self, session):
+        """
+        Parse the user's topics from the profile and generate their subtopics.
+        Waits for the speculative topic task if set_profile started one.
+        """
+        dynamic_topics = self._task_result(session, "topics")
+        if dynamic_topics is None:
+            dynamic_topics = generate_subtopics(parse_topics(session["profile"].get("topics", "")))
+        session["dynamic_topics"] = dynamic_topics
+        self.prefetch_interview_questions(session, session["dynamic_topics"])
+        return session["dynamic_topics"]
+
+    def add_topics(self, session, topics_str):
+        """
+        Add subtopics for extra comma-separated topics. Returns the topics that could not be expanded.
+        """
+        dynamic_topics = session.get("dynamic_topics", {})
+        missing = [t for t in parse_topics(topics_str) if t not in dynamic_topics]
+        if missing:
+            new_data = generate_subtopics(missing)
+            dynamic_topics.update(new_data)
+            self.prefetch_interview_questions(session, new_data)
+        session["dynamic_topics"] = dynamic_topics
+        return [t for t in missing if t not in dynamic_topics]
+
+    def generate_lesson(self, session, topic, subtopic):
+        """
+        Generate a lesson that matches the user's language tone and personality and add it to the session.
+        Lessons already in the lesson store (e.g. pre-generated for a cohort) are reused.
+        """
+        profile = session["profile"]
+        lesson_content = load_lesson(topic, subtopic, profile, LESSON_MODEL)
+        if lesson_content is None:
+            prompt = build_lesson_prompt(profile, topic, subtopic)
+            lesson_content = generate_llm_response(prompt, provider=LESSON_PROVIDER, model=LESSON_MODEL,
+                                                   temperature=LESSON_TEMPERATURE)
+            if not is_llm_error(lesson_content):
+                save_lesson(topic, subtopic, profile, LESSON_MODEL, lesson_content)
+        session.setdefault("lessons", {})[lesson_key(topic, subtopic)] = lesson_content
+        get_progress_store().record_lesson(self.user_id(session), topic, subtopic, LESSON_MODEL)
+        self._attach_exercises(session, topic, subtopic, lesson_content)
+        return lesson_content
+
+    def stream_lesson(self, session, topic, subtopic):
+        """
+        Like generate_lesson, but yields the lesson in chunks as it is generated.
+        A stored lesson is yielded as a single chunk.
+        """
+        profile = session["profile"]
+        lesson_content = load_lesson(topic, subtopic, profile, LESSON_MODEL)
+        if lesson_content is not None:
+            yield lesson_content
+        else:
+            prompt = build_lesson_prompt(profile, topic, subtopic)
+            chunks = []
+            for chunk in stream_llm_response(prompt, provider=LESSON_PROVIDER, model=LESSON_MODEL,
+                                             temperature=LESSON_TEMPERATURE):
+                chunks.append(chunk)
+                yield chunk
+            lesson_content = "".join(chunks)
+            # A stream that fails part-way yields the error as its last chunk.
+            if any(is_llm_error(chunk) for chunk in chunks):
+                lesson_content = LLMError(lesson_content)
+            if not is_llm_error(lesson_content):
+                save_lesson(topic, subtopic, profile, LESSON_MODEL, lesson_content)
+        session.setdefault("lessons", {})[lesson_key(topic, subtopic)] = lesson_content
+        get_progress_store().record_lesson(self.user_id(session), topic, subtopic, LESSON_MODEL)
+        self._attach_exercises(session, topic, subtopic, lesson_content)
+
+    # Exercises
+
+    def _attach_exercises(self, session, topic, subtopic, lesson_content):
+        # A new lesson's exercises are generated (and checked in the sandbox) on the background pool.
+        key = lesson_key(topic, subtopic)
+        session.setdefault("exercises", {}).pop(key, None)
+        if is_llm_error(lesson_content):
+            return
+        # Starts the sandbox workers (if not running yet) so they are warm by the time the exercises arrive.
+        get_sandbox_pool()
+        session.setdefault("exercise_tasks", {})[key] = {
+            "topic": topic, "subtopic": subtopic,
+            "future": submit_background(generate_exercises, topic, subtopic, lesson_content),
+        }
+
+    def exercises_ready(self, session, key):
+        """
+        True if the exercises of the session's lesson `key` (see lesson_key) can be returned without waiting.
+        """
+        task = session.get("exercise_tasks", {}).get(key)
+        return key in session.get("exercises", {}) or task is None or task["future"].done()
+
+    def lesson_exercises(self, session, key):
+        """
+        Return the code exercises attached to the session's lesson `key`, waiting for their generation
+        if it is still running. Each is a dict with title, instructions, starter_code, solution and tests;
+        the list is empty if the lesson has none.
+        """
+        exercises = session.setdefault("exercises", {})
+        if key not in exercises:
+            task = session.get("exercise_tasks", {}).pop(key, None)
+            if task is None:
+                return []
+            try:
+                with phase("background_wait"):
+                    items = task["future"].result()
+            except Exception:
+                items = []
+            exercises[key] = {"topic": task["topic"], "subtopic": task["subtopic"], "items": items}
+        return exercises[key]["items"]
+
+    def submit_exercise(self, session, key, index, code):
+        """
+        Run the learner's code for exercise `index` of lesson `key` against the exercise's tests in the
+        sandbox and record the attempt. Returns the sandbox result (status, tests, output, error) with
+        the 'passed' and 'total' test counts. Raises IndexError for an unknown exercise.
+        """
+        exercises = self.lesson_exercises(session, key)
+        if not 0 <= index < len(exercises):
+            raise IndexError(f"Lesson '{key}' has no exercise {index}.")
+        exercise = exercises[index]
+        result = grade_submission(exercise, code)
+        entry = session["exercises"][key]
+        get_progress_store().record_exercise_attempt(self.user_id(session), entry["topic"], entry["subtopic"],
+                                                     exercise["title"], result["status"], result["passed"],
+                                                     result["total"])
+        return result
+
+    # Documents
+
+    def upload_document(self, session, pdf_file, title=None, progress=None):
+        """
+        Extract the text of an uploaded PDF and add it to the knowledge base as one of the session's documents.
+        `progress(done, total)` is called as scanned pages are OCR'd.
+        Returns the document id, or None if no text could be extracted.
+        """
+        text = extract_text_from_pdf(pdf_file, progress=progress)
+        if not text.strip():
+            return None
+        title = title or os.path.basename(getattr(pdf_file, "name", "") or "Uploaded document")
+        doc_id = get_knowledge_base().add_document(text, title, owner=self.session_owner(session))
+        session.setdefault("documents", {})[doc_id] = title
+        return doc_id
+
+    def list_documents(self, session):
+        """
+        Return {doc_id: title} for the shared course documents and the session's own uploads.
+        """
+        return get_knowledge_base().list_documents(owner=self.session_owner(session))
+
+    def forget_document(self, session, doc_id):
+        """
+        Release one of the session's uploaded documents; it is deleted if no other session uses it.
+        """
+        session.get("documents", {}).pop(doc_id, None)
+        get_knowledge_base().remove_document(doc_id, owner=self.session_owner(session))
+
+    def forget_documents(self, session):
+        """
+        Release the session's uploaded documents; documents no other session uses are deleted.
+        """
+        for doc_id in list(session.get("documents", {})):
+            self.forget_document(session, doc_id)
+
+    def answer_document_question(self, session, query, doc_ids=None):
+        """
+        Answer a question from the passages of the knowledge base most relevant to it, searching the shared
+        documents and the session's uploads (or only `doc_ids`, if given). Falls back to the default
+        knowledge base if there are no documents to search.
+        Similar earlier questions over the same documents are answered from the semantic answer cache.
+        Returns (answer, from_cache).
+        """
+        owner = self.session_owner(session)
+        kb = get_knowledge_base()
+        if doc_ids is None:
+            doc_ids = list(kb.list_documents(owner=owner))
+
+        def generate():
+            hits = kb.search(query, owner=owner, doc_ids=doc_ids, top_k=DOCUMENT_CHUNKS_PER_ANSWER)
+            if hits:
+                kb_text = "\n\n".join(f"[{title}]\n{chunk}" for _, title, chunk, _ in hits)
+            else:
+                kb_text = DEFAULT_KNOWLEDGE_BASE
+            # The passages are the only part that can be shortened; the question is always kept.
+            prompt = fit_prompt([("Given the following text:\n\n", None),
+                                 (kb_text, 1),
+                                 (f"\n\nAnswer the following question in detail:\n{query}", None)],
+                                model=task_settings("documents")["model"])
+            return generate_llm_response(prompt, task="documents")
+
+        return cached_answer(DOCUMENTS_SCOPE, query, generate, doc_ids=doc_ids, is_error=is_llm_error)
+
+    def answer_chat(self, query, provider, model, temperature):
+        """
+        Answer a free chatbot question, reusing the answer to a similar earlier question to the same model.
+        Returns (answer, from_cache).
+        """
+        return cached_answer(f"chat:{provider}:{model}", query,
+                             lambda: generate_llm_response(query, provider=provider, model=model,
+                                                           temperature=temperature),
+                             is_error=is_llm_error)
+
+    # Interview
+
+    def prefetch_interview_questions(self, session, dynamic_topics):
+        """
+        Start filling the question bank for each topic's subtopics as soon as they are known,
+        using the interview settings currently selected (or the defaults).
+        """
+        difficulty = session.get("interview_difficulty", INTERVIEW_DIFFICULTIES[0])
+        behavior = session.get("interview_behavior", INTERVIEW_BEHAVIORS[0])
+        for subtopics in dynamic_topics.values():
+            prefetch_questions(subtopics, difficulty, behavior)
+
+    def start_interview(self, session, subtopics, difficulty, behavior):
+        """
+        Initialize an interview session:
+        - Draw interview questions for the subtopics from the question bank
+          (generated live only if the bank has none for these settings).
+        - Store the difficulty and interviewer behavior.
+        """
+        # Questions touching the skills on the learner's resume are preferred when drawing from the bank.
+        resume = session.get("profile", {}).get("resume_profile") or {}
+        # Questions asked in the learner's earlier interviews are avoided while the bank has others.
+        asked = session.setdefault("asked_questions", [])
+        drawn = get_interview_questions(subtopics, difficulty, behavior, focus_terms=resume.get("skills", []),
+                                        exclude=asked)
+        # Fallback if no questions could be generated.
+        if not drawn:
+            drawn = [{"question": q, "subtopic": None} for q in [
+                "What is one key takeaway from the lesson?",
+                "How would you apply the concepts learned to a real-world scenario?",
+                "Can you explain a challenging aspect of the lesson in your own words?"
+            ]]
+        session["subtopics"] = list(subtopics)
+        questions = [q["question"] for q in drawn]
+        asked.extend(q for q in questions if q not in asked)
+        session["interview_questions"] = questions
+        # The subtopic each question tests, recorded with its evaluation.
+        session["question_subtopics"] = [self._question_subtopic(session, q) for q in drawn]
+        session["current_question_index"] = 0
+        session["interview_scores"] = []
+        session["interview_evaluations"] = {}
+        session["pending_evaluations"] = {}
+        session["interview_answers"] = {}
+        session["interviewer_settings"] = {
+            "difficulty": difficulty,
+            "behavior": behavior
+        }
+        session["interview_id"] = uuid.uuid4().hex
+        get_progress_store().start_interview(session["interview_id"], self.user_id(session), difficulty, behavior,
+                                             subtopics)
+        return questions
+
+    def _question_subtopic(self, session, question):
+        # Questions without a known subtopic belong to the interview's only subtopic, if it has just one.
+        subtopics = session.get("subtopics", [])
+        return question["subtopic"] or (subtopics[0] if len(subtopics) == 1 else None)
+
+    def current_question(self, session):
+        """
+        Return (index, question) for the question being asked, or (index, None) once all are answered.
+        """
+        idx = session["current_question_index"]
+        questions = session["interview_questions"]
+        return idx, questions[idx] if idx < len(questions) else None
+
+    def submit_answer(self, session, answer, adaptive=False):
+        """
+        Queue the evaluation of the current question's answer on the background pool and move to
+        the next question immediately. With adaptive=True the next question's difficulty follows
+        the scores completed so far.
+        """
+        idx, question = self.current_question(session)
+        if question is None:
+            return
+        session["pending_evaluations"][idx] = submit_background(evaluate_interview_answer, answer, question)
+        session["interview_answers"][idx] = {"question": question, "answer": answer,
+                                             "subtopic": session["question_subtopics"][idx],
+                                             "difficulty": session["interviewer_settings"]["difficulty"]}
+        session["current_question_index"] = idx + 1
+        if adaptive:
+            self.adapt_next_question(session)
+
+    def collect_evaluations(self, session, block=False):
+        """
+        Merge finished background evaluations into interview_evaluations (by question index) and
+        interview_scores (in question order, whatever order they finished in).
+        With block=True, wait for every pending evaluation first (used before the final summary).
+        """
+        pending = session.get("pending_evaluations", {})
+        if block and pending:
+            with phase("background_wait"):
+                wait(list(pending.values()))
+        for idx, future in list(pending.items()):
+            if not future.done():
+                continue
+            try:
+                evaluation = future.result()
+            except Exception as e:
+                evaluation = LLMError(f"LLM Error: {str(e)}")
+            session["interview_evaluations"][idx] = evaluation
+            del pending[idx]
+            answered = session["interview_answers"][idx]
+            score, feedback = parse_evaluation(evaluation)
+            get_progress_store().record_evaluation(
+                session["interview_id"], self.user_id(session), idx, answered["question"], answered["answer"],
+                answered["difficulty"], session["interviewer_settings"]["behavior"], score, feedback,
+                subtopic=answered["subtopic"])
+        evaluations = session.get("interview_evaluations", {})
+        session["interview_scores"] = [evaluations[idx] for idx in sorted(evaluations)]
+
+    def adapt_next_question(self, session):
+        """
+        Move the difficulty one step up or down based on the completed scores so far, and swap the
+        upcoming question for one at the new difficulty if the question bank can supply it without waiting.
+        """
+        self.collect_evaluations(session)
+        scores = [parse_evaluation(e)[0] for e in session["interview_scores"]]
+        scores = [s for s in scores if s is not None]
+        if not scores:
+            return
+        settings = session["interviewer_settings"]
+        level = INTERVIEW_DIFFICULTIES.index(settings["difficulty"])
+        avg_score = sum(scores) / len(scores)
+        if avg_score >= 8:
+            level = min(level + 1, len(INTERVIEW_DIFFICULTIES) - 1)
+        elif avg_score <= 4:
+            level = max(level - 1, 0)
+        difficulty = INTERVIEW_DIFFICULTIES[level]
+        if difficulty == settings["difficulty"]:
+            return
+        settings["difficulty"] = difficulty
+        subtopics = session.get("subtopics", [])
+        asked = session.setdefault("asked_questions", [])
+        prefetch_questions(subtopics, difficulty, settings["behavior"], exclude=asked)
+        idx = session["current_question_index"]
+        questions = session["interview_questions"]
+        if idx < len(questions):
+            replacement = draw_questions(subtopics, difficulty, settings["behavior"], count=1,
+                                         exclude=questions + asked)
+            if replacement:
+                questions[idx] = replacement[0]["question"]
+                asked.append(questions[idx])
+                session["question_subtopics"][idx] = self._question_subtopic(session, replacement[0])
+
+    def finalize_interview(self, session):
+        """
+        Summarize the interview session by calculating an overall score and highlighting strengths and weaknesses.
+        Waits for any evaluations still running.
+        """
+        self.collect_evaluations(session, block=True)
+        scores = []
+        feedbacks = []
+        for eval_text in session["interview_scores"]:
+            score, feedback = parse_evaluation(eval_text)
+            if score is not None:
+                scores.append(score)
+            if feedback is not None:
+                feedbacks.append(feedback)
+        avg_score = sum(scores) / len(scores) if scores else 0
+        get_progress_store().finish_interview(session["interview_id"], avg_score if scores else None)
+        summary = f"Final Interview Score: {avg_score:.1f}/10\n\nFeedback Summary:\n"
+        for fb in feedbacks:
+            summary += f"- {fb}\n"
+        return summary
@@ -0,0 +1,92 @@
+"""
+Throughput and latency of micro-batched vs. unbatched requests at increasing concurrency.
+
+By default the backend is simulated: one call costs a fixed overhead plus a small amount per item,
+like a forward pass (or an HTTP round trip) whose cost is mostly independent of the batch size.
+Pass --model to benchmark a real local model instead (needs torch and transformers).
+
+    python benchmarks/bench_micro_batching.py
+    python benchmarks/bench_micro_batching.py --model Qwen/Qwen2.5-0.5B-Instruct --requests 32 --max-new-tokens 32
+"""
+import os, sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from llm_service.micro_batching import MicroBatcher
+
+
+def simulated_backend(call_overhead, per_item):
+    # One backend instance can run one call at a time, like a single in-process model.
+    lock = threading.Lock()
+
+    def run(prompts):
+        with lock:
+            time.sleep(call_overhead + per_item * len(prompts))
+        return [p[::-1] for p in prompts]
+    return run
+
+def local_backend(model_name, max_new_tokens):
+    from llm_service.local_llm import get_local_model
+
+    model = get_local_model(model_name)
+    lock = threading.Lock()
+
+    def run(prompts):
+        with lock:
+            return model.generate_batch([model._format(p) for p in prompts], 0, max_new_tokens)
+    return run
+
+def measure(call, concurrency, n_requests):
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        call(f"Name one use of Python decorators ({i}).")
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    return n_requests / elapsed, p50, p95
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per measurement.")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=5)
+    parser.add_argument("--call-overhead-ms", type=float, default=20, help="Simulated cost of one call.")
+    parser.add_argument("--per-item-ms", type=float, default=2, help="Simulated extra cost per batched item.")
+    parser.add_argument("--model", help="Benchmark this local model instead of the simulated backend.")
+    parser.add_argument("--max-new-tokens", type=int, default=32)
+    args = parser.parse_args()
+
+    if args.model:
+        backend = local_backend(args.model, args.max_new_tokens)
+    else:
+        backend = simulated_backend(args.call_overhead_ms / 1000, args.per_item_ms / 1000)
+
+    def unbatched(prompt):
+        return backend([prompt])[0]
+
+    print(f"{'concurrency':>11} | {'mode':>9} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'batch':>5}")
+    for concurrency in args.concurrency:
+        throughput, p50, p95 = measure(unbatched, concurrency, args.requests)
+        print(f"{concurrency:>11} | {'unbatched':>9} | {throughput:>8.1f} | {p50:>8.1f} | {p95:>8.1f} | {1:>5.1f}")
+        batcher = MicroBatcher(lambda key, prompts: backend(prompts), max_batch_size=args.max_batch_size,
+                               max_wait=args.max_wait_ms / 1000)
+        throughput, p50, p95 = measure(lambda p: batcher.submit(p).result(), concurrency, args.requests)
+        mean_batch = batcher.stats()["mean_batch_size"]
+        print(f"{concurrency:>11} | {'batched':>9} | {throughput:>8.1f} | {p50:>8.1f} | {p95:>8.1f} | {mean_batch:>5.1f}")
+
+
+if __name__ == "__main__":
+    main()
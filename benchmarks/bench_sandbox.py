@@ -0,0 +1,100 @@
+"""
+Throughput and latency of graded code submissions at increasing concurrency: the warm sandbox pool
+(pre-started workers forking one child per run) vs. starting a fresh interpreter per submission
+under the same resource limits.
+
+    python benchmarks/bench_sandbox.py
+    python benchmarks/bench_sandbox.py --workers 8 --concurrency 1 8 32 64 --requests 400
+"""
+import os, sys
+import json
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+from Tutor.sandbox import SandboxPool, SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_TIMEOUT
+
+# Typical learner submissions: cheap string and list work, and a little real computation.
+SUBMISSIONS = [
+    ("def is_palindrome(s):\n    s = ''.join(c.lower() for c in s if c.isalnum())\n    return s == s[::-1]\n",
+     ["assert is_palindrome('A man, a plan, a canal: Panama')", "assert not is_palindrome('python')"]),
+    ("from collections import Counter\n\ndef top_word(text):\n    return Counter(text.split()).most_common(1)[0][0]\n",
+     ["assert top_word('a b a c a') == 'a'"]),
+    ("def primes(n):\n    sieve = [True] * (n + 1)\n    for i in range(2, int(n ** 0.5) + 1):\n"
+     "        if sieve[i]:\n            sieve[i * i::i] = [False] * len(sieve[i * i::i])\n"
+     "    return [i for i in range(2, n + 1) if sieve[i]]\n",
+     ["assert primes(10) == [2, 3, 5, 7]", "assert len(primes(100000)) == 9592"]),
+]
+
+# Runs one submission in a fresh interpreter, printing the same kind of result the pool returns.
+COLD_RUNNER = """
+import sys, json, resource
+job = json.loads(sys.stdin.read())
+cpu, memory = job["limits"]
+resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+resource.setrlimit(resource.RLIMIT_AS, (memory << 20, memory << 20))
+namespace = {"__name__": "__main__"}
+exec(compile(job["code"], "<submission>", "exec"), namespace)
+passed = 0
+for test in job["tests"]:
+    try:
+        exec(compile(test, "<test>", "exec"), namespace)
+        passed += 1
+    except Exception:
+        pass
+print(json.dumps({"status": "passed" if passed == len(job["tests"]) else "failed"}))
+"""
+
+
+def cold_run(code, tests):
+    job = json.dumps({"code": code, "tests": tests, "limits": [SANDBOX_CPU_SECONDS, SANDBOX_MEMORY_MB]})
+    completed = subprocess.run([sys.executable, "-c", COLD_RUNNER], input=job, capture_output=True, text=True,
+                               timeout=SANDBOX_TIMEOUT)
+    return json.loads(completed.stdout)
+
+def measure(run, concurrency, n_requests):
+    latencies = []
+    statuses = []
+
+    def one(i):
+        code, tests = SUBMISSIONS[i % len(SUBMISSIONS)]
+        start = time.perf_counter()
+        statuses.append(run(code, tests)["status"])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(n_requests)))
+    elapsed = time.perf_counter() - start
+    if any(status != "passed" for status in statuses):
+        raise RuntimeError(f"Unexpected results: {sorted(set(statuses))}")
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    return n_requests / elapsed, p50, p95
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Sandbox pool workers.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Submissions per measurement.")
+    parser.add_argument("--skip-cold", action="store_true", help="Only measure the warm pool.")
+    args = parser.parse_args()
+
+    pool = SandboxPool(workers=args.workers)
+    pool.run("pass")  # wait for the workers to start
+
+    print(f"{'concurrency':>11} | {'mode':>5} | {'runs/s':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for concurrency in args.concurrency:
+        throughput, p50, p95 = measure(pool.run, concurrency, args.requests)
+        print(f"{concurrency:>11} | {'warm':>5} | {throughput:>8.1f} | {p50:>8.1f} | {p95:>8.1f}")
+        if not args.skip_cold:
+            throughput, p50, p95 = measure(cold_run, concurrency, args.requests)
+            print(f"{concurrency:>11} | {'cold':>5} | {throughput:>8.1f} | {p50:>8.1f} | {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Load test of one tutor process: N simulated learners run the full journey concurrently against a
+mock LLM endpoint, at increasing numbers of learners.
+
+Each learner drives the headless TutorService (the same code path as tutor_resume.py, one thread per
+learner like Streamlit's script threads) through: profile -> assessment -> topics -> lessons ->
+PDF upload and questions -> interview. Per level the report shows p50/p95/p99 latency per step,
+journeys per second, peak RSS and CPU use of the process, and the level at which latency degrades
+(journey p95 over --degradation times the first level's p95).
+
+By default a mock OpenAI server (benchmarks/mock_llm_server.py) is started on a free port and the
+caches live in a fresh temporary directory. One unmeasured warm-up journey runs first, so the first
+level does not pay for imports, worker start-up and connection set-up. Each level (and the warm-up)
+uses its own topics and documents, so no level is served from what an earlier one cached; learners
+within a level still share them. With --share-caches every level uses the same topics and documents,
+as in a long-running process.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --learners 1 4 16 64 --ttft-ms 500 --token-ms 10 --think-ms 200
+    python benchmarks/load_test.py --mock-url http://127.0.0.1:8765/v1
+"""
+import os, sys
+import io
+import time
+import socket
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+
+STEPS = ["assessment", "topics", "lesson", "pdf_upload", "pdf_question", "interview_start", "answer",
+         "interview_finalize", "journey"]
+
+TOPIC_POOL = ["Python Basics", "Decorators", "Generators", "Async IO", "Type Hints", "Testing", "Pandas",
+              "NumPy", "Machine Learning", "Prompt Engineering", "Web Scraping", "FastAPI", "SQL", "Data Classes"]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+PERSONALITIES = ["Curious and methodical, likes worked examples.", "Impatient, wants the short version first.",
+                 "Visual thinker who enjoys analogies.", "Detail oriented and skeptical of hand-waving."]
+QUESTIONS = ["What is the main idea of this document?", "Summarize the section about generators.",
+             "How do decorators wrap a function?", "What are the performance tips mentioned?",
+             "Give an example from the text."]
+
+
+def make_pdf(lines):
+    """
+    A minimal one-page PDF with the given lines of text (extractable by PyPDF2).
+    """
+    def escape(s):
+        return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    text = "BT /F1 11 Tf 50 780 Td 14 TL " + " ".join(f"({escape(line)}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(text)} >>\nstream\n{text}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+def course_notes(rng):
+    sentences = [
+        "Generators produce values lazily with the yield statement and keep their state between calls.",
+        "A decorator is a callable that takes a function and returns a new function wrapping it.",
+        "Context managers implement __enter__ and __exit__ and are used with the with statement.",
+        "List comprehensions are usually faster than building a list with append in a loop.",
+        "Profile before optimising: cProfile shows where the time of a program is actually spent.",
+        "Async IO runs many waiting tasks on one thread by switching at await points.",
+    ]
+    return [rng.choice(sentences) for _ in range(40)]
+
+
+class ResourceSampler:
+    """
+    Samples the RSS and CPU time of this process in the background.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop = threading.Event()
+
+    @staticmethod
+    def rss():
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # peak, in KiB on Linux
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, self.rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._start_wall, self._start_cpu = time.perf_counter(), sum(os.times()[:2])
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self.rss())
+        wall = time.perf_counter() - self._start_wall
+        self.cpu_percent = 100 * (sum(os.times()[:2]) - self._start_cpu) / wall if wall else 0.0
+
+
+def run_journey(service, learner, args, timings, cache_tag=""):
+    """
+    One learner's full journey, adding each step's latency (seconds) to `timings[step]`.
+    `cache_tag` is appended to the topics and added to the uploaded document, so journeys with different
+    tags never hit each other's cached lessons, questions, documents or answers.
+    """
+    rng = random.Random(learner)
+    session = {"user_id": f"load-test-{learner}"}
+
+    def timed(step, call, *call_args):
+        start = time.perf_counter()
+        result = call(*call_args)
+        timings[step].append(time.perf_counter() - start)
+        if args.think_ms:
+            time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+        return result
+
+    journey_start = time.perf_counter()
+    profile = {
+        "name": f"Learner {learner}", "age": rng.randint(18, 60), "personality": rng.choice(PERSONALITIES),
+        "tone_paragraph": "I like clear explanations with a bit of humour.",
+        "learning_goals": "Get comfortable with Python for data work.", "level": rng.choice(LEVELS),
+        "topics": ", ".join(f"{topic}{cache_tag}" for topic in rng.sample(TOPIC_POOL, 2)),
+    }
+    service.set_profile(session, profile)
+    timed("assessment", service.assess_profile, session)
+    dynamic_topics = timed("topics", service.generate_dynamic_topics, session)
+
+    subtopics = [(topic, s) for topic, subs in dynamic_topics.items() for s in subs]
+    for topic, subtopic in subtopics[:args.lessons]:
+        timed("lesson", lambda: "".join(service.stream_lesson(session, topic, subtopic)))
+
+    pdf_file = io.BytesIO(make_pdf(course_notes(rng) + ([f"Notes{cache_tag}"] if cache_tag else [])))
+    pdf_file.name = f"notes-{learner}.pdf"
+    doc_id = timed("pdf_upload", service.upload_document, session, pdf_file)
+    for _ in range(args.questions):
+        timed("pdf_question", service.answer_document_question, session, rng.choice(QUESTIONS),
+              [doc_id] if doc_id else None)
+
+    interview_subtopics = [s for _, s in subtopics[:2]] or [f"Python Basics{cache_tag}"]
+    questions = timed("interview_start", service.start_interview, session, interview_subtopics, "Medium", "Polite")
+    for question in questions:
+        timed("answer", service.submit_answer, session, f"My answer to: {question}", True)
+    timed("interview_finalize", service.finalize_interview, session)
+    service.forget_documents(session)
+    timings["journey"].append(time.perf_counter() - journey_start)
+
+def run_level(service, n_learners, first_learner, args, cache_tag=""):
+    timings = {step: [] for step in STEPS}
+    errors = []
+
+    def learner(i):
+        for j in range(args.journeys):
+            try:
+                run_journey(service, first_learner + i * args.journeys + j, args, timings, cache_tag)
+            except Exception as e:
+                errors.append(repr(e))
+
+    with ResourceSampler() as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_learners) as executor:
+            list(executor.map(learner, range(n_learners)))
+        elapsed = time.perf_counter() - start
+    return {
+        "learners": n_learners,
+        "timings": timings,
+        "errors": errors,
+        "journeys_per_s": len(timings["journey"]) / elapsed,
+        "peak_rss_mb": sampler.peak_rss / 2**20,
+        "cpu_percent": sampler.cpu_percent,
+    }
+
+def percentiles(values):
+    if not values:
+        return (float("nan"),) * 3
+    return tuple(np.percentile(values, [50, 95, 99]) * 1000)
+
+def print_level(result):
+    print(f"\n== {result['learners']} concurrent learners: {result['journeys_per_s']:.2f} journeys/s, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB, CPU {result['cpu_percent']:.0f}% ==")
+    print(f"{'step':>18} | {'n':>5} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9}")
+    for step in STEPS:
+        values = result["timings"][step]
+        p50, p95, p99 = percentiles(values)
+        print(f"{step:>18} | {len(values):>5} | {p50:>9.1f} | {p95:>9.1f} | {p99:>9.1f}")
+    if result["errors"]:
+        print(f"{len(result['errors'])} failed journeys, e.g. {result['errors'][0]}")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_mock(args):
+    port = free_port()
+    command = [sys.executable, os.path.join(os.path.dirname(__file__), "mock_llm_server.py"), "--port", str(port),
+               "--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms), "--words", str(args.words)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}/v1"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock LLM server did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--learners", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32],
+                        help="Numbers of concurrent learners to measure, in order.")
+    parser.add_argument("--journeys", type=int, default=1, help="Journeys per learner and level.")
+    parser.add_argument("--lessons", type=int, default=2, help="Lessons viewed per journey.")
+    parser.add_argument("--questions", type=int, default=2, help="PDF questions asked per journey.")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a learner's steps.")
+    parser.add_argument("--degradation", type=float, default=2.0,
+                        help="Latency degrades once journey p95 exceeds this multiple of the first level's.")
+    parser.add_argument("--mock-url", help="Use an already running mock (or real) OpenAI-compatible endpoint.")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Mock delay before the first token.")
+    parser.add_argument("--token-ms", type=float, default=5, help="Mock delay per token.")
+    parser.add_argument("--words", type=int, default=150, help="Mock free-text response length.")
+    parser.add_argument("--cache-dir", help="Cache directory (default: a fresh temporary directory).")
+    parser.add_argument("--share-caches", action="store_true",
+                        help="Let every level reuse the topics and documents (and so the caches) of earlier ones.")
+    args = parser.parse_args()
+
+    mock = None
+    if args.mock_url:
+        url = args.mock_url
+    else:
+        mock, url = start_mock(args)
+    # The app reads these when its modules are imported, so they are set first.
+    os.environ["OPENAI_BASE_URL"] = url
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    os.environ["INSIGHTSLIB_CACHE_DIR"] = args.cache_dir or tempfile.mkdtemp(prefix="insightslib-load-")
+    from Tutor.tutor_service import TutorService
+
+    service = TutorService()
+    print(f"LLM endpoint {url}, caches in {os.environ['INSIGHTSLIB_CACHE_DIR']}")
+    results = []
+    next_learner = 0
+    try:
+        warm_up = run_level(service, 1, next_learner, args, "" if args.share_caches else " (warm-up)")
+        next_learner += args.journeys
+        print(f"Warm-up journey: {percentiles(warm_up['timings']['journey'])[0]:.0f} ms (not measured)")
+        for level, n_learners in enumerate(args.learners, start=1):
+            cache_tag = "" if args.share_caches else f" (set {level})"
+            result = run_level(service, n_learners, next_learner, args, cache_tag)
+            next_learner += n_learners * args.journeys
+            print_level(result)
+            results.append(result)
+    finally:
+        if mock is not None:
+            mock.terminate()
+
+    print(f"\n{'learners':>8} | {'journeys/s':>10} | {'journey p95 ms':>14} | {'RSS MB':>7} | {'CPU %':>6}")
+    baseline = percentiles(results[0]["timings"]["journey"])[1]
+    knee = None
+    for result in results:
+        p95 = percentiles(result["timings"]["journey"])[1]
+        print(f"{result['learners']:>8} | {result['journeys_per_s']:>10.2f} | {p95:>14.1f} | "
+              f"{result['peak_rss_mb']:>7.0f} | {result['cpu_percent']:>6.0f}")
+        if knee is None and p95 > args.degradation * baseline:
+            knee = result["learners"]
+    if knee is None:
+        print(f"\nJourney p95 stayed within {args.degradation}x of the first level's up to "
+              f"{results[-1]['learners']} learners.")
+    else:
+        print(f"\nLatency degrades at {knee} concurrent learners (journey p95 > {args.degradation}x baseline).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+A local mock of the OpenAI chat completions API, for load tests that must not call (or pay for) a real LLM.
+
+It answers POST /v1/chat/completions after a simulated delay, with or without streaming:
+- structured requests (response_format json_schema) get a JSON instance of the schema;
+- interview evaluations get a 'Score: X. Feedback: ...' text;
+- everything else gets filler text of --words words.
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 (any OPENAI_API_KEY works).
+
+    python benchmarks/mock_llm_server.py --port 8765 --ttft-ms 300 --token-ms 5
+"""
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("python function class module value list loop generator decorator context manager type error "
+         "example pattern data model test result state design interface call return object method").split()
+
+
+def filler(n_words, rng):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+def _deref(schema, root):
+    while "$ref" in schema:
+        target = root
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            target = target[part]
+        schema = target
+    return schema
+
+def schema_instance(schema, root, prompt_items, rng, name=""):
+    """
+    A value matching the JSON `schema`. Arrays of objects with a 'topic' field get one item per bulleted
+    line of the prompt (with that line as the topic), so the app's topic validation accepts them; items
+    with a 'subtopic' field take the bulleted lines in turn as their subtopic.
+    """
+    schema = _deref(schema, root)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return schema_instance(options[0], root, prompt_items, rng, name)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {key: schema_instance(sub, root, prompt_items, rng, key)
+                for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        items = schema.get("items", {})
+        target = _deref(items, root)
+        if prompt_items and "topic" in target.get("properties", {}):
+            values = []
+            for topic in prompt_items:
+                value = schema_instance(target, root, [], rng, name)
+                value["topic"] = topic
+                values.append(value)
+            return values
+        values = [schema_instance(items, root, prompt_items, rng, name) for _ in range(5)]
+        if prompt_items and "subtopic" in target.get("properties", {}):
+            for i, value in enumerate(values):
+                value["subtopic"] = prompt_items[i % len(prompt_items)]
+        return values
+    if kind == "integer":
+        return rng.randint(1, 10)
+    if kind == "number":
+        return round(rng.uniform(1, 10), 1)
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return f"{name.replace('_', ' ').title() or 'Item'}: {filler(rng.randint(3, 8), rng)}"
+
+def respond(body, args, rng):
+    prompt = "\n".join(m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str))
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"]["schema"]
+        items = re.findall(r"^- (.+)$", prompt, flags=re.MULTILINE)
+        return json.dumps(schema_instance(schema, schema, items, rng))
+    if "Score: X" in prompt:
+        return f"Score: {rng.randint(3, 10)}. Feedback: {filler(30, rng)}"
+    return filler(args.words, rng)
+
+def chunks(text):
+    # Roughly one token per chunk.
+    return re.findall(r"\S+\s*|\s+", text)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/health"):
+            self._json(200, {"status": "ok"})
+        else:
+            self._json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "Not found"}})
+            return
+        args = self.server.args
+        rng = random.Random()
+        content = respond(body, args, rng)
+        tokens = chunks(content)
+        base = {"id": f"chatcmpl-mock{rng.getrandbits(32):x}", "created": int(time.time()),
+                "model": body.get("model", "mock")}
+        time.sleep(args.ttft_ms / 1000)
+        if not body.get("stream"):
+            time.sleep(len(tokens) * args.token_ms / 1000)
+            usage = {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)}
+            self._json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None):
+            payload = {**base, "object": "chat.completion.chunk",
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for token in tokens:
+            time.sleep(args.token_ms / 1000)
+            event({"content": token})
+        event({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(args):
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    server.args = args
+    server.serve_forever()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=300, help="Delay before the first token.")
+    parser.add_argument("--token-ms", type=float, default=5, help="Delay per generated token.")
+    parser.add_argument("--words", type=int, default=150, help="Length of free-text responses.")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args()
+    print(f"Mock LLM listening on http://{args.host}:{args.port}/v1", flush=True)
+    try:
+        serve(args)
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+import os
+import json
+import time
+import uuid
+from openai import OpenAI
+from llm_service.llm_generator import generate_llm_response, is_llm_error, OPENAI_API_KEY
+
+# OpenAI accepts at most 50,000 requests per batch; larger prompt sets are split.
+MAX_REQUESTS_PER_BATCH = 50000
+DEFAULT_POLL_INTERVAL = 60
+
+# Job states, in order.
+JOB_CREATED = "created"
+JOB_SUBMITTED = "submitted"
+JOB_COMPLETED = "completed"
+JOB_LOADED = "loaded"
+
+FINISHED_BATCH_STATES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _read_jsonl(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _write_jsonl(path, records):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    os.replace(tmp_path, path)
+
+
+class OpenAIBatchBackend:
+    """
+    Runs prompt sets through the OpenAI Batch API (asynchronous, lower per-token price,
+    results within the completion window).
+    """
+    name = "openai"
+
+    def __init__(self, completion_window="24h"):
+        self.client = OpenAI(api_key=OPENAI_API_KEY)
+        self.completion_window = completion_window
+
+    def validate(self, requests):
+        """
+        Raise ValueError for requests this backend cannot run: only OpenAI models are batched here.
+        """
+        others = sorted({r.get("provider", "openai") for r in requests} - {"openai"})
+        if others:
+            raise ValueError(f"The openai batch backend only runs OpenAI requests, not {', '.join(others)}; "
+                             "use the local backend for other providers.")
+
+    def submit(self, requests_path, work_dir):
+        """
+        Upload a request file and start a batch; returns the provider's batch id.
+        """
+        upload_path = os.path.join(work_dir, f"{os.path.basename(requests_path)}.openai.jsonl")
+        _write_jsonl(upload_path, [
+            {
+                "custom_id": r["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": r["model"],
+                    "messages": [{"role": "user", "content": r["prompt"]}],
+                    "temperature": r.get("temperature", 0.7),
+                },
+            }
+            for r in _read_jsonl(requests_path)
+        ])
+        with open(upload_path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def poll(self, batch_id, requests_path, work_dir):
+        """
+        Return the batch status, and its results as {custom_id: (content, error)} once finished.
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in FINISHED_BATCH_STATES:
+            return batch.status, None
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code") != 200:
+                    error = record.get("error") or response.get("body", {}).get("error")
+                    results[record["custom_id"]] = (None, str(error))
+                else:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    results[record["custom_id"]] = (content, None)
+        return batch.status, results
+
+
+class LocalBatchBackend:
+    """
+    Local stand-in for a provider batch API, for testing and for providers without one.
+    Requests are run through `generate_fn` (generate_llm_response by default) when the job is
+    polled; each answer is appended to an output file as it completes, so a crashed run
+    resumes where it stopped.
+    """
+    name = "local"
+
+    def __init__(self, generate_fn=None):
+        self.generate_fn = generate_fn or (
+            lambda r: generate_llm_response(r["prompt"], provider=r.get("provider", "openai"),
+                                            model=r["model"], temperature=r.get("temperature", 0.7)))
+
+    def validate(self, requests):
+        pass
+
+    def submit(self, requests_path, work_dir):
+        return f"local-{uuid.uuid4().hex[:12]}"
+
+    def poll(self, batch_id, requests_path, work_dir):
+        output_path = os.path.join(work_dir, f"{batch_id}.output.jsonl")
+        done = {r["custom_id"] for r in _read_jsonl(output_path)}
+        with open(output_path, "a", encoding="utf-8") as out:
+            for r in _read_jsonl(requests_path):
+                if r["custom_id"] in done:
+                    continue
+                content = self.generate_fn(r)
+                if is_llm_error(content):
+                    record = {"custom_id": r["custom_id"], "content": None, "error": content}
+                else:
+                    record = {"custom_id": r["custom_id"], "content": content, "error": None}
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+        results = {r["custom_id"]: (r["content"], r["error"]) for r in _read_jsonl(output_path)}
+        return "completed", results
+
+
+BATCH_BACKENDS = {
+    "openai": OpenAIBatchBackend,
+    "local": LocalBatchBackend,
+}
+
+
+class BatchJob:
+    """
+    A bulk generation job whose state lives in a directory on disk:
+
+    - state.json: job status and the provider batch id of every chunk
+    - requests-<n>.jsonl: the prompts of each chunk
+    - results.jsonl: one {custom_id, content, error} record per finished request
+
+    A request the provider returned no result for (e.g. the batch failed, expired or was cancelled)
+    is recorded as an error naming the batch's final status. Every step saves its state before moving on, so calling run() again after a crash
+    picks up from the last saved step instead of resubmitting (and re-paying for) the prompts.
+    """
+
+    def __init__(self, job_dir, backend):
+        self.job_dir = job_dir
+        self.backend = backend
+        self.state_path = os.path.join(job_dir, "state.json")
+        self.results_path = os.path.join(job_dir, "results.jsonl")
+        with open(self.state_path, "r", encoding="utf-8") as f:
+            self.state = json.load(f)
+        # Batch ids are only meaningful to the backend that issued them.
+        if self.state["backend"] != backend.name:
+            raise ValueError(f"The job in {job_dir} was created with the {self.state['backend']} backend, "
+                             f"not {backend.name}.")
+
+    @classmethod
+    def create(cls, job_dir, requests, backend, metadata=None):
+        """
+        Create a job from a list of requests ({custom_id, prompt, model, temperature, provider}).
+        If the job directory already holds a job, that job is resumed instead.
+        """
+        state_path = os.path.join(job_dir, "state.json")
+        if os.path.exists(state_path):
+            return cls(job_dir, backend)
+        os.makedirs(job_dir, exist_ok=True)
+        custom_ids = [r["custom_id"] for r in requests]
+        if len(set(custom_ids)) != len(custom_ids):
+            raise ValueError("Batch request custom_ids must be unique.")
+        backend.validate(requests)
+        chunks = []
+        for start in range(0, len(requests), MAX_REQUESTS_PER_BATCH):
+            path = os.path.join(job_dir, f"requests-{len(chunks)}.jsonl")
+            _write_jsonl(path, requests[start:start + MAX_REQUESTS_PER_BATCH])
+            chunks.append({"requests_path": path, "batch_id": None, "status": JOB_CREATED})
+        state = {
+            "status": JOB_CREATED,
+            "backend": backend.name,
+            "created_at": time.time(),
+            "total_requests": len(requests),
+            "chunks": chunks,
+            "metadata": metadata or {},
+        }
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        return cls(job_dir, backend)
+
+    @classmethod
+    def load(cls, job_dir, backend):
+        return cls(job_dir, backend)
+
+    @property
+    def status(self):
+        return self.state["status"]
+
+    @property
+    def metadata(self):
+        return self.state["metadata"]
+
+    def _save_state(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def submit(self):
+        """
+        Submit every chunk that has not been submitted yet.
+        """
+        for chunk in self.state["chunks"]:
+            if chunk["batch_id"] is None:
+                chunk["batch_id"] = self.backend.submit(chunk["requests_path"], self.job_dir)
+                chunk["status"] = JOB_SUBMITTED
+                self._save_state()
+        self.state["status"] = JOB_SUBMITTED
+        self._save_state()
+
+    def poll(self):
+        """
+        Check unfinished chunks once, saving the results of those that finished.
+        Returns True when every chunk has finished.
+        """
+        results = {r["custom_id"]: r for r in _read_jsonl(self.results_path)}
+        for chunk in self.state["chunks"]:
+            if chunk["status"] == JOB_COMPLETED:
+                continue
+            status, chunk_results = self.backend.poll(chunk["batch_id"], chunk["requests_path"], self.job_dir)
+            if chunk_results is None:
+                continue
+            for custom_id, (content, error) in chunk_results.items():
+                results[custom_id] = {"custom_id": custom_id, "content": content, "error": error}
+            for r in _read_jsonl(chunk["requests_path"]):
+                if r["custom_id"] not in chunk_results:
+                    results[r["custom_id"]] = {"custom_id": r["custom_id"], "content": None,
+                                               "error": f"No result: the batch ended with status '{status}'."}
+            _write_jsonl(self.results_path, list(results.values()))
+            chunk["status"] = JOB_COMPLETED
+            chunk["provider_status"] = status
+            self._save_state()
+        if all(chunk["status"] == JOB_COMPLETED for chunk in self.state["chunks"]):
+            self.state["status"] = JOB_COMPLETED
+            self._save_state()
+            return True
+        return False
+
+    def provider_statuses(self):
+        """
+        Return the final provider status of every finished chunk (e.g. 'completed', 'expired').
+        """
+        return [chunk["provider_status"] for chunk in self.state["chunks"] if "provider_status" in chunk]
+
+    def results(self):
+        """
+        Return {custom_id: (content, error)} for every finished request.
+        """
+        return {r["custom_id"]: (r["content"], r["error"]) for r in _read_jsonl(self.results_path)}
+
+    def mark_loaded(self):
+        self.state["status"] = JOB_LOADED
+        self._save_state()
+
+    def run(self, on_results=None, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        Drive the job to completion from whatever state it is in.
+
+        :param on_results: Optional callable receiving results() once the job has completed;
+                           the job is marked as loaded afterwards so it is not called twice.
+        :param poll_interval: Seconds to wait between polls of the provider.
+        :return: The job results as {custom_id: (content, error)}.
+        """
+        if self.status == JOB_CREATED:
+            self.submit()
+        while self.status == JOB_SUBMITTED and not self.poll():
+            time.sleep(poll_interval)
+        if self.status == JOB_COMPLETED and on_results is not None:
+            on_results(self.results())
+            self.mark_loaded()
+        return self.results()
@@ -0,0 +1,70 @@
+import os
+import re
+import hashlib
+import threading
+import numpy as np
+
+# Local, CPU-only text embeddings for retrieval and caching.
+# Texts are embedded with a small sentence-transformers model (LOCAL_EMBEDDING_MODEL), so paraphrases
+# of the same question land close together. If sentence-transformers is not installed or the model
+# cannot be loaded, or LOCAL_EMBEDDING_MODEL is set to "", texts are embedded with feature hashing
+# instead: no model download, but only texts sharing words and word pairs are similar.
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+HASHING_DIM = 512
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+
+def _get_model():
+    # The sentence-transformers model, or None when embedding falls back to feature hashing.
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            if LOCAL_EMBEDDING_MODEL:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    _model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu")
+                except Exception as e:
+                    print(f"Embedding model {LOCAL_EMBEDDING_MODEL!r} unavailable ({e}); using feature hashing.")
+        return _model
+
+def embedder_name():
+    """
+    Identifies the embedding scheme, so stored vectors are never compared with vectors from another one.
+    """
+    return f"st:{LOCAL_EMBEDDING_MODEL}" if _get_model() is not None else f"hashing:{HASHING_DIM}"
+
+def _features(text):
+    words = re.findall(r"\w+", text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def _hash_embed(text):
+    vector = np.zeros(HASHING_DIM, dtype=np.float32)
+    for feature in _features(text):
+        h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+        # The low bits pick the bucket; one more bit picks the sign, so collisions tend to cancel out.
+        vector[h % HASHING_DIM] += 1.0 if (h >> 32) & 1 else -1.0
+    return vector
+
+def embed_texts(texts):
+    """
+    Embed a list of texts into an (n, dim) float32 array of L2-normalised rows,
+    so a dot product between rows is their cosine similarity.
+    """
+    model = _get_model()
+    if model is not None:
+        vectors = np.asarray(model.encode(list(texts)), dtype=np.float32)
+    else:
+        vectors = np.stack([_hash_embed(t) for t in texts]) if texts else np.zeros((0, HASHING_DIM), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def embed_text(text):
+    """
+    Embed a single text into a normalised 1-D float32 vector.
+    """
+    return embed_texts([text])[0]
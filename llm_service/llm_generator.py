@@ -5,6 +5,16 @@ import json
 from openai import OpenAI
 from dotenv import load_dotenv
 import base64
+import time
+import threading
+from requests.adapters import HTTPAdapter
+from pydantic import ValidationError
+from llm_service.tokenizer import enforce_budget
+from llm_service.local_llm import generate_local
+from llm_service.micro_batching import MicroBatcher
+from llm_service.tasks import select_model, record_latency
+from llm_service.partial_json import parse_partial_json, partial_model
+from llm_service.profiling import phase, timed_phase, timed_iter
 
 load_dotenv()
 
@@ -21,30 +31,146 @@ def encode_image(image_path):
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
-# If using the official OpenAI Python library:
+# Provider clients are created once per process and shared by every request, so connections
+# (and TLS handshakes) are pooled instead of being set up again for each call.
+HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "32"))
 
+_client_lock = threading.Lock()
+_openai_client = None
+_http_session = None
 
 
+def get_openai_client():
+    """
+    Return the shared OpenAI client.
+    """
+    global _openai_client
+    with _client_lock:
+        if _openai_client is None:
+            _openai_client = OpenAI(api_key=OPENAI_API_KEY)
+        return _openai_client
+
+def get_http_session():
+    """
+    Return the shared requests session used for the HTTP-based providers (Hugging Face, Claude, Gemini).
+    """
+    global _http_session
+    with _client_lock:
+        if _http_session is None:
+            _http_session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+            _http_session.mount("https://", adapter)
+            _http_session.mount("http://", adapter)
+        return _http_session
+
+
+# Concurrent Hugging Face requests for the same model and temperature are micro-batched: they are
+# collected for up to HF_MAX_WAIT_MS and sent as one request with a list of inputs.
+HF_MAX_BATCH_SIZE = int(os.getenv("HF_MAX_BATCH_SIZE", "8"))
+HF_MAX_WAIT_MS = float(os.getenv("HF_MAX_WAIT_MS", "10"))
+HF_MAX_CONCURRENT_BATCHES = int(os.getenv("HF_MAX_CONCURRENT_BATCHES", "8"))
+
+_huggingface_batcher = None
+
+
+def _huggingface_batch(key, prompts):
+    model, temperature = key
+    huggingface_url = f"https://api-inference.huggingface.co/models/{model}"
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+    payload = {
+        "inputs": prompts if len(prompts) > 1 else prompts[0],
+        "parameters": {"temperature": temperature, "max_new_tokens": 300},
+        "options": {"wait_for_model": True}
+    }
+    hf_response = get_http_session().post(huggingface_url, headers=headers, json=payload)
+    if hf_response.status_code != 200:
+        return [LLMError(f"HuggingFace API Error: {hf_response.text}")] * len(prompts)
+    data = hf_response.json()
+    if len(prompts) == 1:
+        data = [data]
+    if not isinstance(data, list) or len(data) != len(prompts):
+        return [str(data)] * len(prompts)
+    results = []
+    for item in data:
+        # Some Hugging Face models return a list of generated texts per input
+        # You may need to adapt parsing logic for your specific model
+        if isinstance(item, list) and len(item) > 0:
+            item = item[0]
+        if isinstance(item, dict) and "generated_text" in item:
+            results.append(item["generated_text"])
+        else:
+            results.append(str(item))
+    return results
+
+def get_huggingface_batcher():
+    """
+    Return the shared micro-batcher for Hugging Face Inference API requests.
+    """
+    global _huggingface_batcher
+    with _client_lock:
+        if _huggingface_batcher is None:
+            _huggingface_batcher = MicroBatcher(_huggingface_batch, max_batch_size=HF_MAX_BATCH_SIZE,
+                                                max_wait=HF_MAX_WAIT_MS / 1000,
+                                                max_concurrent_batches=HF_MAX_CONCURRENT_BATCHES,
+                                                name="huggingface-batcher")
+        return _huggingface_batcher
+
 
 # If using Anthropic's Python library for Claude (hypothetical usage):
 #   pip install anthropic
 #   import anthropic
 #   anthropic.Client(ANTHROPIC_API_KEY)
 
-def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7):
+class LLMError(str):
+    """
+    Error text returned (or, when streaming, yielded) instead of a response when an LLM call fails.
+    It is a str, so callers that display responses as they are keep working; use is_llm_error to
+    tell it apart from a response.
+    """
+
+# The error texts start with one of these, so errors are still recognised once the text has lost its
+# type (e.g. after being stored as JSON).
+LLM_ERROR_PREFIXES = ("LLM Error:", "HuggingFace API Error:", "Claude API Error:", "Gemini API Error:")
+
+
+def is_llm_error(result):
+    """
+    True if `result` is an error returned by this module instead of a response.
+    """
+    return isinstance(result, LLMError) or (isinstance(result, str) and result.startswith(LLM_ERROR_PREFIXES))
+
+def _run_task(fn, task, structured, prompt, *args):
+    # Run fn with the provider, model and temperature chosen for the task, and report its latency.
+    tier, settings = select_model(task, structured=structured)
+    start = time.perf_counter()
+    result = fn(prompt, *args, **settings)
+    # The latency of a failed call says nothing about the tier.
+    if not is_llm_error(result):
+        record_latency(task, tier, time.perf_counter() - start)
+    return result
+
+@timed_phase("network")
+def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7, task=None):
     """
-    Generates a response from various LLM providers (OpenAI, Hugging Face, Claude, Google Gemini).
+    Generates a response from various LLM providers (OpenAI, Hugging Face, Claude, Google Gemini),
+    or from a small model running in-process on CPU ('local').
     
     :param prompt: The prompt or query string.
-    :param provider: Which LLM provider to use ('openai', 'huggingface', 'claude', 'gemini').
+    :param provider: Which LLM provider to use ('openai', 'huggingface', 'claude', 'gemini', 'local').
     :param model: Model name (e.g., 'gpt-4', 'gpt-4o', 'claude-v1', 'google-gemini', etc.).
     :param temperature: Sampling temperature (if applicable).
+    :param task: Task class (see llm_service.tasks, e.g. 'subtopics' or 'lesson'). If given, the provider,
+        model and temperature are chosen for the task instead of taken from the arguments.
     :return: The text response from the LLM, or an error string if something fails.
     """
+    if task is not None:
+        return _run_task(generate_llm_response, task, False, prompt)
     try:
+        # Oversized prompts are cut down to the model's context window instead of failing at the API.
+        prompt = enforce_budget(prompt, model)
         if provider.lower() == "openai":
             # Using OpenAI's official Python library
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = get_openai_client()
             response = client.chat.completions.create(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
@@ -52,30 +178,16 @@ def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature
             )
             return response.choices[0].message.content
         
+        elif provider.lower() == "local":
+            # Small Hugging Face model (e.g. "Qwen/Qwen2.5-0.5B-Instruct") loaded once in this process
+            return generate_local(prompt, model=model, temperature=temperature)
+        
         elif provider.lower() == "huggingface":
             # Using Hugging Face Inference API
             # Make sure to have HUGGINGFACE_API_KEY set in your environment
             # and set your model endpoint, e.g., "bigscience/bloomz"
-            huggingface_url = f"https://api-inference.huggingface.co/models/{model}"
-            headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
-            
-            payload = {
-                "inputs": prompt,
-                "parameters": {"temperature": temperature, "max_new_tokens": 300},
-                "options": {"wait_for_model": True}
-            }
-            
-            hf_response = requests.post(huggingface_url, headers=headers, json=payload)
-            if hf_response.status_code == 200:
-                data = hf_response.json()
-                # Some Hugging Face models return a list of generated texts
-                # You may need to adapt parsing logic for your specific model
-                if isinstance(data, list) and len(data) > 0 and "generated_text" in data[0]:
-                    return data[0]["generated_text"]
-                else:
-                    return str(data)
-            else:
-                return f"HuggingFace API Error: {hf_response.text}"
+            # Concurrent requests for the same model are sent together as one batched request.
+            return get_huggingface_batcher().submit(prompt, key=(model, temperature)).result()
         
         elif provider.lower() == "claude":
             # Using Anthropic's API for Claude
@@ -104,7 +216,7 @@ def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature
                 "temperature": temperature,
             }
             
-            claude_response = requests.post(claude_url, headers=headers, json=data)
+            claude_response = get_http_session().post(claude_url, headers=headers, json=data)
             if claude_response.status_code == 200:
                 res_json = claude_response.json()
                 # The exact response structure depends on Anthropic's API
@@ -113,7 +225,7 @@ def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature
                 else:
                     return str(res_json)
             else:
-                return f"Claude API Error: {claude_response.text}"
+                return LLMError(f"Claude API Error: {claude_response.text}")
         
         elif provider.lower() == "gemini":
             # Hypothetical usage for Google Gemini
@@ -131,7 +243,7 @@ def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature
                 "temperature": temperature,
                 "candidate_count": 1
             }
-            gemini_response = requests.post(gemini_url, headers=headers, json=data)
+            gemini_response = get_http_session().post(gemini_url, headers=headers, json=data)
             if gemini_response.status_code == 200:
                 res_json = gemini_response.json()
                 # Hypothetical response structure
@@ -140,13 +252,55 @@ def generate_llm_response(prompt, provider="openai", model="gpt-4o", temperature
                 else:
                     return str(res_json)
             else:
-                return f"Gemini API Error: {gemini_response.text}"
+                return LLMError(f"Gemini API Error: {gemini_response.text}")
         
         else:
-            return "LLM Error: Unknown provider specified."
+            return LLMError("LLM Error: Unknown provider specified.")
     
     except Exception as e:
-        return f"LLM Error: {str(e)}"
+        return LLMError(f"LLM Error: {str(e)}")
+    
+    
+def stream_llm_response(prompt, provider="openai", model="gpt-4o", temperature=0.7, task=None):
+    """
+    Streams a response as it is generated, yielding text chunks.
+    OpenAI responses are streamed token by token; other providers yield their full
+    response (or error string) as a single chunk.
+
+    :param prompt: The prompt or query string.
+    :param provider: Which LLM provider to use ('openai', 'huggingface', 'claude', 'gemini').
+    :param model: Model name.
+    :param temperature: Sampling temperature (if applicable).
+    :param task: Task class; if given, chooses the provider, model and temperature (see generate_llm_response).
+    :return: A generator of text chunks.
+    """
+    if task is not None:
+        tier, settings = select_model(task)
+        start = time.perf_counter()
+        failed = False
+        for chunk in stream_llm_response(prompt, **settings):
+            failed = failed or is_llm_error(chunk)
+            yield chunk
+        if not failed:
+            record_latency(task, tier, time.perf_counter() - start)
+        return
+    if provider.lower() != "openai":
+        yield generate_llm_response(prompt, provider=provider, model=model, temperature=temperature)
+        return
+    try:
+        prompt = enforce_budget(prompt, model)
+        with phase("network"):
+            stream = get_openai_client().chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                stream=True,
+            )
+        for chunk in timed_iter(stream, "network"):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        yield LLMError(f"LLM Error: {str(e)}")
     
     
 def generate_image_description(image_path, prompt,provider="openai", model="gpt-4o-mini",temperature=0.7):
@@ -161,7 +315,7 @@ def generate_image_description(image_path, prompt,provider="openai", model="gpt-
     :param temperature: Sampling temperature.
     :return: A generated caption describing the image.
     """
-    client = OpenAI(api_key=OPENAI_API_KEY) 
+    client = get_openai_client() 
     
     image_path = image_path
     base64_image = encode_image(image_path)
@@ -190,10 +344,131 @@ def generate_image_description(image_path, prompt,provider="openai", model="gpt-
 
 
 
-def generate_llm_json(prompt,event,provider="openai", model="gpt-4o-2024-08-06",temperature=0.7):
+# Structured output for providers other than OpenAI: the JSON is produced with the provider's native
+# mechanism (Claude tool use, Gemini JSON schema, Hugging Face grammar-constrained decoding; local
+# models only get the schema in the prompt), validated against the Pydantic model and, if invalid,
+# re-requested with the validation errors up to JSON_REPAIR_ATTEMPTS more times.
+JSON_REPAIR_ATTEMPTS = int(os.getenv("LLM_JSON_REPAIR_ATTEMPTS", "2"))
+JSON_MAX_TOKENS = 4096
+
+
+def json_schema_for(event):
+    """
+    The JSON schema of a Pydantic model with every $ref inlined, for providers that don't resolve references.
+    """
+    schema = event.model_json_schema()
+    definitions = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            if "$ref" in node:
+                return inline(definitions[node["$ref"].split("/")[-1]])
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+    return inline(schema)
+
+def _extract_json(text):
+    # Models without constrained decoding may wrap the JSON in prose or a code fence.
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in the response.")
+    return json.loads(text[start:end + 1])
+
+def _claude_json(prompt, schema, model, temperature):
+    headers = {"x-api-key": ANTHROPIC_API_KEY, "anthropic-version": "2023-06-01", "Content-Type": "application/json"}
+    data = {
+        "model": model,
+        "max_tokens": JSON_MAX_TOKENS,
+        "temperature": temperature,
+        # A single forced tool call makes Claude answer with arguments matching the schema.
+        "tools": [{"name": "respond", "description": "Return the response.", "input_schema": schema}],
+        "tool_choice": {"type": "tool", "name": "respond"},
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    claude_response = get_http_session().post("https://api.anthropic.com/v1/messages", headers=headers, json=data)
+    if claude_response.status_code != 200:
+        raise RuntimeError(f"Claude API Error: {claude_response.text}")
+    for block in claude_response.json().get("content", []):
+        if block.get("type") == "tool_use":
+            return block["input"]
+    raise ValueError("Claude did not call the response tool.")
+
+def _gemini_json(prompt, schema, model, temperature):
+    gemini_url = f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+    headers = {"x-goog-api-key": GEMINI_API_KEY, "Content-Type": "application/json"}
+    data = {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {
+            "temperature": temperature,
+            "responseMimeType": "application/json",
+            "responseJsonSchema": schema,
+        },
+    }
+    gemini_response = get_http_session().post(gemini_url, headers=headers, json=data)
+    if gemini_response.status_code != 200:
+        raise RuntimeError(f"Gemini API Error: {gemini_response.text}")
+    parts = gemini_response.json()["candidates"][0]["content"]["parts"]
+    return json.loads("".join(part.get("text", "") for part in parts))
+
+def _huggingface_json(prompt, schema, model, temperature):
+    huggingface_url = f"https://api-inference.huggingface.co/models/{model}"
+    headers = {"Authorization": f"Bearer {HUGGINGFACE_API_KEY}"}
+    payload = {
+        "inputs": prompt,
+        "parameters": {
+            "temperature": temperature,
+            "max_new_tokens": JSON_MAX_TOKENS,
+            "return_full_text": False,
+            # Text Generation Inference constrains decoding to this schema.
+            "grammar": {"type": "json", "value": schema},
+        },
+        "options": {"wait_for_model": True},
+    }
+    hf_response = get_http_session().post(huggingface_url, headers=headers, json=payload)
+    if hf_response.status_code != 200:
+        raise RuntimeError(f"HuggingFace API Error: {hf_response.text}")
+    data = hf_response.json()
+    if isinstance(data, list) and data:
+        data = data[0]
+    return _extract_json(data["generated_text"])
+
+def _local_json(prompt, schema, model, temperature):
+    instructions = (f"{prompt}\n\nRespond with only a JSON object that matches this JSON schema:\n"
+                    f"{json.dumps(schema)}")
+    return _extract_json(generate_local(instructions, model=model, temperature=temperature,
+                                        max_new_tokens=JSON_MAX_TOKENS))
+
+STRUCTURED_BACKENDS = {
+    "claude": _claude_json,
+    "gemini": _gemini_json,
+    "huggingface": _huggingface_json,
+    "local": _local_json,
+}
+
+
+@timed_phase("network")
+def generate_llm_json(prompt,event,provider="openai", model="gpt-4o-2024-08-06",temperature=0.7, task=None):
+    """
+    Generates a structured response parsed into the Pydantic model `event`.
+    OpenAI uses structured outputs; Claude, Gemini, Hugging Face and local models go through
+    STRUCTURED_BACKENDS with validation and bounded repair attempts.
+
+    :param prompt: The prompt or query string.
+    :param event: Pydantic model describing the response.
+    :param provider: Which LLM provider to use ('openai', 'claude', 'gemini', 'huggingface', 'local').
+    :param model: Model name.
+    :param temperature: Sampling temperature.
+    :param task: Task class; if given, chooses the provider, model and temperature (see generate_llm_response).
+    :return: An instance of `event`, or an error string if something fails.
+    """
+    if task is not None:
+        return _run_task(generate_llm_json, task, True, prompt, event)
     try:
+        prompt = enforce_budget(prompt, model)
         if provider.lower() == "openai":
-            client = OpenAI(api_key=OPENAI_API_KEY)
+            client = get_openai_client()
             completion = client.beta.chat.completions.parse(
             model=model,
                 messages=[{"role": "user", "content": prompt}],
@@ -201,6 +476,71 @@ def generate_llm_json(prompt,event,provider="openai", model="gpt-4o-2024-08-06",
             response_format=event,
             )
             return completion.choices[0].message.parsed
+        backend = STRUCTURED_BACKENDS.get(provider.lower())
+        if backend is None:
+            return LLMError("LLM Error: Unknown provider specified.")
+        schema = json_schema_for(event)
+        request = prompt
+        for attempt in range(JSON_REPAIR_ATTEMPTS + 1):
+            try:
+                return event.model_validate(backend(request, schema, model, temperature))
+            except (ValidationError, ValueError, KeyError) as e:
+                error = str(e)
+            request = (f"{prompt}\n\nYour previous response could not be used:\n{error}\n"
+                       "Respond again with JSON that matches the required schema exactly.")
+        return LLMError(f"LLM Error: Invalid structured response after {JSON_REPAIR_ATTEMPTS + 1} attempts: {error}")
     except Exception as e:
-        return f"LLM Error: {str(e)}"
-    
+        return LLMError(f"LLM Error: {str(e)}")
+
+
+def stream_llm_json(prompt, event, provider="openai", model="gpt-4o-2024-08-06", temperature=0.7, task=None):
+    """
+    Streams a structured response, yielding progressively filled instances of the Pydantic model `event`
+    as the JSON arrives: fields and list items appear once they are complete, and fields that have not
+    arrived yet are empty. The last item yielded is the fully validated object, or an error string.
+    Providers other than OpenAI yield the result of generate_llm_json once.
+
+    :param prompt: The prompt or query string.
+    :param event: Pydantic model describing the response.
+    :param provider: Which LLM provider to use.
+    :param model: Model name.
+    :param temperature: Sampling temperature.
+    :param task: Task class; if given, chooses the provider, model and temperature (see generate_llm_response).
+    :return: A generator of `event` instances.
+    """
+    if task is not None:
+        tier, settings = select_model(task, structured=True)
+        start = time.perf_counter()
+        result = None
+        for result in stream_llm_json(prompt, event, **settings):
+            yield result
+        if isinstance(result, event):
+            record_latency(task, tier, time.perf_counter() - start)
+        return
+    if provider.lower() != "openai":
+        yield generate_llm_json(prompt, event, provider=provider, model=model, temperature=temperature)
+        return
+    try:
+        prompt = enforce_budget(prompt, model)
+        text = ""
+        last = None
+        with get_openai_client().beta.chat.completions.stream(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            response_format=event,
+        ) as stream:
+            for chunk in timed_iter(stream, "network"):
+                if chunk.type != "content.delta":
+                    continue
+                text += chunk.delta
+                # Only a closing quote, bracket or separator can complete a new value.
+                if not any(c in chunk.delta for c in '"]},'):
+                    continue
+                data = parse_partial_json(text)
+                if data is not None and data != last:
+                    last = data
+                    yield partial_model(event, data)
+        yield event.model_validate_json(text)
+    except Exception as e:
+        yield LLMError(f"LLM Error: {str(e)}")
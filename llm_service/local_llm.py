@@ -0,0 +1,92 @@
+import os
+import threading
+from llm_service.micro_batching import MicroBatcher
+
+# In-process CPU inference for small models (provider "local").
+# Models are loaded once per process, quantized to int8 (dynamic quantization of the linear
+# layers) and shared by every session. Requests go through a MicroBatcher per model, which
+# generates concurrent requests (up to LOCAL_MAX_BATCH_SIZE, waiting at most LOCAL_MAX_WAIT_MS
+# for them to arrive) in one batched forward pass instead of one after another.
+#
+# Needs the optional torch and transformers packages.
+DEFAULT_LOCAL_MODEL = os.getenv("LOCAL_LLM_MODEL", "Qwen/Qwen2.5-0.5B-Instruct")
+LOCAL_MAX_BATCH_SIZE = int(os.getenv("LOCAL_MAX_BATCH_SIZE", "8"))
+LOCAL_MAX_WAIT_MS = float(os.getenv("LOCAL_MAX_WAIT_MS", "5"))
+LOCAL_MAX_NEW_TOKENS = int(os.getenv("LOCAL_MAX_NEW_TOKENS", "512"))
+LOCAL_QUANTIZE = os.getenv("LOCAL_QUANTIZE", "1") != "0"
+LOCAL_TORCH_THREADS = int(os.getenv("LOCAL_TORCH_THREADS", "0"))  # 0 keeps torch's default
+
+
+class LocalModel:
+    """
+    A causal language model loaded on CPU, served with dynamic batching.
+    """
+
+    def __init__(self, name):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        if LOCAL_TORCH_THREADS:
+            torch.set_num_threads(LOCAL_TORCH_THREADS)
+        self.name = name
+        self.torch = torch
+        # Left padding, so every prompt of a batch ends right where generation starts.
+        self.tokenizer = AutoTokenizer.from_pretrained(name, padding_side="left")
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        model = AutoModelForCausalLM.from_pretrained(name, torch_dtype=torch.float32)
+        model.eval()
+        if LOCAL_QUANTIZE:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.batcher = MicroBatcher(self._run_batch, max_batch_size=LOCAL_MAX_BATCH_SIZE,
+                                    max_wait=LOCAL_MAX_WAIT_MS / 1000, name=f"local-llm-{name}")
+
+    def _format(self, prompt):
+        if getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template([{"role": "user", "content": prompt}],
+                                                      tokenize=False, add_generation_prompt=True)
+        return prompt
+
+    def submit(self, prompt, temperature=0.7, max_new_tokens=LOCAL_MAX_NEW_TOKENS):
+        """
+        Queue a prompt for generation and return a Future of the completion text.
+        """
+        # Requests with different sampling settings can't share a generate() call.
+        return self.batcher.submit(self._format(prompt), key=(temperature, max_new_tokens))
+
+    def _run_batch(self, key, prompts):
+        temperature, max_new_tokens = key
+        return self.generate_batch(prompts, temperature, max_new_tokens)
+
+    def generate_batch(self, prompts, temperature, max_new_tokens):
+        """
+        Generate completions for already formatted prompts in one batched call.
+        """
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        sampling = {"do_sample": True, "temperature": temperature} if temperature > 0 else {"do_sample": False}
+        with self.torch.inference_mode():
+            output = self.model.generate(**inputs, max_new_tokens=max_new_tokens,
+                                         pad_token_id=self.tokenizer.pad_token_id, **sampling)
+        new_tokens = output[:, inputs["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_local_model(name=DEFAULT_LOCAL_MODEL):
+    """
+    Return the process-wide LocalModel for `name`, loading it on first use.
+    """
+    with _models_lock:
+        if name not in _models:
+            _models[name] = LocalModel(name)
+        return _models[name]
+
+def generate_local(prompt, model=DEFAULT_LOCAL_MODEL, temperature=0.7, max_new_tokens=LOCAL_MAX_NEW_TOKENS):
+    """
+    Generate a completion with a local model, blocking until its batch has run.
+    """
+    return get_local_model(model).submit(prompt, temperature, max_new_tokens).result()
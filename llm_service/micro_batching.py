@@ -0,0 +1,96 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into small batches and runs each batch with one call.
+
+    Callers submit items under a key (requests can only share a batch if their keys are equal,
+    e.g. the same model and sampling settings) and get a Future back. A batch is dispatched once it
+    holds `max_batch_size` items or its oldest item has waited `max_wait` seconds, whichever comes
+    first. `process_batch(key, items)` must return one result per item, in order; if it raises,
+    every caller of that batch gets the exception.
+
+    With max_concurrent_batches=1 (e.g. one in-process model) batches run on the dispatcher thread
+    and requests arriving meanwhile queue up into the next batch. Higher values suit remote
+    backends, where several batched requests can be in flight at once.
+    """
+
+    def __init__(self, process_batch, max_batch_size=8, max_wait=0.005, max_concurrent_batches=1,
+                 name="micro-batcher"):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_concurrent_batches = max_concurrent_batches
+        self.batches = 0
+        self.items = 0
+        self._pending = OrderedDict()  # key -> [(item, future, enqueued_at)], oldest key first
+        self._cond = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_concurrent_batches)
+        self._executor = (ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix=name)
+                          if max_concurrent_batches > 1 else None)
+        threading.Thread(target=self._dispatch, name=name, daemon=True).start()
+
+    def submit(self, item, key=None):
+        """
+        Queue an item and return a Future of its result.
+        """
+        future = Future()
+        with self._cond:
+            self._pending.setdefault(key, []).append((item, future, time.monotonic()))
+            self._cond.notify()
+        return future
+
+    def stats(self):
+        """
+        Number of batches run, items processed and the mean batch size.
+        """
+        return {"batches": self.batches, "items": self.items,
+                "mean_batch_size": self.items / self.batches if self.batches else 0.0}
+
+    def _next_batch(self):
+        with self._cond:
+            while True:
+                if self._pending:
+                    # Full batches go first; otherwise the batch whose oldest item has waited longest.
+                    key = next((k for k, v in self._pending.items() if len(v) >= self.max_batch_size),
+                               next(iter(self._pending)))
+                    requests = self._pending[key]
+                    remaining = requests[0][2] + self.max_wait - time.monotonic()
+                    if len(requests) >= self.max_batch_size or remaining <= 0:
+                        batch = requests[:self.max_batch_size]
+                        del requests[:self.max_batch_size]
+                        if not requests:
+                            del self._pending[key]
+                        return key, batch
+                    self._cond.wait(timeout=remaining)
+                else:
+                    self._cond.wait()
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            key, batch = self._next_batch()
+            self.batches += 1
+            self.items += len(batch)
+            if self._executor is None:
+                self._run(key, batch)
+            else:
+                self._executor.submit(self._run, key, batch)
+
+    def _run(self, key, batch):
+        try:
+            results = self.process_batch(key, [item for item, _, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch of {len(batch)} items returned {len(results)} results.")
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            self._slots.release()
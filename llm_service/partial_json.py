@@ -0,0 +1,115 @@
+import json
+import typing
+from pydantic import BaseModel, ValidationError
+
+# Parsing of incomplete JSON, for showing structured responses while they are streamed.
+# Only complete values are kept: a string, number or literal that may still be cut off is dropped
+# until it is finished, so lists grow one whole item at a time.
+
+
+def parse_partial_json(text):
+    """
+    Parse the longest prefix of `text` that ends on a complete value, closing any open objects and
+    arrays. Returns None if no value is complete yet.
+    """
+    stack = []       # open containers, "{" or "["
+    expect_key = []  # per open container: True while the next string of an object is a key
+    cut, closers = 0, ""
+    in_string = escape = string_is_key = False
+    scalar_start = None
+
+    def mark(position):
+        nonlocal cut, closers
+        cut = position
+        closers = "".join("}" if c == "{" else "]" for c in reversed(stack))
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+                if not string_is_key:
+                    mark(i + 1)
+            continue
+        if scalar_start is not None:
+            # A number or literal is only complete once something follows it.
+            if ch in ",]}" or ch.isspace():
+                scalar_start = None
+                mark(i)
+            else:
+                continue
+        if ch == '"':
+            in_string = True
+            string_is_key = bool(stack) and expect_key[-1]
+        elif ch in "{[":
+            stack.append(ch)
+            expect_key.append(ch == "{")
+            mark(i + 1)
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            expect_key.pop()
+            mark(i + 1)
+        elif ch == ":":
+            if expect_key:
+                expect_key[-1] = False
+        elif ch == ",":
+            if stack and stack[-1] == "{":
+                expect_key[-1] = True
+        elif not ch.isspace():
+            scalar_start = i
+    if not cut:
+        return None
+    try:
+        return json.loads(text[:cut] + closers)
+    except ValueError:
+        return None
+
+def _empty_value(annotation):
+    origin = typing.get_origin(annotation) or annotation
+    if origin in (list, tuple, set):
+        return []
+    if origin is dict:
+        return {}
+    if isinstance(origin, type) and issubclass(origin, BaseModel):
+        return partial_model(origin, {})
+    if origin is str:
+        return ""
+    if origin in (int, float):
+        return 0
+    if origin is bool:
+        return False
+    return None
+
+def partial_model(model, data):
+    """
+    Build an instance of the Pydantic `model` from partially parsed data, filling the fields that have
+    not arrived yet with empty values (empty lists and strings, zero, nested partial models).
+    """
+    if not isinstance(data, dict):
+        data = {}
+    values = {}
+    for name, field in model.model_fields.items():
+        if name in data:
+            value = data[name]
+            nested = typing.get_origin(field.annotation) or field.annotation
+            args = typing.get_args(field.annotation)
+            if isinstance(nested, type) and issubclass(nested, BaseModel) and isinstance(value, dict):
+                value = partial_model(nested, value)
+            elif (nested is list and args and isinstance(args[0], type) and issubclass(args[0], BaseModel)
+                  and isinstance(value, list)):
+                value = [partial_model(args[0], v) if isinstance(v, dict) else v for v in value]
+            values[name] = value
+        elif not field.is_required():
+            continue
+        else:
+            values[name] = _empty_value(field.annotation)
+    try:
+        return model.model_validate(values)
+    except ValidationError:
+        # e.g. a list of nested models whose last item is still incomplete
+        return model.model_construct(**values)
@@ -0,0 +1,232 @@
+import os
+import sys
+import time
+import threading
+import functools
+import contextvars
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Opt-in profiling of app reruns. A rerun wrapped in profile_run() records its wall and CPU time, the
+# same per page (profile_section) and the time spent in named phases (phase / timed_phase /
+# timed_iter) such as PDF extraction, prompt building and network calls. Phases are exclusive: a phase
+# entered inside another pauses the outer one. Outside a profiled rerun the hooks do nothing.
+# INSIGHTSLIB_PROFILE=1 profiles every rerun; INSIGHTSLIB_PROFILE=flame also samples the rerun's
+# stack into a folded-stacks file (for flamegraph.pl or speedscope).
+PROFILE_MODE = os.getenv("INSIGHTSLIB_PROFILE", "").strip().lower()
+# Interval between stack samples of a flame capture (seconds).
+SAMPLE_INTERVAL = float(os.getenv("INSIGHTSLIB_PROFILE_INTERVAL_MS", "5")) / 1000
+# Number of recent reruns kept in memory for the admin page.
+PROFILE_HISTORY = 500
+# Apps may let a ?profile= URL parameter switch profiling on only when this is set, since profiled
+# reruns write files and expose the process-wide Profiling page to whoever opens that URL.
+PROFILE_ALLOW_QUERY = os.getenv("INSIGHTSLIB_PROFILE_ALLOW_QUERY", "") == "1"
+# Folded-stacks files kept per directory; the oldest are deleted beyond this.
+PROFILE_MAX_FILES = int(os.getenv("INSIGHTSLIB_PROFILE_MAX_FILES", "200"))
+
+_current = contextvars.ContextVar("rerun_profile", default=None)
+_history = deque(maxlen=PROFILE_HISTORY)
+_history_lock = threading.Lock()
+
+
+class RerunProfile:
+    """
+    Timings of one profiled rerun. Times are in seconds.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.started_at = time.time()
+        self.wall = self.cpu = 0.0
+        self.pages = {}   # page -> {"wall", "cpu", "phases": {phase: seconds}}
+        self.phases = {}  # phase -> seconds, over the whole rerun
+        self.flame_path = None
+        self._page = None
+        self._stack = []
+        self._mark = 0.0
+
+    def _charge(self, now):
+        if self._stack:
+            name, elapsed = self._stack[-1], now - self._mark
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self._page is not None:
+                page_phases = self.pages[self._page]["phases"]
+                page_phases[name] = page_phases.get(name, 0.0) + elapsed
+        self._mark = now
+
+    def enter_phase(self, name):
+        self._charge(time.perf_counter())
+        self._stack.append(name)
+
+    def exit_phase(self):
+        self._charge(time.perf_counter())
+        self._stack.pop()
+
+    def as_dict(self):
+        return {"label": self.label, "started_at": self.started_at, "wall": self.wall, "cpu": self.cpu,
+                "pages": {k: dict(v, phases=dict(v["phases"])) for k, v in self.pages.items()},
+                "phases": dict(self.phases), "flame_path": self.flame_path}
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds and writes the counts as folded stacks
+    ('outer;inner;leaf count' per line).
+    """
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self, path):
+        self._stop.set()
+        self._thread.join()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def profile_mode(value):
+    """
+    Normalise a profiling switch (env var or query parameter): 'flame', 'timing' or None (off).
+    """
+    value = (value or "").strip().lower()
+    if value == "flame":
+        return "flame"
+    return "timing" if value in ("1", "true", "yes", "on", "timing") else None
+
+def _prune_flame_files(flame_dir, keep=PROFILE_MAX_FILES):
+    # Delete the oldest folded-stacks files in flame_dir beyond the newest `keep`.
+    try:
+        paths = [os.path.join(flame_dir, name) for name in os.listdir(flame_dir) if name.endswith(".folded")]
+        paths.sort(key=os.path.getmtime, reverse=True)
+    except OSError:
+        return
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+@contextmanager
+def profile_run(label, flame_dir=None):
+    """
+    Profile the code run inside the block as one rerun and add it to the history.
+    With `flame_dir`, its stack is also sampled into '<flame_dir>/<label>-<timestamp>.folded'; only the
+    newest PROFILE_MAX_FILES such files are kept.
+    """
+    record = RerunProfile(label)
+    token = _current.set(record)
+    sampler = None
+    if flame_dir:
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    finally:
+        record.wall = time.perf_counter() - start_wall
+        record.cpu = time.thread_time() - start_cpu
+        _current.reset(token)
+        if sampler is not None:
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(record.started_at))
+            record.flame_path = sampler.stop(os.path.join(flame_dir, f"{label}-{stamp}-{id(record):x}.folded"))
+            _prune_flame_files(flame_dir)
+        with _history_lock:
+            _history.append(record)
+
+@contextmanager
+def profile_section(page):
+    """
+    Record the wall and CPU time of one page function within the current profiled rerun.
+    """
+    record = _current.get()
+    if record is None or record._page is not None:
+        yield
+        return
+    record.pages.setdefault(page, {"wall": 0.0, "cpu": 0.0, "phases": {}})
+    record._charge(time.perf_counter())
+    record._page = page
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        record._charge(time.perf_counter())
+        record._page = None
+        record.pages[page]["wall"] += time.perf_counter() - start_wall
+        record.pages[page]["cpu"] += time.thread_time() - start_cpu
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the time spent inside the block to the phase `name` of the current profiled rerun.
+    """
+    record = _current.get()
+    if record is None:
+        yield
+        return
+    record.enter_phase(name)
+    try:
+        yield
+    finally:
+        record.exit_phase()
+
+def timed_phase(name):
+    """
+    Decorator form of phase() for plain functions.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_iter(iterable, name):
+    """
+    Iterate over `iterable`, attributing only the time spent waiting for each item to the phase `name`
+    (not the time the consumer spends between items).
+    """
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+def recent_reruns():
+    """
+    The profiled reruns still in the history, oldest first, as dicts.
+    """
+    with _history_lock:
+        return [record.as_dict() for record in _history]
+
+def slowest_reruns(limit=20):
+    """
+    The `limit` slowest profiled reruns in the history, slowest first, as dicts.
+    """
+    return sorted(recent_reruns(), key=lambda r: r["wall"], reverse=True)[:limit]
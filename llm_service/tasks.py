@@ -0,0 +1,114 @@
+import os
+import time
+import threading
+from llm_service.local_llm import DEFAULT_LOCAL_MODEL
+
+# Model tiers, from cheapest/fastest to most capable. "quality" ranks what a tier can be trusted with.
+# Override a tier's model with LLM_TIER_<NAME>_MODEL (e.g. LLM_TIER_FAST_MODEL=gpt-4.1-mini).
+MODEL_TIERS = {
+    "local": {"provider": "local", "model": DEFAULT_LOCAL_MODEL, "quality": 1},
+    "fast": {"provider": "openai", "model": "gpt-4o-mini", "quality": 2},
+    "standard": {"provider": "openai", "model": "gpt-4o", "quality": 3},
+}
+for _name, _tier in MODEL_TIERS.items():
+    _tier["model"] = os.getenv(f"LLM_TIER_{_name.upper()}_MODEL", _tier["model"])
+
+# Tiers that may be used; "local" needs torch and transformers, so it is opt-in.
+ENABLED_TIERS = [t.strip() for t in os.getenv("LLM_TIERS", "fast,standard").split(",") if t.strip() in MODEL_TIERS]
+# Providers that support structured (JSON) output through generate_llm_json.
+STRUCTURED_PROVIDERS = {"openai", "claude", "gemini", "huggingface", "local"}
+
+# Task classes: the minimum tier quality each task needs, the latency it should stay under (seconds)
+# and its sampling temperature. Call sites name the task; the tier is chosen here.
+# Short, formulaic outputs (subtopic lists, answer scores, the profile digest) are within reach of the
+# local tier, so when it is enabled they go there first and move up only if it misses the latency target.
+TASK_CLASSES = {
+    "subtopics": {"min_quality": 1, "latency_target": 4.0, "temperature": 0.7},
+    "questions": {"min_quality": 2, "latency_target": 6.0, "temperature": 0.7},
+    "evaluation": {"min_quality": 1, "latency_target": 4.0, "temperature": 0.3},
+    "resources": {"min_quality": 2, "latency_target": 6.0, "temperature": 0.7},
+    "resume": {"min_quality": 2, "latency_target": 8.0, "temperature": 0},
+    "digest": {"min_quality": 1, "latency_target": 6.0, "temperature": 0.2},
+    "assessment": {"min_quality": 3, "latency_target": 20.0, "temperature": 0.7},
+    "lesson": {"min_quality": 3, "latency_target": 30.0, "temperature": 0.7},
+    "documents": {"min_quality": 3, "latency_target": 15.0, "temperature": 0.7},
+    "exercises": {"min_quality": 3, "latency_target": 20.0, "temperature": 0.4},
+}
+for _name, _task in TASK_CLASSES.items():
+    _tier = os.getenv(f"LLM_TASK_{_name.upper()}_TIER")
+    if _tier in MODEL_TIERS:
+        _task["min_quality"] = MODEL_TIERS[_tier]["quality"]
+
+# Weight of the newest observation in the moving average of a (task, tier)'s latency.
+LATENCY_EWMA_ALPHA = 0.2
+# A tier passed over for being slow is tried again once its latency is older than this (seconds).
+LATENCY_STALE_SECONDS = 120
+
+_latencies = {}
+_latency_lock = threading.Lock()
+
+
+def _candidates(task, structured):
+    min_quality = TASK_CLASSES[task]["min_quality"]
+    tiers = [t for t in ENABLED_TIERS
+             if MODEL_TIERS[t]["quality"] >= min_quality
+             and (not structured or MODEL_TIERS[t]["provider"] in STRUCTURED_PROVIDERS)]
+    tiers.sort(key=lambda t: MODEL_TIERS[t]["quality"])
+    return tiers or ["standard"]
+
+def _settings(task, tier):
+    return {"provider": MODEL_TIERS[tier]["provider"], "model": MODEL_TIERS[tier]["model"],
+            "temperature": TASK_CLASSES[task]["temperature"]}
+
+def task_settings(task, structured=False):
+    """
+    The provider, model and temperature of the cheapest adequate tier for `task`, ignoring observed
+    latencies. For results that are stored under their model name (e.g. lessons), where the model
+    should not change from call to call.
+    """
+    return _settings(task, _candidates(task, structured)[0])
+
+def select_tier(task, structured=False):
+    """
+    Pick the tier for one call of `task`: the cheapest adequate tier whose recent latency meets the
+    task's target, or, if none does, the adequate tier that has recently been fastest.
+    """
+    tiers = _candidates(task, structured)
+    target = TASK_CLASSES[task]["latency_target"]
+    now = time.monotonic()
+    with _latency_lock:
+        observed = {t: _latencies.get((task, t), (None, 0.0)) for t in tiers}
+    observed = {t: seconds if now - at <= LATENCY_STALE_SECONDS else None
+                for t, (seconds, at) in observed.items()}
+    for tier in tiers:
+        if observed[tier] is None or observed[tier] <= target:
+            return tier
+    return min(tiers, key=lambda t: observed[t])
+
+def select_model(task, structured=False):
+    """
+    Return (tier, {"provider", "model", "temperature"}) for one call of `task`.
+    """
+    if task not in TASK_CLASSES:
+        raise ValueError(f"Unknown task class: {task}")
+    tier = select_tier(task, structured)
+    return tier, _settings(task, tier)
+
+def record_latency(task, tier, seconds):
+    """
+    Feed the latency of a finished call into the tier selection of its task.
+    """
+    with _latency_lock:
+        previous, _ = _latencies.get((task, tier), (None, 0.0))
+        average = seconds if previous is None else LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * previous
+        _latencies[(task, tier)] = (average, time.monotonic())
+
+def latency_stats():
+    """
+    Moving-average latency (seconds) per task and tier, as {task: {tier: seconds}}.
+    """
+    with _latency_lock:
+        stats = {}
+        for (task, tier), (seconds, _) in _latencies.items():
+            stats.setdefault(task, {})[tier] = seconds
+        return stats
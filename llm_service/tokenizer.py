@@ -0,0 +1,148 @@
+from functools import lru_cache
+from llm_service.profiling import timed_phase
+
+# Context window sizes (in tokens), matched by model-name prefix; the longest matching prefix wins.
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "claude": 200000,
+    "gemini": 1000000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+# Tokens kept free for the model's answer when fitting a prompt.
+DEFAULT_RESERVED_OUTPUT_TOKENS = 1024
+
+TRUNCATION_MARKER = "\n...[truncated]...\n"
+
+
+def get_context_window(model):
+    """
+    Return the context window of `model`, falling back to DEFAULT_CONTEXT_WINDOW for unknown models.
+    """
+    name = model.lower()
+    matches = [prefix for prefix in MODEL_CONTEXT_WINDOWS if name.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
+
+@lru_cache(maxsize=None)
+def get_tokenizer(model):
+    """
+    Lazily load and cache the tokenizer for `model`.
+    Uses tiktoken for OpenAI models and a Hugging Face tokenizer for 'org/name' models;
+    returns None when neither is available, in which case callers fall back to approx_tokens.
+    """
+    if "/" in model:
+        try:
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(model)
+            return lambda text: tokenizer.encode(text, add_special_tokens=False)
+        except Exception:
+            return None
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # tiktoken missing, or its encoding files could not be downloaded.
+        return None
+    return lambda text: encoding.encode(text, disallowed_special=())
+
+def approx_tokens(text):
+    """
+    Fast token estimate for hot paths (about four characters per token for English text).
+    """
+    return len(text) // 4 + 1
+
+def count_tokens(text, model="gpt-4o"):
+    """
+    Count the tokens of `text` with the model's tokenizer, or estimate them if it is unavailable.
+    """
+    tokenizer = get_tokenizer(model)
+    if tokenizer is None:
+        return approx_tokens(text)
+    return len(tokenizer(text))
+
+def truncate_to_tokens(text, max_tokens, model="gpt-4o", keep_tail=False):
+    """
+    Shorten `text` to about `max_tokens` tokens.
+    By default the beginning is kept; with keep_tail=True the middle is cut instead,
+    so instructions at either end of a prompt survive.
+    """
+    if max_tokens <= 0:
+        return ""
+    total = count_tokens(text, model)
+    if total <= max_tokens:
+        return text
+    # Cut proportionally by characters, re-counting in case the cut text is still too long.
+    max_chars = len(text)
+    for _ in range(3):
+        max_chars = max(int(max_chars * max_tokens / total) - len(TRUNCATION_MARKER), 0)
+        if keep_tail:
+            head = max_chars // 2
+            shortened = text[:head] + TRUNCATION_MARKER + text[len(text) - (max_chars - head):]
+        else:
+            shortened = text[:max_chars] + TRUNCATION_MARKER
+        total = count_tokens(shortened, model)
+        if total <= max_tokens:
+            break
+    return shortened
+
+def prompt_budget(model, reserved_output_tokens=DEFAULT_RESERVED_OUTPUT_TOKENS):
+    """
+    Number of tokens a prompt for `model` may use.
+    """
+    return get_context_window(model) - reserved_output_tokens
+
+@timed_phase("prompt_building")
+def enforce_budget(prompt, model="gpt-4o", reserved_output_tokens=DEFAULT_RESERVED_OUTPUT_TOKENS):
+    """
+    Make sure a single prompt string fits the model's context window, cutting its middle if it does not.
+    """
+    budget = prompt_budget(model, reserved_output_tokens)
+    # A prompt with no more characters than the budget has tokens to spare; skip exact tokenization.
+    if len(prompt) <= budget:
+        return prompt
+    return truncate_to_tokens(prompt, budget, model, keep_tail=True)
+
+@timed_phase("prompt_building")
+def fit_prompt(sections, model="gpt-4o", reserved_output_tokens=DEFAULT_RESERVED_OUTPUT_TOKENS,
+               summarize=None):
+    """
+    Assemble a prompt from prioritised sections so it fits the model's context window.
+
+    :param sections: List of (text, priority) tuples in prompt order. Higher priority is more
+                     important; sections with priority None are never shortened.
+    :param model: Model the prompt is for (selects tokenizer and context window).
+    :param reserved_output_tokens: Tokens kept free for the answer.
+    :param summarize: Optional callable(text, max_tokens) returning a shorter version of a section;
+                      used before plain truncation.
+    :return: The joined prompt.
+    """
+    budget = prompt_budget(model, reserved_output_tokens)
+    texts = [text for text, _ in sections]
+    if sum(len(text) for text in texts) <= budget:
+        return "".join(texts)
+    counts = [count_tokens(text, model) for text in texts]
+    overflow = sum(counts) - budget
+    order = sorted((i for i, (_, priority) in enumerate(sections) if priority is not None),
+                   key=lambda i: sections[i][1])
+    for i in order:
+        if overflow <= 0:
+            break
+        target = max(counts[i] - overflow, 0)
+        shortened = None
+        if summarize is not None and target > 0:
+            shortened = summarize(texts[i], target)
+            if count_tokens(shortened, model) > target:
+                shortened = None
+        if shortened is None:
+            shortened = truncate_to_tokens(texts[i], target, model)
+        new_count = count_tokens(shortened, model)
+        overflow -= counts[i] - new_count
+        texts[i], counts[i] = shortened, new_count
+    return "".join(texts)
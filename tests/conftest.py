@@ -0,0 +1,9 @@
+import os, sys
+import tempfile
+
+# Tests import the packages from the repository root and keep their cache files in a throw-away
+# directory (Tutor.storage reads INSIGHTSLIB_CACHE_DIR at import).
+root_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if root_path not in sys.path:
+    sys.path.insert(0, root_path)
+os.environ["INSIGHTSLIB_CACHE_DIR"] = tempfile.mkdtemp(prefix="insightslib-tests-")
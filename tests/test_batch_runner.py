@@ -0,0 +1,77 @@
+import pytest
+
+from llm_service.batch_runner import BatchJob, LocalBatchBackend, JOB_COMPLETED, JOB_LOADED
+
+REQUESTS = [{"custom_id": f"r{i}", "prompt": f"prompt {i}", "model": "test-model"} for i in range(4)]
+
+
+class Crash(Exception):
+    pass
+
+
+def test_job_runs_every_request(tmp_path):
+    job = BatchJob.create(str(tmp_path), REQUESTS, LocalBatchBackend(lambda r: r["prompt"].upper()))
+    results = job.run(poll_interval=0)
+    assert results == {r["custom_id"]: (r["prompt"].upper(), None) for r in REQUESTS}
+    assert job.status == JOB_COMPLETED
+
+
+def test_resume_after_crash_skips_finished_requests(tmp_path):
+    calls = []
+
+    def crash_on_third(r):
+        if len(calls) == 2:
+            raise Crash()
+        calls.append(r["custom_id"])
+        return "ok"
+
+    job = BatchJob.create(str(tmp_path), REQUESTS, LocalBatchBackend(crash_on_third))
+    with pytest.raises(Crash):
+        job.run(poll_interval=0)
+
+    def answer(r):
+        calls.append(r["custom_id"])
+        return "ok"
+
+    # create() on an existing job directory resumes that job instead of starting a new one.
+    resumed = BatchJob.create(str(tmp_path), REQUESTS, LocalBatchBackend(answer))
+    loaded = []
+    results = resumed.run(on_results=loaded.append, poll_interval=0)
+    assert sorted(calls) == ["r0", "r1", "r2", "r3"]
+    assert len(results) == 4 and loaded == [results]
+    assert resumed.status == JOB_LOADED
+
+
+def test_errors_are_recorded_per_request(tmp_path):
+    job = BatchJob.create(str(tmp_path), REQUESTS[:2],
+                          LocalBatchBackend(lambda r: "LLM Error: down" if r["custom_id"] == "r1" else "fine"))
+    results = job.run(poll_interval=0)
+    assert results["r0"] == ("fine", None)
+    assert results["r1"] == (None, "LLM Error: down")
+
+
+def test_missing_results_are_recorded_as_errors(tmp_path):
+    class ExpiredBackend(LocalBatchBackend):
+        def poll(self, batch_id, requests_path, work_dir):
+            return "expired", {"r0": ("only this one", None)}
+
+    job = BatchJob.create(str(tmp_path), REQUESTS, ExpiredBackend())
+    results = job.run(poll_interval=0)
+    assert results["r0"] == ("only this one", None)
+    assert all(results[f"r{i}"][0] is None and "expired" in results[f"r{i}"][1] for i in range(1, 4))
+    assert job.provider_statuses() == ["expired"]
+
+
+def test_resume_with_another_backend_fails(tmp_path):
+    BatchJob.create(str(tmp_path), REQUESTS, LocalBatchBackend(lambda r: "ok"))
+
+    class OtherBackend(LocalBatchBackend):
+        name = "other"
+
+    with pytest.raises(ValueError):
+        BatchJob.load(str(tmp_path), OtherBackend())
+
+
+def test_duplicate_custom_ids_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        BatchJob.create(str(tmp_path), REQUESTS + REQUESTS[:1], LocalBatchBackend(lambda r: "ok"))
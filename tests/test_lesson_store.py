@@ -0,0 +1,44 @@
+from Tutor.lesson_store import (profile_signature, signature_similarity, shared_profile, load_lesson, save_lesson,
+                                LESSON_REUSE_THRESHOLD)
+
+BASE = {"level": "Beginner", "languages": "English, Hindi", "learning_goals": "Learn Python decorators for work"}
+
+
+def test_signature_is_normalised():
+    a = profile_signature(BASE)
+    b = profile_signature({"level": " beginner", "languages": ["hindi", "ENGLISH", "english"],
+                           "learning_goals": "I want to learn decorators, for work; Python!"})
+    assert a == b
+
+
+def test_different_levels_never_match():
+    other = dict(BASE, level="Advanced")
+    assert signature_similarity(profile_signature(BASE), profile_signature(other)) == 0.0
+
+
+def test_similarity_is_jaccard_of_languages_and_goals():
+    a = profile_signature(BASE)
+    b = profile_signature(dict(BASE, learning_goals="python decorators"))
+    # features of a: 2 languages + {python, decorators, work}; b drops "work"
+    assert signature_similarity(a, b) == 4 / 5
+    assert signature_similarity(a, a) == 1.0
+
+
+def test_empty_signatures_are_identical():
+    empty = profile_signature({"level": "Beginner"})
+    assert signature_similarity(empty, empty) == 1.0
+
+
+def test_personal_lessons_are_not_shared():
+    alice = dict(BASE, name="Alice", personality="Fun loving")
+    bob = dict(BASE, name="Bob", personality="Serious")
+    save_lesson("Python", "Personal decorators", alice, "test-model", "Hi Alice!")
+    assert load_lesson("Python", "Personal decorators", alice, "test-model") == "Hi Alice!"
+    assert load_lesson("Python", "Personal decorators", bob, "test-model") is None
+
+
+def test_shared_lessons_are_reused_for_similar_profiles():
+    save_lesson("Python", "Shared decorators", shared_profile(dict(BASE, name="Cohort")), "test-model", "Hello all")
+    similar = dict(BASE, name="Dana", learning_goals="python decorators at work")
+    assert signature_similarity(profile_signature(BASE), profile_signature(similar)) >= LESSON_REUSE_THRESHOLD
+    assert load_lesson("Python", "Shared decorators", similar, "test-model") == "Hello all"
@@ -0,0 +1,54 @@
+from pydantic import BaseModel
+
+from llm_service.partial_json import parse_partial_json, partial_model
+
+
+class item(BaseModel):
+    name: str
+    tags: list[str]
+
+
+class itemList(BaseModel):
+    title: str
+    items: list[item]
+
+
+def test_nothing_complete_returns_none():
+    assert parse_partial_json("") is None
+    assert parse_partial_json('"unfinished') is None
+
+
+def test_open_object_without_values_is_empty():
+    assert parse_partial_json('{"ti') == {}
+
+
+def test_complete_json_is_parsed_as_is():
+    assert parse_partial_json('{"a": [1, 2], "b": "x"}') == {"a": [1, 2], "b": "x"}
+
+
+def test_open_containers_are_closed():
+    assert parse_partial_json('{"a": ["x", "y"') == {"a": ["x", "y"]}
+    assert parse_partial_json('[{"a": 1}, {"b": ') == [{"a": 1}, {}]
+
+
+def test_cut_off_strings_and_numbers_are_dropped():
+    assert parse_partial_json('{"a": "done", "b": "half') == {"a": "done"}
+    # A number is only complete once something follows it.
+    assert parse_partial_json('{"n": 12') == {}
+    assert parse_partial_json('{"n": 12,') == {"n": 12}
+
+
+def test_escaped_quotes_do_not_end_a_string():
+    assert parse_partial_json('{"q": "say \\"hi\\"", "r": "x') == {"q": 'say "hi"'}
+
+
+def test_partial_model_fills_missing_fields():
+    model = partial_model(itemList, parse_partial_json('{"title": "T", "items": [{"name": "a"'))
+    assert model.title == "T"
+    assert [i.name for i in model.items] == ["a"]
+    assert model.items[0].tags == []
+
+
+def test_partial_model_of_nothing_is_empty():
+    model = partial_model(itemList, None)
+    assert model.title == "" and model.items == []
@@ -0,0 +1,66 @@
+import json
+
+import Tutor.question_bank as question_bank
+from Tutor.question_bank import (_merge_entries, add_questions, bank_key, draw_questions, normalize_question,
+                                 save_json)
+
+
+def test_bank_key_ignores_subtopic_order_and_case():
+    assert bank_key(["Generators", " decorators"], "Easy", "Polite") == bank_key(["Decorators", "generators"],
+                                                                                "easy", "polite")
+
+
+def test_normalize_question_drops_numbering_and_punctuation():
+    assert normalize_question("1. What is a Decorator?") == normalize_question("what is a  decorator")
+
+
+def test_merge_skips_duplicates_and_upgrades_plain_strings():
+    bank = {"k": [{"question": "What is a decorator?", "subtopic": "Decorators"}]}
+    _merge_entries(bank, {"k": ["what is a decorator", "What is a generator?"],
+                          "j": [{"question": "Q", "subtopic": None}]})
+    assert bank["k"] == [{"question": "What is a decorator?", "subtopic": "Decorators"},
+                         {"question": "What is a generator?", "subtopic": None}]
+    assert bank["j"] == [{"question": "Q", "subtopic": None}]
+
+
+def test_add_questions_keeps_questions_saved_by_other_processes():
+    key = bank_key(["Merging"], "Easy", "Polite")
+    add_questions(key, [{"question": "First?", "subtopic": "Merging"}])
+    # Another process adds a question to the file behind this one's back.
+    stored = json.load(open(question_bank._bank_path()))
+    stored[key].append({"question": "From elsewhere?", "subtopic": "Merging"})
+    save_json(question_bank._bank_path(), stored)
+    assert add_questions(key, ["2) first", "LLM Error: down", "Second?"]) == 1
+    questions = [q["question"] for q in json.load(open(question_bank._bank_path()))[key]]
+    assert sorted(questions) == ["First?", "From elsewhere?", "Second?"]
+
+
+def test_draw_excludes_asked_questions():
+    subtopics = ["Drawing"]
+    key = bank_key(subtopics, "Easy", "Polite")
+    add_questions(key, [f"Question {i}?" for i in range(6)])
+    asked = [f"Question {i}?" for i in range(4)]
+    assert draw_questions(subtopics, "Easy", "Polite", count=3, exclude=asked) is None
+    drawn = draw_questions(subtopics, "Easy", "Polite", count=2, exclude=asked)
+    assert sorted(q["question"] for q in drawn) == ["Question 4?", "Question 5?"]
+
+
+def test_draw_prefers_focus_terms():
+    subtopics = ["Focus"]
+    key = bank_key(subtopics, "Easy", "Polite")
+    add_questions(key, [f"Generic question {i}?" for i in range(5)] + ["How do you use Docker here?"])
+    drawn = draw_questions(subtopics, "Easy", "Polite", count=1, focus_terms=["docker"])
+    assert drawn[0]["question"] == "How do you use Docker here?"
+
+
+def test_prefetch_tops_up_when_unasked_questions_run_low(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(question_bank, "submit_background", lambda fn, *args: submitted.append(args))
+    subtopics = ["Prefetch"]
+    key = bank_key(subtopics, "Easy", "Polite")
+    questions = [f"Prefetch question {i}?" for i in range(question_bank.BANK_REFILL_THRESHOLD)]
+    add_questions(key, questions)
+    question_bank.prefetch_questions(subtopics, "Easy", "Polite")
+    assert submitted == []
+    question_bank.prefetch_questions(subtopics, "Easy", "Polite", exclude=questions[:1])
+    assert [args[0] for args in submitted] == [key]
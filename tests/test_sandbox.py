@@ -0,0 +1,59 @@
+import os
+import time
+
+import pytest
+
+from Tutor import sandbox
+from Tutor.sandbox import _finish
+
+
+def test_finish_derives_status_from_test_results():
+    start = time.perf_counter()
+    tests = [{"test": "assert f() == 1", "passed": True, "message": None}]
+    assert _finish({"status": "passed", "tests": tests}, 1, start)["status"] == "passed"
+    assert _finish({"status": "passed", "tests": tests}, 2, start)["status"] == "failed"
+    failing = [{"test": "assert f() == 2", "passed": False, "message": "Assertion failed."}]
+    assert _finish({"status": "passed", "tests": failing}, 1, start)["status"] == "failed"
+    # A child claiming a pass with a truthy non-boolean result does not count.
+    claimed = [{"test": "assert f() == 1", "passed": "yes", "message": None}]
+    assert _finish({"status": "passed", "tests": claimed}, 1, start)["status"] == "failed"
+
+
+def test_finish_keeps_error_statuses_and_cleans_fields():
+    result = _finish({"status": "timeout", "tests": ["junk"], "output": None, "error": "Too slow."}, 1,
+                     time.perf_counter())
+    assert result["status"] == "timeout"
+    assert result["tests"] == [] and result["output"] == "" and result["error"] == "Too slow."
+    assert _finish({"status": None, "tests": []}, 0, time.perf_counter())["status"] == "passed"
+
+
+@pytest.fixture(scope="module")
+def pool():
+    if sandbox.resource is None or not hasattr(os, "fork"):
+        pytest.skip("the sandbox needs fork and resource limits")
+    # A secret in the app's environment when the workers start must not reach them.
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("OPENAI_API_KEY", "sk-secret")
+        yield sandbox.SandboxPool(workers=1, cpu_seconds=1, timeout=2)
+
+
+def test_pool_runs_submissions_against_tests(pool):
+    passed = pool.run("def double(x):\n    return 2 * x\n", ["assert double(2) == 4"])
+    assert passed["status"] == "passed"
+    failed = pool.run("def double(x):\n    return x\n", ["assert double(2) == 4", "assert double(0) == 0"])
+    assert failed["status"] == "failed"
+    assert [t["passed"] for t in failed["tests"]] == [False, True]
+    error = pool.run("raise ValueError('bad')", ["assert True"])
+    assert error["status"] == "error" and "ValueError" in error["error"]
+
+
+def test_pool_stops_runaway_submissions(pool):
+    result = pool.run("while True:\n    pass\n")
+    assert result["status"] in ("timeout", "cpu_limit")
+    # The worker is still usable afterwards.
+    assert pool.run("x = 1", ["assert x == 1"])["status"] == "passed"
+
+
+def test_pool_hides_the_app_environment(pool):
+    result = pool.run("import os\nprint(sorted(os.environ))")
+    assert "OPENAI_API_KEY" not in result["output"]
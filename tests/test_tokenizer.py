@@ -0,0 +1,44 @@
+from llm_service.tokenizer import count_tokens, fit_prompt, prompt_budget, get_context_window
+
+# gpt-4 has the smallest context window in MODEL_CONTEXT_WINDOWS, so tests need little text to overflow it.
+MODEL = "gpt-4"
+RESERVED = 1024
+
+
+def _words(n, word="lorem"):
+    return " ".join([word] * n)
+
+
+def test_context_window_uses_longest_prefix():
+    assert get_context_window("gpt-4o-mini") == 128000
+    assert get_context_window("gpt-4") == 8192
+    assert get_context_window("unknown-model") == 8192
+
+
+def test_prompt_within_budget_is_unchanged():
+    sections = [("Header. ", None), ("Body text.", 1)]
+    assert fit_prompt(sections, model=MODEL) == "Header. Body text."
+
+
+def test_overflowing_prompt_fits_budget():
+    sections = [("Instructions first. ", None), (_words(20000), 1), (" Instructions last.", None)]
+    prompt = fit_prompt(sections, model=MODEL, reserved_output_tokens=RESERVED)
+    assert count_tokens(prompt, MODEL) <= prompt_budget(MODEL, RESERVED)
+    # Sections without a priority are never shortened.
+    assert prompt.startswith("Instructions first. ")
+    assert prompt.endswith(" Instructions last.")
+
+
+def test_lowest_priority_is_shortened_first():
+    low, high = _words(4000, "low"), _words(4000, "high")
+    prompt = fit_prompt([(low, 1), (" ", None), (high, 2)], model=MODEL, reserved_output_tokens=RESERVED)
+    assert high in prompt
+    assert low not in prompt
+
+
+def test_summarize_is_used_when_it_fits():
+    def summarize(text, max_tokens):
+        return "summary"
+
+    prompt = fit_prompt([(_words(20000), 1), (" end", None)], model=MODEL, summarize=summarize)
+    assert prompt == "summary end"